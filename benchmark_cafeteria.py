@@ -0,0 +1,183 @@
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Callable, Dict, List
+
+from cafeteria import AlmacenBinario, AlmacenJSON, AlmacenSQLite, Catalogo, HistorialVentas, MotorCafeteria
+
+# Cambio relativo de p50 a partir del cual --comparar marca una regresión
+UMBRAL_REGRESION = 1.20
+
+def resumir(muestras: List[float]) -> Dict:
+    """Percentiles (en milisegundos) y rendimiento de una lista de duraciones en segundos"""
+    ordenadas = sorted(muestras)
+    n = len(ordenadas)
+
+    def percentil(q: float) -> float:
+        return round(ordenadas[min(n - 1, int(q * n))] * 1000, 4)
+
+    total = sum(ordenadas)
+    return {"n": n, "p50_ms": percentil(0.50), "p90_ms": percentil(0.90), "p99_ms": percentil(0.99),
+            "max_ms": round(ordenadas[-1] * 1000, 4), "media_ms": round(total / n * 1000, 4),
+            "por_segundo": round(n / total, 1) if total else None}
+
+def medir(funcion: Callable, repeticiones: int) -> List[float]:
+    muestras = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        muestras.append(time.perf_counter() - inicio)
+    return muestras
+
+def memoria_pico(funcion: Callable) -> float:
+    """MB máximos asignados por Python mientras corre la función (se mide aparte del tiempo)"""
+    tracemalloc.start()
+    try:
+        funcion()
+        return round(tracemalloc.get_traced_memory()[1] / 2**20, 2)
+    finally:
+        tracemalloc.stop()
+
+def catalogo_sintetico(tamano: int, azar: random.Random) -> Dict:
+    """Menú con `tamano` productos y stock suficiente para cualquier flujo de pedidos"""
+    return {f"Producto {i:07d}": {"precio": azar.randrange(1000, 20000, 100), "cantidad": 10**6}
+            for i in range(tamano)}
+
+def flujo_pedidos(cantidad: int, ids: List[int], azar: random.Random) -> List[List[tuple]]:
+    """Pedidos de 1 a 5 productos distintos con 1 a 3 unidades cada uno"""
+    return [[(producto_id, azar.randint(1, 3)) for producto_id in azar.sample(ids, min(len(ids), azar.randint(1, 5)))]
+            for _ in range(cantidad)]
+
+def crear_almacen_en(tipo: str, carpeta: str):
+    if tipo == "sqlite":
+        return AlmacenSQLite(os.path.join(carpeta, "menu.db"))
+    if tipo == "binario":
+        return AlmacenBinario(os.path.join(carpeta, "menu.bin"), os.path.join(carpeta, "menu_bin_diario.jsonl"),
+                              os.path.join(carpeta, "menu.lock"), os.path.join(carpeta, "menu.json"),
+                              os.path.join(carpeta, "menu_diario.jsonl"))
+    return AlmacenJSON(os.path.join(carpeta, "menu.json"), os.path.join(carpeta, "menu_diario.jsonl"),
+                       os.path.join(carpeta, "menu.lock"))
+
+def medir_tamano(tipo: str, tamano: int, pedidos: int, semilla: int) -> Dict:
+    """Mide carga, guardado y flujo de pedidos sobre un catálogo de `tamano` productos"""
+    azar = random.Random(semilla)
+    # Menos repeticiones con catálogos grandes para que la suite termine en minutos
+    repeticiones = max(3, min(50, 200000 // tamano))
+
+    with tempfile.TemporaryDirectory(prefix="bench_cafeteria_") as carpeta:
+        menu = catalogo_sintetico(tamano, azar)
+        almacen = crear_almacen_en(tipo, carpeta)
+        almacen.cargar(menu)
+        almacen.guardar(menu)
+        del menu
+
+        def cargar():
+            return Catalogo(crear_almacen_en(tipo, carpeta))
+
+        resultado = {"cargar_menu": resumir(medir(cargar, repeticiones))}
+
+        catalogo = Catalogo(crear_almacen_en(tipo, carpeta), historial=HistorialVentas(os.path.join(carpeta, "ventas.db")))
+        resultado["guardar_menu"] = resumir(medir(catalogo.guardar, repeticiones))
+
+        # Flujo de pedidos: lo que hacen agregar_al_pedido y finalizar_pedido sin la consola
+        ids = [info['id'] for info in catalogo.menu.values()]
+        flujo = flujo_pedidos(pedidos, ids, azar)
+        motor = MotorCafeteria(catalogo)
+        agregar, finalizar = [], []
+        inicio_flujo = time.perf_counter()
+        for pedido in flujo:
+            for producto_id, cantidad in pedido:
+                inicio = time.perf_counter()
+                motor.agregar_item(producto_id, cantidad)
+                agregar.append(time.perf_counter() - inicio)
+            inicio = time.perf_counter()
+            motor.confirmar()
+            finalizar.append(time.perf_counter() - inicio)
+        segundos_flujo = time.perf_counter() - inicio_flujo
+
+        resultado["agregar_al_pedido"] = resumir(agregar)
+        resultado["finalizar_pedido"] = resumir(finalizar)
+        resultado["flujo_pedidos"] = {"pedidos": pedidos, "segundos": round(segundos_flujo, 3),
+                                      "pedidos_por_segundo": round(pedidos / segundos_flujo, 1)}
+
+        def flujo_corto():
+            motor_memoria = MotorCafeteria(catalogo)
+            for pedido in flujo[:200]:
+                for producto_id, cantidad in pedido:
+                    motor_memoria.agregar_item(producto_id, cantidad)
+                motor_memoria.confirmar()
+
+        resultado["memoria_pico_mb"] = {"cargar_menu": memoria_pico(cargar), "flujo_pedidos": memoria_pico(flujo_corto)}
+        catalogo.historial.conexion.close()
+    return resultado
+
+def version_codigo() -> str:
+    """Commit actual del repositorio, para saber qué versión produjo los resultados"""
+    try:
+        return subprocess.run(["git", "describe", "--always", "--dirty"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or "desconocida"
+    except OSError:
+        return "desconocida"
+
+def comparar(base: Dict, actual: Dict) -> bool:
+    """Imprime la variación de p50 por operación. Devuelve True si hubo alguna regresión."""
+    regresion = False
+    print(f"\n{'ALMACÉN/TAMAÑO':<18} {'OPERACIÓN':<20} {'BASE p50':>12} {'ACTUAL p50':>12} {'CAMBIO':>8}")
+    for clave, operaciones in actual["resultados"].items():
+        anteriores = base["resultados"].get(clave, {})
+        for operacion, datos in operaciones.items():
+            if "p50_ms" not in datos or operacion not in anteriores:
+                continue
+            antes, ahora = anteriores[operacion]["p50_ms"], datos["p50_ms"]
+            cambio = ahora / antes if antes else float("inf")
+            marca = " ❌" if cambio > UMBRAL_REGRESION else ""
+            regresion = regresion or bool(marca)
+            print(f"{clave:<18} {operacion:<20} {antes:>12.4f} {ahora:>12.4f} {cambio:>7.2f}x{marca}")
+    return regresion
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks de carga, guardado y pedidos de la cafetería")
+    parser.add_argument("--tamanos", type=int, nargs="+", default=[10, 10_000, 1_000_000],
+                        help="cantidad de productos de cada catálogo sintético")
+    parser.add_argument("--almacen", choices=["json", "binario", "sqlite"], nargs="+", default=["json"],
+                        help="backends a medir (por defecto: json)")
+    parser.add_argument("--pedidos", type=int, default=2000, help="pedidos del flujo sintético")
+    parser.add_argument("--semilla", type=int, default=42, help="semilla para que las corridas sean reproducibles")
+    parser.add_argument("--salida", metavar="ARCHIVO", help="guarda los resultados en JSON")
+    parser.add_argument("--comparar", metavar="ARCHIVO", help="resultados JSON de una versión anterior")
+    args = parser.parse_args()
+
+    informe = {"version": version_codigo(), "fecha": datetime.now().isoformat(timespec="seconds"),
+               "python": platform.python_version(), "plataforma": platform.platform(),
+               "parametros": {"pedidos": args.pedidos, "semilla": args.semilla}, "resultados": {}}
+
+    for tipo in args.almacen:
+        for tamano in args.tamanos:
+            clave = f"{tipo}/{tamano}"
+            print(f"⏱️  Midiendo {clave}...", file=sys.stderr)
+            informe["resultados"][clave] = datos = medir_tamano(tipo, tamano, args.pedidos, args.semilla)
+            for operacion in ("cargar_menu", "guardar_menu", "agregar_al_pedido", "finalizar_pedido"):
+                print(f"   {operacion:<18} p50 {datos[operacion]['p50_ms']:>10.3f} ms | "
+                      f"p99 {datos[operacion]['p99_ms']:>10.3f} ms", file=sys.stderr)
+            print(f"   {'pedidos/s':<18} {datos['flujo_pedidos']['pedidos_por_segundo']:>13} | "
+                  f"memoria pico {max(datos['memoria_pico_mb'].values())} MB", file=sys.stderr)
+
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as f:
+            json.dump(informe, f, ensure_ascii=False, indent=2)
+        print(f"✅ Resultados guardados en {args.salida}", file=sys.stderr)
+    else:
+        print(json.dumps(informe, ensure_ascii=False, indent=2))
+
+    if args.comparar:
+        with open(args.comparar, 'r', encoding='utf-8') as f:
+            base = json.load(f)
+        sys.exit(1 if comparar(base, informe) else 0)
@@ -1,66 +1,2203 @@
+import argparse
+import bisect
+import csv
+import functools
+import heapq
+import itertools
 import json
+import mmap
 import os
-from typing import Dict, List
+import re
+import shutil
+import sqlite3
+import struct
+import sys
+import threading
+import time
+import unicodedata
+import weakref
+import zlib
+from array import array
+from collections import deque
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional
 
-class Cafeteria:
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+try:
+    import numpy as np
+except ImportError:  # Sin NumPy la cotización por lotes usa Python puro
+    np = None
+
+# Palabras (letras y dígitos) de un texto ya normalizado
+PALABRA = re.compile(r"[^\W_]+")
+
+class ConflictoMenu(Exception):
+    """El cambio ya no es válido frente al menú que otra terminal dejó en disco"""
+
+class MenuIlegible(Exception):
+    """El menú guardado existe pero no se puede leer. No se reemplaza por el menú
+    por defecto para no perder los datos: hay que restaurarlo o borrarlo a mano."""
+
+class StockInsuficiente(ConflictoMenu):
+    """El inventario en disco no alcanza para confirmar un pedido"""
+    def __init__(self, faltantes: Dict[str, int]):
+        self.faltantes = faltantes
+        detalle = ", ".join(f"{producto} (disponible: {cantidad})" for producto, cantidad in faltantes.items())
+        super().__init__(f"Stock insuficiente para: {detalle}")
+
+class BloqueoArchivo:
+    """Bloqueo exclusivo entre procesos sobre un archivo, reentrante dentro del proceso"""
+    def __init__(self, ruta: str):
+        self.ruta = ruta
+        self.hilo = threading.RLock()
+        self.profundidad = 0
+        self.archivo = None
+    
+    def __enter__(self):
+        self.hilo.acquire()
+        if self.profundidad == 0:
+            self.archivo = open(self.ruta, 'a+b')
+            if fcntl:
+                fcntl.flock(self.archivo.fileno(), fcntl.LOCK_EX)
+            else:
+                self.archivo.seek(0)
+                while True:
+                    try:
+                        msvcrt.locking(self.archivo.fileno(), msvcrt.LK_LOCK, 1)
+                        break
+                    except OSError:
+                        continue
+        self.profundidad += 1
+        return self
+    
+    def __exit__(self, *exc):
+        self.profundidad -= 1
+        if self.profundidad == 0:
+            if fcntl:
+                fcntl.flock(self.archivo.fileno(), fcntl.LOCK_UN)
+            else:
+                self.archivo.seek(0)
+                msvcrt.locking(self.archivo.fileno(), msvcrt.LK_UNLCK, 1)
+            self.archivo.close()
+            self.archivo = None
+        self.hilo.release()
+        return False
+
+class FilaMenu:
+    """Un producto de MenuCompacto; se lee y se modifica como el diccionario
+    {"id", "precio", "cantidad"} que reemplaza, sin ocupar memoria propia"""
+    
+    __slots__ = ("columnas", "fila")
+    CLAVES = ("id", "precio", "cantidad")
+    
+    def __init__(self, columnas: Dict, fila: int):
+        self.columnas = columnas
+        self.fila = fila
+    
+    def __getitem__(self, clave: str) -> int:
+        return self.columnas[clave][self.fila]
+    
+    def __setitem__(self, clave: str, valor: int):
+        self.columnas[clave][self.fila] = valor
+    
+    def get(self, clave: str, defecto=None):
+        return self.columnas[clave][self.fila] if clave in self.columnas else defecto
+    
+    def __contains__(self, clave: str) -> bool:
+        return clave in self.columnas
+    
+    def __iter__(self):
+        return iter(self.CLAVES)
+    
+    def __len__(self) -> int:
+        return len(self.CLAVES)
+    
+    def keys(self):
+        return self.CLAVES
+    
+    def values(self):
+        return [self.columnas[clave][self.fila] for clave in self.CLAVES]
+    
+    def items(self):
+        return [(clave, self.columnas[clave][self.fila]) for clave in self.CLAVES]
+    
+    def __eq__(self, otro) -> bool:
+        return dict(self.items()) == (dict(otro.items()) if hasattr(otro, "items") else otro)
+    
+    def __repr__(self) -> str:
+        return repr(dict(self.items()))
+
+class MenuCompacto:
+    """Menú en columnas: id, precio y cantidad en arreglos de enteros de 64 bits y
+    un índice nombre -> fila, que es la única copia de cada nombre.
+    
+    Ocupa menos de la mitad que un diccionario de diccionarios y se usa igual:
+    `menu[producto]['cantidad'] -= 1`, `producto in menu`, `menu.items()`... Para
+    recorrer todo el menú, `tuplas()` evita crear una FilaMenu por producto. Las
+    filas de productos borrados quedan libres hasta que son más de la mitad y el
+    menú se compacta; por eso las FilaMenu no se guardan entre operaciones."""
+    
+    def __init__(self, productos: Dict = None):
+        self.clear()
+        if productos:
+            self.update(productos)
+    
+    def clear(self):
+        self.filas = {}  # producto -> fila
+        self.columnas = {clave: array('q') for clave in FilaMenu.CLAVES}
+        self.borrados = 0
+    
+    def __len__(self) -> int:
+        return len(self.filas)
+    
+    def __contains__(self, producto: str) -> bool:
+        return producto in self.filas
+    
+    def __iter__(self):
+        return iter(self.filas)
+    
+    def __getitem__(self, producto: str) -> FilaMenu:
+        return FilaMenu(self.columnas, self.filas[producto])
+    
+    def get(self, producto: str, defecto=None):
+        fila = self.filas.get(producto)
+        return defecto if fila is None else FilaMenu(self.columnas, fila)
+    
+    def __setitem__(self, producto: str, info: Dict):
+        fila = self.filas.get(producto)
+        if fila is None:
+            self.filas[producto] = len(self.columnas['id'])
+            for clave, columna in self.columnas.items():
+                columna.append(info.get(clave, 0))
+        else:
+            for clave, columna in self.columnas.items():
+                columna[fila] = info.get(clave, 0)
+    
+    def __delitem__(self, producto: str):
+        del self.filas[producto]
+        self.borrados += 1
+        if self.borrados > 64 and self.borrados * 2 > len(self.columnas['id']):
+            self.compactar()
+    
+    def pop(self, producto: str, *defecto):
+        """Quita el producto y devuelve una copia de sus datos como diccionario"""
+        if producto not in self.filas:
+            if defecto:
+                return defecto[0]
+            raise KeyError(producto)
+        info = dict(self[producto].items())
+        del self[producto]
+        return info
+    
+    def keys(self):
+        return self.filas.keys()
+    
+    def values(self):
+        columnas = self.columnas
+        return (FilaMenu(columnas, fila) for fila in self.filas.values())
+    
+    def items(self):
+        columnas = self.columnas
+        return ((producto, FilaMenu(columnas, fila)) for producto, fila in self.filas.items())
+    
+    def update(self, productos: Dict):
+        if isinstance(productos, MenuCompacto) and not self.filas:
+            # Copia directa de las columnas (recarga de un snapshot completo)
+            self.filas = dict(productos.filas)
+            self.columnas = {clave: array('q', columna) for clave, columna in productos.columnas.items()}
+            self.borrados = productos.borrados
+            return
+        for producto, info in productos.items():
+            self[producto] = info
+    
+    def tuplas(self):
+        """Recorre (producto, id, precio, cantidad) sin crear vistas"""
+        ids, precios, cantidades = (self.columnas[clave] for clave in FilaMenu.CLAVES)
+        if not self.borrados:
+            # Sin huecos, las filas están en el mismo orden que los nombres
+            return zip(self.filas, ids, precios, cantidades)
+        return ((producto, ids[fila], precios[fila], cantidades[fila]) for producto, fila in self.filas.items())
+    
+    def columna(self, clave: str) -> Dict[str, int]:
+        """{producto: valor} de una columna, sin crear una FilaMenu por producto"""
+        valores = self.columnas[clave]
+        if not self.borrados:
+            return dict(zip(self.filas, valores))
+        return {producto: valores[fila] for producto, fila in self.filas.items()}
+    
+    def como_dict(self) -> Dict:
+        """Copia como diccionario de diccionarios (para exportar a JSON)"""
+        return {producto: {"id": producto_id, "precio": precio, "cantidad": cantidad}
+                for producto, producto_id, precio, cantidad in self.tuplas()}
+    
+    def compactar(self):
+        """Descarta las filas de los productos borrados"""
+        viejas = self.columnas
+        self.columnas = {clave: array('q', (columna[fila] for fila in self.filas.values()))
+                         for clave, columna in viejas.items()}
+        self.filas = {producto: fila for fila, producto in enumerate(self.filas)}
+        self.borrados = 0
+
+class AlmacenMenu:
+    """Interfaz de los backends donde se persiste el menú.
+    
+    El backend mantiene en `self.menu` la copia en memoria (un MenuCompacto:
+    producto -> id, precio y cantidad) y en `self.indice_ids` el índice id -> producto. Todo cambio pasa
+    por `registrar_cambio`, que lo valida contra lo persistido, lo guarda y lo
+    aplica en memoria. Los cambios son diccionarios con una clave "op": venta,
+    agregar, quitar, precio o cantidad. Los suscriptores reciben cada cambio
+    aplicado en memoria, y {"op": "recarga"} cuando se reemplaza todo el menú.
+    {"op": "lote", "cambios": [...]} agrupa altas, bajas y cambios de precio o
+    cantidad que se validan y se guardan juntos; los suscriptores reciben cada
+    cambio del lote por separado. Los backends que escriben archivos suman en `bytes_escritos` lo que escriben."""
+    
     def __init__(self):
-        self.menu_file = "menu.json"
-        self.menu = self.cargar_menu()
-        self.pedido = {}
+        self.menu = MenuCompacto()
+        self.indice_ids = {}
+        self.suscriptores = []
+        self.bytes_escritos = 0
+    
+    def cargar(self, menu_por_defecto: Dict) -> Dict:
+        """Carga el menú persistido o guarda el menú por defecto si no existe"""
+        raise NotImplementedError
+    
+    def guardar(self, menu: Dict = None):
+        """Escribe el menú completo"""
+        raise NotImplementedError
+    
+    def sincronizar(self):
+        """Incorpora al menú en memoria los cambios hechos por otros procesos"""
+        raise NotImplementedError
+    
+    def registrar_cambio(self, cambio: Dict):
+        """Valida, persiste y aplica un cambio. Lanza ConflictoMenu si no es válido."""
+        raise NotImplementedError
+    
+    def producto_por_id(self, producto_id: int) -> Optional[str]:
+        """Nombre del producto con ese id, o None si no existe"""
+        return self.indice_ids.get(producto_id)
+    
+    def reindexar(self):
+        """Reconstruye el índice id -> producto tras una recarga completa"""
+        self.indice_ids = {producto_id: producto for producto, producto_id in self.menu.columna('id').items()}
+    
+    def reemplazar_menu(self, menu: Dict):
+        """Cambia el contenido del menú en memoria conservando el mismo objeto"""
+        self.menu.clear()
+        self.menu.update(menu)
+        self.reindexar()
+        self.notificar({"op": "recarga"})
+    
+    def suscribir(self, funcion: Callable[[Dict], None]):
+        """Registra una función que se llama con cada cambio aplicado al menú"""
+        self.suscriptores.append(funcion)
+    
+    def notificar(self, cambio: Dict):
+        for funcion in self.suscriptores:
+            funcion(cambio)
+    
+    def validar_cambio(self, cambio: Dict):
+        """Verifica un cambio contra el menú en memoria recién sincronizado"""
+        op = cambio["op"]
+        if op == "venta":
+            faltantes = {}
+            for producto, cantidad in cambio["items"].items():
+                disponible = self.menu[producto]['cantidad'] if producto in self.menu else 0
+                if cantidad > disponible:
+                    faltantes[producto] = disponible
+            if faltantes:
+                raise StockInsuficiente(faltantes)
+        elif op == "lote":
+            # Se sigue qué productos existirán tras cada cambio anterior del lote
+            existe = {}
+            for parte in cambio["cambios"]:
+                producto = parte["producto"]
+                if existe.get(producto, producto in self.menu) == (parte["op"] == "agregar"):
+                    estado = "ya existe" if parte["op"] == "agregar" else "ya no existe"
+                    raise ConflictoMenu(f"El producto '{producto}' {estado} en el menú")
+                if parte["op"] in ("agregar", "quitar"):
+                    existe[producto] = parte["op"] == "agregar"
+        elif op == "agregar":
+            if cambio["producto"] in self.menu:
+                raise ConflictoMenu(f"El producto '{cambio['producto']}' ya existe en el menú")
+        elif cambio["producto"] not in self.menu:
+            raise ConflictoMenu(f"El producto '{cambio['producto']}' ya no existe en el menú")
+    
+    def aplicar_cambio(self, cambio: Dict):
+        """Aplica un cambio sobre el menú en memoria y mantiene el índice de ids"""
+        op = cambio["op"]
+        menu = self.menu
+        if op == "lote":
+            for parte in cambio["cambios"]:
+                self.aplicar_cambio(parte)
+            return
+        if op == "venta":
+            for producto, cantidad in cambio["items"].items():
+                if producto in menu:
+                    menu[producto]['cantidad'] -= cantidad
+        elif op == "agregar":
+            anterior = menu.get(cambio["producto"])
+            if anterior and anterior['id'] != cambio["id"]:
+                self.indice_ids.pop(anterior['id'], None)
+            menu[cambio["producto"]] = {"id": cambio["id"], "precio": cambio["precio"], "cantidad": cambio["cantidad"]}
+            self.indice_ids[cambio["id"]] = cambio["producto"]
+        elif op == "quitar":
+            info = menu.pop(cambio["producto"], None)
+            if info:
+                self.indice_ids.pop(info['id'], None)
+        elif op in ("precio", "cantidad"):
+            if cambio["producto"] in menu:
+                menu[cambio["producto"]][op] = cambio[op]
+        self.notificar(cambio)
+
+class AlmacenJSON(AlmacenMenu):
+    """Snapshot JSON del menú más un diario de cambios de solo anexado.
+    
+    Cada venta o edición cuesta una línea en el diario; el snapshot completo solo
+    se reescribe al compactar. Varias terminales pueden compartir los archivos:
+    los cambios se escriben bajo un bloqueo entre procesos."""
+    
+    # Cantidad de cambios en el diario antes de compactarlo en un snapshot
+    LIMITE_DIARIO = 500
+    
+    def __init__(self, menu_file: str = "menu.json", diario_file: str = "menu_diario.jsonl",
+                 bloqueo_file: str = "menu.lock"):
+        super().__init__()
+        self.menu_file = menu_file
+        self.diario_file = diario_file
+        self.bloqueo = BloqueoArchivo(bloqueo_file)
+        self.secuencia = 0
+        self.siguiente_id = 1
+        self.ids_asignados = False
+        self.entradas_diario = 0
+        self.offset_diario = 0
+        self.firma_snapshot = None
+    
+    def cargar(self, menu_por_defecto: Dict) -> Dict:
+        """Carga el último snapshot del menú y le aplica el diario de cambios"""
+        with self.bloqueo:
+            if os.path.exists(self.menu_file):
+                self.leer()
+                # Un menú antiguo sin ids se reescribe para que los ids queden fijos
+                if self.ids_asignados:
+                    self.guardar()
+            else:
+                self.asignar_ids(menu_por_defecto)
+                self.menu = MenuCompacto(menu_por_defecto)
+                self.guardar()
+                self.reindexar()
+        return self.menu
+    
+    def leer(self, truncar: bool = True):
+        """Lee el snapshot y le aplica el diario sin reescribir el snapshot.
+        Con truncar=False tampoco se recorta una cola corrupta del diario."""
+        try:
+            productos = self.leer_snapshot()
+            if not isinstance(productos, MenuCompacto):
+                self.ids_asignados = self.asignar_ids(productos)
+                productos = MenuCompacto(productos)
+            self.menu = productos
+            self.reindexar()
+            self.offset_diario = self.aplicar_diario(truncar=truncar)
+        except (MenuIlegible, OSError, ValueError, KeyError, TypeError, AttributeError, struct.error) as e:
+            raise MenuIlegible(f"No se puede leer el menú guardado en {self.menu_file}: {e}") from e
+    
+    def asignar_ids(self, menu: Dict) -> bool:
+        """Da un id nuevo a los productos que no lo tienen. Devuelve si asignó alguno."""
+        asignados = False
+        for info in menu.values():
+            if 'id' in info:
+                self.siguiente_id = max(self.siguiente_id, info['id'] + 1)
+        for info in menu.values():
+            if 'id' not in info:
+                info['id'] = self.siguiente_id
+                self.siguiente_id += 1
+                asignados = True
+        return asignados
+    
+    @staticmethod
+    def firma_archivo(ruta: str):
+        """Identifica la versión de un archivo (cambia al reemplazarlo)"""
+        try:
+            estado = os.stat(ruta)
+        except FileNotFoundError:
+            return None
+        return (estado.st_ino, estado.st_size, estado.st_mtime_ns)
+    
+    def sincronizar(self):
+        """Incorpora al menú en memoria lo que otras terminales escribieron en disco.
+        Si el snapshot no se puede leer lanza MenuIlegible y deja el menú como estaba."""
+        with self.bloqueo:
+            estado = (self.firma_snapshot, self.secuencia, self.siguiente_id)
+            try:
+                if self.firma_archivo(self.menu_file) != self.firma_snapshot:
+                    # Otra terminal compactó el diario: se recarga todo
+                    productos = self.leer_snapshot()
+                    if not isinstance(productos, MenuCompacto):
+                        productos = MenuCompacto(productos)
+                    self.reemplazar_menu(productos)
+                    self.offset_diario = self.aplicar_diario()
+                else:
+                    self.offset_diario = self.aplicar_diario(self.offset_diario)
+            except (MenuIlegible, OSError, ValueError, KeyError, TypeError, AttributeError, struct.error) as e:
+                # Sin recordar la firma del archivo roto, la próxima sincronización lo reintenta
+                self.firma_snapshot, self.secuencia, self.siguiente_id = estado
+                raise MenuIlegible(f"No se puede leer el menú guardado en {self.menu_file}: {e}") from e
+    
+    def leer_snapshot(self) -> Dict:
+        """Lee el snapshot del menú (acepta el formato antiguo sin metadatos)"""
+        with open(self.menu_file, 'r', encoding='utf-8') as f:
+            self.firma_snapshot = self.firma_archivo(self.menu_file)
+            datos = json.load(f)
         
-    def cargar_menu(self) -> Dict:
-        """Carga el menú desde un archivo JSON o crea uno por defecto"""
-        if os.path.exists(self.menu_file):
+        if isinstance(datos.get("version"), int):
+            self.secuencia = datos.get("secuencia", 0)
+            self.siguiente_id = datos.get("siguiente_id", 1)
+            return datos["productos"]
+        
+        self.secuencia = 0
+        self.siguiente_id = 1
+        return datos
+    
+    def aplicar_diario(self, desde: int = 0, truncar: bool = True) -> int:
+        """Aplica al menú los cambios del diario posteriores al snapshot.
+        Devuelve la posición del diario hasta donde se leyó."""
+        if desde == 0:
+            self.entradas_diario = 0
+        if not os.path.exists(self.diario_file):
+            return 0
+        
+        valido = desde
+        with open(self.diario_file, 'rb') as f:
+            f.seek(desde)
+            for linea in f:
+                # Una línea sin salto final quedó a medio escribir (caída del programa)
+                if not linea.endswith(b"\n"):
+                    break
+                try:
+                    cambio = json.loads(linea)
+                except ValueError:
+                    break
+                valido += len(linea)
+                if cambio["seq"] <= self.secuencia:
+                    continue
+                self.aplicar_cambio(cambio)
+                self.secuencia = cambio["seq"]
+                self.entradas_diario += self.peso_entrada(cambio)
+        
+        # Se descarta la cola corrupta para que las siguientes entradas queden legibles
+        if truncar and valido < os.path.getsize(self.diario_file):
+            with open(self.diario_file, 'r+b') as f:
+                f.truncate(valido)
+        return valido
+    
+    @staticmethod
+    def peso_entrada(cambio: Dict) -> int:
+        """Cuánto cuenta una entrada del diario para decidir la compactación"""
+        return len(cambio["cambios"]) if cambio["op"] == "lote" else 1
+    
+    def aplicar_cambio(self, cambio: Dict):
+        if cambio["op"] == "agregar":
+            if "id" not in cambio:
+                # Entrada escrita antes de que los productos tuvieran id
+                cambio = {**cambio, "id": self.siguiente_id}
+                self.ids_asignados = True
+            self.siguiente_id = max(self.siguiente_id, cambio["id"] + 1)
+        super().aplicar_cambio(cambio)
+    
+    def guardar(self, menu: Dict = None):
+        """Guarda un snapshot completo del menú y vacía el diario (compactación)"""
+        menu_a_guardar = menu if menu else self.menu
+        
+        with self.bloqueo:
+            # Se escribe en un temporal y se reemplaza para no dejar un snapshot a medias
+            temporal = self.menu_file + ".tmp"
+            with open(temporal, 'wb') as f:
+                self.escribir_snapshot(f, menu_a_guardar)
+                f.flush()
+                os.fsync(f.fileno())
+                self.bytes_escritos += f.tell()
+            os.replace(temporal, self.menu_file)
+            self.firma_snapshot = self.firma_archivo(self.menu_file)
+            
+            if os.path.exists(self.diario_file):
+                open(self.diario_file, 'w').close()
+            self.entradas_diario = 0
+            self.offset_diario = 0
+    
+    def escribir_snapshot(self, archivo, menu: Dict):
+        """Escribe el snapshot del menú en un archivo abierto en modo binario"""
+        if isinstance(menu, MenuCompacto):
+            menu = menu.como_dict()
+        self.asignar_ids(menu)
+        datos = {"version": 2, "secuencia": self.secuencia, "siguiente_id": self.siguiente_id, "productos": menu}
+        archivo.write(json.dumps(datos, indent=4, ensure_ascii=False).encode('utf-8'))
+    
+    def registrar_cambio(self, cambio: Dict):
+        """Valida el cambio contra el estado en disco, lo añade al diario y lo aplica
+        al menú en memoria. Lanza ConflictoMenu si otra terminal lo invalidó."""
+        with self.bloqueo:
+            self.sincronizar()
+            self.validar_cambio(cambio)
+            if cambio["op"] == "agregar":
+                cambio = {**cambio, "id": self.siguiente_id}
+            elif cambio["op"] == "lote":
+                partes = []
+                siguiente_id = self.siguiente_id
+                for parte in cambio["cambios"]:
+                    if parte["op"] == "agregar":
+                        parte = {**parte, "id": siguiente_id}
+                        siguiente_id += 1
+                    partes.append(parte)
+                cambio = {**cambio, "cambios": partes}
+            
+            self.secuencia += 1
+            entrada = {"seq": self.secuencia, **cambio}
+            linea = (json.dumps(entrada, ensure_ascii=False) + "\n").encode('utf-8')
+            
+            with open(self.diario_file, 'ab') as f:
+                f.write(linea)
+                f.flush()
+                os.fsync(f.fileno())
+            self.offset_diario += len(linea)
+            self.bytes_escritos += len(linea)
+            
+            self.aplicar_cambio(cambio)
+            self.entradas_diario += self.peso_entrada(cambio)
+            if self.entradas_diario >= self.LIMITE_DIARIO:
+                self.guardar()
+
+class SnapshotBinario:
+    """Lector del snapshot binario del menú, sobre bytes o un archivo mapeado en memoria.
+    
+    Formato (little-endian), versión 1:
+        encabezado  magia "CAFEMENU", versión, productos n, secuencia, siguiente_id,
+                    CRC32 del cuerpo y CRC32 del propio encabezado
+        columnas    ids, precios y cantidades: n enteros de 64 bits cada una
+        fin_nombres n enteros de 32 bits: dónde termina cada nombre en el bloque de nombres
+        por_nombre  n filas (32 bits) ordenadas por nombre en UTF-8
+        por_id      n filas (32 bits) ordenadas por id
+        nombres     los nombres en UTF-8, uno tras otro, en el orden del menú
+    Las columnas se copian tal cual a un MenuCompacto; un producto suelto se lee con
+    una búsqueda binaria sobre por_nombre o por_id sin decodificar el resto."""
+    
+    MAGIA = b"CAFEMENU"
+    VERSION = 1
+    ENCABEZADO = struct.Struct("<8sHHIqqII")
+    
+    def __init__(self, datos, verificar: bool = True):
+        self.datos = datos
+        if len(datos) < self.ENCABEZADO.size:
+            raise MenuIlegible("El snapshot binario está truncado")
+        magia, version, _, n, self.secuencia, self.siguiente_id, crc_cuerpo, crc_encabezado = \
+            self.ENCABEZADO.unpack_from(datos)
+        if magia != self.MAGIA:
+            raise MenuIlegible("El archivo no es un snapshot binario del menú")
+        if version != self.VERSION:
+            raise MenuIlegible(f"Versión de snapshot binario no soportada: {version}")
+        if zlib.crc32(bytes(datos[:self.ENCABEZADO.size - 4])) != crc_encabezado:
+            raise MenuIlegible("El encabezado del snapshot binario está dañado")
+        
+        self.n = n
+        self.inicio = {}
+        posicion = self.ENCABEZADO.size
+        for seccion, ancho in (("id", 8), ("precio", 8), ("cantidad", 8),
+                               ("fin_nombres", 4), ("por_nombre", 4), ("por_id", 4)):
+            self.inicio[seccion] = posicion
+            posicion += ancho * n
+        self.inicio["nombres"] = posicion
+        if len(datos) < posicion:
+            raise MenuIlegible("El snapshot binario está truncado")
+        if verificar and zlib.crc32(memoryview(datos)[self.ENCABEZADO.size:]) != crc_cuerpo:
+            raise MenuIlegible("El snapshot binario está dañado (el CRC no coincide)")
+    
+    @classmethod
+    def codificar(cls, menu: "MenuCompacto", secuencia: int, siguiente_id: int) -> bytes:
+        """Bytes del snapshot de un menú"""
+        productos = list(menu.tuplas())
+        columnas = [array('q', (producto[i] for producto in productos)) for i in (1, 2, 3)]
+        nombres = [producto[0].encode('utf-8') for producto in productos]
+        fin_nombres = array('I', itertools.accumulate(len(nombre) for nombre in nombres))
+        por_nombre = array('I', sorted(range(len(nombres)), key=nombres.__getitem__))
+        por_id = array('I', sorted(range(len(nombres)), key=columnas[0].__getitem__))
+        secciones = columnas + [fin_nombres, por_nombre, por_id]
+        if sys.byteorder == "big":
+            for seccion in secciones:
+                seccion.byteswap()
+        cuerpo = b"".join([seccion.tobytes() for seccion in secciones] + nombres)
+        
+        encabezado = cls.ENCABEZADO.pack(cls.MAGIA, cls.VERSION, 0, len(productos), secuencia,
+                                         siguiente_id, zlib.crc32(cuerpo), 0)
+        encabezado = encabezado[:-4] + struct.pack("<I", zlib.crc32(encabezado[:-4]))
+        return encabezado + cuerpo
+    
+    def seccion(self, nombre: str, tipo: str) -> array:
+        ancho = 8 if tipo == 'q' else 4
+        valores = array(tipo, self.datos[self.inicio[nombre]:self.inicio[nombre] + ancho * self.n])
+        if sys.byteorder == "big":
+            valores.byteswap()
+        return valores
+    
+    def entero(self, seccion: str, fila: int) -> int:
+        if seccion in ("id", "precio", "cantidad"):
+            return struct.unpack_from("<q", self.datos, self.inicio[seccion] + 8 * fila)[0]
+        return struct.unpack_from("<I", self.datos, self.inicio[seccion] + 4 * fila)[0]
+    
+    def nombre_bytes(self, fila: int) -> bytes:
+        inicio = self.entero("fin_nombres", fila - 1) if fila else 0
+        fin = self.entero("fin_nombres", fila)
+        return bytes(self.datos[self.inicio["nombres"] + inicio:self.inicio["nombres"] + fin])
+    
+    def producto(self, fila: int) -> Dict:
+        return {clave: self.entero(clave, fila) for clave in FilaMenu.CLAVES}
+    
+    def buscar(self, producto: str) -> Optional[int]:
+        """Fila del producto (búsqueda binaria por nombre) o None"""
+        clave = producto.encode('utf-8')
+        bajo, alto = 0, self.n
+        while bajo < alto:
+            medio = (bajo + alto) // 2
+            if self.nombre_bytes(self.entero("por_nombre", medio)) < clave:
+                bajo = medio + 1
+            else:
+                alto = medio
+        if bajo < self.n:
+            fila = self.entero("por_nombre", bajo)
+            if self.nombre_bytes(fila) == clave:
+                return fila
+        return None
+    
+    def buscar_id(self, producto_id: int) -> Optional[int]:
+        """Fila del producto con ese id (búsqueda binaria) o None"""
+        bajo, alto = 0, self.n
+        while bajo < alto:
+            medio = (bajo + alto) // 2
+            if self.entero("id", self.entero("por_id", medio)) < producto_id:
+                bajo = medio + 1
+            else:
+                alto = medio
+        if bajo < self.n and self.entero("id", self.entero("por_id", bajo)) == producto_id:
+            return self.entero("por_id", bajo)
+        return None
+    
+    def menu(self) -> "MenuCompacto":
+        """Decodifica el snapshot completo a un MenuCompacto"""
+        menu = MenuCompacto()
+        for clave in FilaMenu.CLAVES:
+            menu.columnas[clave] = self.seccion(clave, 'q')
+        base = self.inicio["nombres"]
+        nombres = bytes(self.datos[base:base + (self.entero("fin_nombres", self.n - 1) if self.n else 0)])
+        inicio = 0
+        filas = {}
+        for fila, fin in enumerate(self.seccion("fin_nombres", 'I')):
+            filas[nombres[inicio:fin].decode('utf-8')] = fila
+            inicio = fin
+        menu.filas = filas
+        return menu
+
+class AlmacenBinario(AlmacenJSON):
+    """Como AlmacenJSON, pero el snapshot es binario (ver SnapshotBinario).
+    
+    Arranca sin parsear texto: las columnas del archivo se copian directo al menú
+    en memoria. `consultar` lee el precio y el stock de un producto mapeando el
+    archivo, sin cargar el menú. Si no hay snapshot binario pero sí un menu.json,
+    se importa de ahí; el JSON sigue sirviendo para importar y exportar."""
+    
+    def __init__(self, menu_file: str = "menu.bin", diario_file: str = "menu_bin_diario.jsonl",
+                 bloqueo_file: str = "menu.lock", json_file: str = "menu.json",
+                 json_diario_file: str = "menu_diario.jsonl"):
+        super().__init__(menu_file, diario_file, bloqueo_file)
+        self.json_file = json_file
+        self.json_diario_file = json_diario_file
+    
+    def cargar(self, menu_por_defecto: Dict) -> Dict:
+        with self.bloqueo:
+            if not os.path.exists(self.menu_file) and os.path.exists(self.json_file):
+                # Primera vez: se importa el menú JSON (con su diario) sin modificarlo
+                origen = AlmacenJSON(self.json_file, self.json_diario_file)
+                origen.bloqueo = self.bloqueo
+                origen.leer(truncar=False)
+                self.menu = origen.menu
+                self.siguiente_id = origen.siguiente_id
+                self.secuencia = 0
+                self.guardar()
+                self.reindexar()
+                return self.menu
+            return super().cargar(menu_por_defecto)
+    
+    def leer_snapshot(self) -> "MenuCompacto":
+        with open(self.menu_file, 'rb') as f:
+            self.firma_snapshot = self.firma_archivo(self.menu_file)
+            try:
+                datos = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                raise MenuIlegible("El snapshot binario está vacío")
+            with datos:
+                snapshot = SnapshotBinario(datos)
+                self.secuencia = snapshot.secuencia
+                self.siguiente_id = snapshot.siguiente_id
+                return snapshot.menu()
+    
+    def escribir_snapshot(self, archivo, menu: Dict):
+        if not isinstance(menu, MenuCompacto):
+            self.asignar_ids(menu)
+            menu = MenuCompacto(menu)
+        archivo.write(SnapshotBinario.codificar(menu, self.secuencia, self.siguiente_id))
+    
+    def consultar(self, producto: str) -> Optional[Dict]:
+        """Id, precio y cantidad actuales de un producto sin cargar el menú: se
+        busca en el snapshot mapeado y se le aplican las entradas del diario"""
+        with self.bloqueo:
+            with open(self.menu_file, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as datos:
+                snapshot = SnapshotBinario(datos, verificar=False)
+                fila = snapshot.buscar(producto)
+                info = snapshot.producto(fila) if fila is not None else None
+                secuencia = snapshot.secuencia
+            
+            if os.path.exists(self.diario_file):
+                with open(self.diario_file, 'rb') as f:
+                    for linea in f:
+                        if not linea.endswith(b"\n"):
+                            break
+                        entrada = json.loads(linea)
+                        if entrada["seq"] <= secuencia:
+                            continue
+                        for cambio in entrada["cambios"] if entrada["op"] == "lote" else (entrada,):
+                            op = cambio["op"]
+                            if op == "venta":
+                                if info and producto in cambio["items"]:
+                                    info['cantidad'] -= cambio["items"][producto]
+                            elif cambio.get("producto") != producto:
+                                continue
+                            elif op == "agregar":
+                                info = {"id": cambio.get("id"), "precio": cambio["precio"], "cantidad": cambio["cantidad"]}
+                            elif op == "quitar":
+                                info = None
+                            elif info:
+                                info[op] = cambio[op]
+        return info
+
+class AlmacenSQLite(AlmacenMenu):
+    """Menú en una base SQLite con una fila por producto.
+    
+    Las ventas descuentan stock dentro de una transacción y cada edición actualiza
+    solo su fila. Cada fila lleva la versión del último cambio que la tocó, así la
+    sincronización con otras terminales solo lee las filas modificadas.
+    
+    El arranque no es perezoso: Catalogo, el índice de nombres y el menú que sirve
+    el servidor recorren el menú completo en memoria, así que `cargar` lee todas las
+    filas una vez, directo a las columnas del MenuCompacto. Ese costo crece con el
+    catálogo; el de cada venta, edición o sincronización no."""
+    
+    def __init__(self, db_file: str = "menu.db"):
+        super().__init__()
+        self.db_file = db_file
+        # Autocommit: las transacciones se abren explícitamente con BEGIN IMMEDIATE
+        # check_same_thread=False: el servidor la usa desde su hilo ejecutor, de a una operación
+        self.conexion = sqlite3.connect(db_file, timeout=30, isolation_level=None, check_same_thread=False)
+        self.conexion.executescript("""
+            CREATE TABLE IF NOT EXISTS productos (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                nombre TEXT NOT NULL UNIQUE,
+                precio INTEGER NOT NULL,
+                cantidad INTEGER NOT NULL,
+                version INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE INDEX IF NOT EXISTS productos_version ON productos(version);
+            CREATE TABLE IF NOT EXISTS eliminados (
+                nombre TEXT PRIMARY KEY,
+                version INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS meta (
+                clave TEXT PRIMARY KEY,
+                valor INTEGER NOT NULL
+            );
+            INSERT OR IGNORE INTO meta (clave, valor) VALUES ('version', 0);
+        """)
+        self.version = 0
+        self.data_version = None
+    
+    def cargar(self, menu_por_defecto: Dict) -> Dict:
+        """Carga todas las filas; una base vacía se llena con el menú por defecto"""
+        with self.transaccion():
+            if not self.conexion.execute("SELECT EXISTS (SELECT 1 FROM productos)").fetchone()[0]:
+                self.reemplazar_filas(menu_por_defecto)
+        self.recargar()
+        return self.menu
+    
+    def recargar(self):
+        """Lee todas las filas de la tabla sin armar un diccionario por producto"""
+        menu = MenuCompacto()
+        filas = menu.filas
+        ids, precios, cantidades = (menu.columnas[clave] for clave in FilaMenu.CLAVES)
+        with self.transaccion(escritura=False):
+            self.version = self.leer_version()
+            for fila, (producto_id, nombre, precio, cantidad) in enumerate(self.conexion.execute(
+                    "SELECT id, nombre, precio, cantidad FROM productos ORDER BY id")):
+                filas[nombre] = fila
+                ids.append(producto_id)
+                precios.append(precio)
+                cantidades.append(cantidad)
+        self.data_version = self.conexion.execute("PRAGMA data_version").fetchone()[0]
+        self.reemplazar_menu(menu)
+    
+    @contextmanager
+    def transaccion(self, escritura: bool = True):
+        """Abre una transacción; las de escritura toman el bloqueo desde el inicio"""
+        self.conexion.execute("BEGIN IMMEDIATE" if escritura else "BEGIN")
+        try:
+            yield self.conexion
+        except BaseException:
+            self.conexion.execute("ROLLBACK")
+            raise
+        self.conexion.execute("COMMIT")
+    
+    def leer_version(self) -> int:
+        return self.conexion.execute("SELECT valor FROM meta WHERE clave = 'version'").fetchone()[0]
+    
+    def nueva_version(self) -> int:
+        """Reserva el número de versión del cambio en curso (dentro de una transacción)"""
+        self.conexion.execute("UPDATE meta SET valor = valor + 1 WHERE clave = 'version'")
+        return self.leer_version()
+    
+    def guardar(self, menu: Dict = None):
+        """Reemplaza el contenido de la tabla por el menú completo"""
+        menu_a_guardar = menu if menu else self.menu
+        with self.transaccion():
+            self.reemplazar_filas(menu_a_guardar)
+        # Los productos sin id reciben uno nuevo de la tabla
+        self.recargar()
+    
+    def reemplazar_filas(self, menu: Dict):
+        """Borra todas las filas e inserta las del menú (dentro de una transacción)"""
+        version = self.nueva_version()
+        self.conexion.execute(
+            "INSERT OR REPLACE INTO eliminados (nombre, version) SELECT nombre, ? FROM productos", (version,))
+        self.conexion.execute("DELETE FROM productos")
+        self.conexion.executemany(
+            "INSERT INTO productos (id, nombre, precio, cantidad, version) VALUES (?, ?, ?, ?, ?)",
+            [(info.get('id'), nombre, info['precio'], info['cantidad'], version)
+             for nombre, info in menu.items()])
+    
+    def sincronizar(self):
+        """Lee solo las filas que otras conexiones cambiaron desde la última lectura"""
+        data_version = self.conexion.execute("PRAGMA data_version").fetchone()[0]
+        if data_version == self.data_version:
+            return
+        
+        with self.transaccion(escritura=False):
+            version = self.leer_version()
+            for (nombre,) in self.conexion.execute(
+                    "SELECT nombre FROM eliminados WHERE version > ?", (self.version,)):
+                self.aplicar_cambio({"op": "quitar", "producto": nombre})
+            for producto_id, nombre, precio, cantidad in self.conexion.execute(
+                    "SELECT id, nombre, precio, cantidad FROM productos WHERE version > ? ORDER BY version",
+                    (self.version,)):
+                info = self.menu.get(nombre)
+                if info is None or info['id'] != producto_id:
+                    self.aplicar_cambio({"op": "agregar", "producto": nombre, "id": producto_id,
+                                         "precio": precio, "cantidad": cantidad})
+                    continue
+                if info['precio'] != precio:
+                    self.aplicar_cambio({"op": "precio", "producto": nombre, "precio": precio})
+                if info['cantidad'] != cantidad:
+                    self.aplicar_cambio({"op": "cantidad", "producto": nombre, "cantidad": cantidad})
+        self.version = version
+        self.data_version = data_version
+    
+    def registrar_cambio(self, cambio: Dict):
+        """Aplica el cambio en una transacción, validándolo en la propia consulta"""
+        op = cambio["op"]
+        with self.transaccion():
+            version = self.nueva_version()
+            if op == "venta":
+                faltantes = {}
+                for producto, cantidad in cambio["items"].items():
+                    cursor = self.conexion.execute(
+                        "UPDATE productos SET cantidad = cantidad - ?, version = ? "
+                        "WHERE nombre = ? AND cantidad >= ?", (cantidad, version, producto, cantidad))
+                    if cursor.rowcount == 0:
+                        fila = self.conexion.execute(
+                            "SELECT cantidad FROM productos WHERE nombre = ?", (producto,)).fetchone()
+                        faltantes[producto] = fila[0] if fila else 0
+                if faltantes:
+                    raise StockInsuficiente(faltantes)
+                
+                # Se refrescan las filas vendidas por si otra terminal también las tocó
+                nuevas = {}
+                for producto in cambio["items"]:
+                    nuevas[producto] = self.conexion.execute(
+                        "SELECT cantidad FROM productos WHERE nombre = ?", (producto,)).fetchone()[0]
+            elif op == "lote":
+                # Todo el lote en la misma transacción: si un cambio falla no se aplica ninguno
+                cambio = {**cambio, "cambios": [self.ejecutar_cambio(parte, version) for parte in cambio["cambios"]]}
+            else:
+                cambio = self.ejecutar_cambio(cambio, version)
+        
+        if op == "venta":
+            for producto, cantidad in nuevas.items():
+                self.aplicar_cambio({"op": "cantidad", "producto": producto, "cantidad": cantidad})
+        else:
+            self.aplicar_cambio(cambio)
+    
+    def ejecutar_cambio(self, cambio: Dict, version: int) -> Dict:
+        """Escribe un alta, baja o cambio de precio/cantidad (dentro de una transacción).
+        Devuelve el cambio tal como se aplicó (con el id asignado en las altas)."""
+        op = cambio["op"]
+        if op == "agregar":
             try:
-                with open(self.menu_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except:
-                return self.menu_por_defecto()
+                cursor = self.conexion.execute(
+                    "INSERT INTO productos (nombre, precio, cantidad, version) VALUES (?, ?, ?, ?)",
+                    (cambio["producto"], cambio["precio"], cambio["cantidad"], version))
+            except sqlite3.IntegrityError:
+                raise ConflictoMenu(f"El producto '{cambio['producto']}' ya existe en el menú")
+            self.conexion.execute("DELETE FROM eliminados WHERE nombre = ?", (cambio["producto"],))
+            return {**cambio, "id": cursor.lastrowid}
+        if op == "quitar":
+            cursor = self.conexion.execute("DELETE FROM productos WHERE nombre = ?", (cambio["producto"],))
+            if cursor.rowcount == 0:
+                raise ConflictoMenu(f"El producto '{cambio['producto']}' ya no existe en el menú")
+            self.conexion.execute(
+                "INSERT OR REPLACE INTO eliminados (nombre, version) VALUES (?, ?)",
+                (cambio["producto"], version))
+            return cambio
+        # op es "precio" o "cantidad", ambos nombres de columna
+        cursor = self.conexion.execute(
+            f"UPDATE productos SET {op} = ?, version = ? WHERE nombre = ?",
+            (cambio[op], version, cambio["producto"]))
+        if cursor.rowcount == 0:
+            raise ConflictoMenu(f"El producto '{cambio['producto']}' ya no existe en el menú")
+        return cambio
+
+class HistorialVentas:
+    """Registro persistente de ventas con resúmenes que se actualizan en cada venta.
+    
+    Junto con cada venta se suman sus unidades e ingresos a las tablas de resumen
+    por hora, por día y por producto, en la misma transacción. Los reportes leen
+    esos resúmenes y nunca recorren el registro de ventas. Los ingresos son lo
+    cobrado por cada producto (con combos, descuentos e impuestos), así que suman
+    el total de las ventas."""
+    
+    def __init__(self, db_file: str = "ventas.db"):
+        self.db_file = db_file
+        # Las operaciones llegan serializadas (terminal o ejecutor del servidor)
+        self.conexion = sqlite3.connect(db_file, timeout=30, isolation_level=None, check_same_thread=False)
+        self.conexion.executescript("""
+            CREATE TABLE IF NOT EXISTS ventas (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                fecha TEXT NOT NULL,
+                total INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS ventas_items (
+                venta_id INTEGER NOT NULL REFERENCES ventas(id),
+                producto TEXT NOT NULL,
+                cantidad INTEGER NOT NULL,
+                precio INTEGER NOT NULL,
+                importe INTEGER
+            );
+            CREATE TABLE IF NOT EXISTS resumen_hora (
+                hora TEXT NOT NULL,
+                producto TEXT NOT NULL,
+                unidades INTEGER NOT NULL,
+                ingresos INTEGER NOT NULL,
+                PRIMARY KEY (hora, producto)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS resumen_dia (
+                dia TEXT NOT NULL,
+                producto TEXT NOT NULL,
+                unidades INTEGER NOT NULL,
+                ingresos INTEGER NOT NULL,
+                PRIMARY KEY (dia, producto)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS resumen_producto (
+                producto TEXT PRIMARY KEY,
+                unidades INTEGER NOT NULL,
+                ingresos INTEGER NOT NULL
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS resumen_producto_unidades ON resumen_producto(unidades);
+        """)
+        columnas = {fila[1] for fila in self.conexion.execute("PRAGMA table_info(ventas_items)")}
+        if "importe" not in columnas:
+            # Historial anterior: sus líneas quedan sin importe (y sus resúmenes a precio de lista)
+            self.conexion.execute("ALTER TABLE ventas_items ADD COLUMN importe INTEGER")
+    
+    def registrar(self, items: Dict, fecha: datetime = None, total: int = None,
+                  importes: Dict[str, int] = None) -> int:
+        """Guarda una venta ({producto: {precio, cantidad}}) y actualiza los resúmenes.
+        `total` es lo cobrado con promociones e impuestos (por defecto, la suma de los items)
+        e `importes` lo cobrado por producto (ver MotorPrecios.importes); sin ellos el total
+        se reparte en proporción al precio de lista. Devuelve el número de venta."""
+        fecha = fecha if fecha else datetime.now()
+        hora = fecha.strftime("%Y-%m-%d %H")
+        dia = fecha.strftime("%Y-%m-%d")
+        if importes is None:
+            importes = {producto: info['precio'] * info['cantidad'] for producto, info in items.items()}
+            if total is not None:
+                importes = repartir(total, importes)
+        if total is None:
+            total = sum(importes.values())
+        
+        self.conexion.execute("BEGIN IMMEDIATE")
+        try:
+            venta_id = self.conexion.execute(
+                "INSERT INTO ventas (fecha, total) VALUES (?, ?)",
+                (fecha.strftime("%Y-%m-%d %H:%M:%S"), total)).lastrowid
+            self.conexion.executemany(
+                "INSERT INTO ventas_items (venta_id, producto, cantidad, precio, importe) VALUES (?, ?, ?, ?, ?)",
+                [(venta_id, producto, info['cantidad'], info['precio'], importes[producto])
+                 for producto, info in items.items()])
+            for producto, info in items.items():
+                unidades = info['cantidad']
+                ingresos = importes[producto]
+                self.conexion.execute(
+                    "INSERT INTO resumen_hora VALUES (?, ?, ?, ?) ON CONFLICT (hora, producto) DO UPDATE "
+                    "SET unidades = unidades + excluded.unidades, ingresos = ingresos + excluded.ingresos",
+                    (hora, producto, unidades, ingresos))
+                self.conexion.execute(
+                    "INSERT INTO resumen_dia VALUES (?, ?, ?, ?) ON CONFLICT (dia, producto) DO UPDATE "
+                    "SET unidades = unidades + excluded.unidades, ingresos = ingresos + excluded.ingresos",
+                    (dia, producto, unidades, ingresos))
+                self.conexion.execute(
+                    "INSERT INTO resumen_producto VALUES (?, ?, ?) ON CONFLICT (producto) DO UPDATE "
+                    "SET unidades = unidades + excluded.unidades, ingresos = ingresos + excluded.ingresos",
+                    (producto, unidades, ingresos))
+        except BaseException:
+            self.conexion.execute("ROLLBACK")
+            raise
+        self.conexion.execute("COMMIT")
+        return venta_id
+    
+    def ventas_por_hora(self, dia: str) -> List:
+        """[(hora, unidades, ingresos)] de un día ("AAAA-MM-DD")"""
+        return self.conexion.execute(
+            "SELECT substr(hora, 12) || ':00', SUM(unidades), SUM(ingresos) FROM resumen_hora "
+            "WHERE hora BETWEEN ? AND ? GROUP BY hora ORDER BY hora",
+            (f"{dia} 00", f"{dia} 23")).fetchall()
+    
+    def ventas_por_dia(self, desde: str, hasta: str) -> List:
+        """[(día, unidades, ingresos)] entre dos fechas "AAAA-MM-DD" inclusive"""
+        return self.conexion.execute(
+            "SELECT dia, SUM(unidades), SUM(ingresos) FROM resumen_dia "
+            "WHERE dia BETWEEN ? AND ? GROUP BY dia ORDER BY dia", (desde, hasta)).fetchall()
+    
+    def mas_vendidos(self, limite: int = 10, desde: str = None, hasta: str = None) -> List:
+        """[(producto, unidades, ingresos)] ordenado por unidades; sin fechas, de toda la historia"""
+        if desde is None and hasta is None:
+            return self.conexion.execute(
+                "SELECT producto, unidades, ingresos FROM resumen_producto "
+                "ORDER BY unidades DESC LIMIT ?", (limite,)).fetchall()
+        return self.conexion.execute(
+            "SELECT producto, SUM(unidades) AS total_unidades, SUM(ingresos) FROM resumen_dia "
+            "WHERE dia BETWEEN ? AND ? GROUP BY producto ORDER BY total_unidades DESC LIMIT ?",
+            (desde or "0000-00-00", hasta or "9999-99-99", limite)).fetchall()
+    
+    def producto(self, producto: str) -> Optional[tuple]:
+        """(unidades, ingresos) históricos de un producto"""
+        return self.conexion.execute(
+            "SELECT unidades, ingresos FROM resumen_producto WHERE producto = ?", (producto,)).fetchone()
+
+def crear_almacen(tipo: str = "json") -> AlmacenMenu:
+    """Crea el backend de almacenamiento indicado ("json", "binario" o "sqlite")"""
+    if tipo == "sqlite":
+        return AlmacenSQLite()
+    if tipo == "binario":
+        return AlmacenBinario()
+    return AlmacenJSON()
+
+def menu_por_defecto() -> Dict:
+    """Menú inicial por defecto"""
+    return {
+        "Café Americano": {"precio": 3500, "cantidad": 50},
+        "Café con Leche": {"precio": 4000, "cantidad": 40},
+        "Cappuccino": {"precio": 4500, "cantidad": 30},
+        "Latte": {"precio": 5000, "cantidad": 25},
+        "Espresso": {"precio": 3000, "cantidad": 60},
+        "Té Verde": {"precio": 3000, "cantidad": 20},
+        "Chocolate Caliente": {"precio": 4200, "cantidad": 15},
+        "Croissant": {"precio": 2800, "cantidad": 30},
+        "Muffin": {"precio": 3200, "cantidad": 20},
+        "Sandwich": {"precio": 6500, "cantidad": 15}
+    }
+
+class LibroReservas:
+    """Unidades apartadas temporalmente mientras los clientes arman su pedido.
+    
+    Cada reserva vence a los `ttl` segundos de su última modificación. Los
+    vencimientos se guardan en un heap, así barrer solo toca las reservas vencidas.
+    Al renovar una reserva su entrada anterior queda en el heap y se descarta al
+    salir, porque ya no coincide con el vencimiento vigente."""
+    
+    # Duración por defecto de una reserva (segundos)
+    TTL = 15 * 60
+    
+    def __init__(self, ttl: float = TTL, reloj: Callable[[], float] = time.monotonic):
+        self.ttl = ttl
+        self.reloj = reloj
+        self.reservado = {}      # producto -> unidades reservadas en total
+        self.reservas = {}       # id de reserva -> [producto, cantidad, vencimiento]
+        self.vencimientos = []   # heap de (vencimiento, id de reserva)
+        self.siguiente_id = 1
+        self.candado = threading.Lock()
+    
+    def cantidad(self, reserva_id: Optional[int]) -> int:
+        """Unidades que aparta una reserva (0 si ya venció o no existe)"""
+        reserva = self.reservas.get(reserva_id)
+        return reserva[1] if reserva else 0
+    
+    def fijar(self, reserva_id: Optional[int], producto: str, cantidad: int, stock: int) -> Optional[int]:
+        """Deja la reserva en `cantidad` unidades y renueva su vencimiento.
+        Crea la reserva si no existe; con cantidad 0 la libera. Devuelve su id.
+        Lanza StockInsuficiente si las reservas de otros no dejan lugar para crecer;
+        achicar o mantener una reserva nunca falla, aunque el stock haya bajado."""
+        with self.candado:
+            actual = self.cantidad(reserva_id)
+            libre = stock - (self.reservado.get(producto, 0) - actual)
+            if cantidad > actual and cantidad > libre:
+                raise StockInsuficiente({producto: max(libre, 0)})
+            
+            self.quitar(reserva_id)
+            if cantidad <= 0:
+                return None
+            if reserva_id is None:
+                reserva_id = self.siguiente_id
+                self.siguiente_id += 1
+            vence = self.reloj() + self.ttl
+            self.reservas[reserva_id] = [producto, cantidad, vence]
+            self.reservado[producto] = self.reservado.get(producto, 0) + cantidad
+            heapq.heappush(self.vencimientos, (vence, reserva_id))
+            return reserva_id
+    
+    def liberar(self, reserva_id: Optional[int]) -> Optional[str]:
+        """Libera una reserva. Devuelve el producto afectado."""
+        with self.candado:
+            return self.quitar(reserva_id)
+    
+    def quitar(self, reserva_id: Optional[int]) -> Optional[str]:
+        reserva = self.reservas.pop(reserva_id, None)
+        if reserva is None:
+            return None
+        producto, cantidad, _ = reserva
+        restante = self.reservado[producto] - cantidad
+        if restante:
+            self.reservado[producto] = restante
         else:
-            menu_default = self.menu_por_defecto()
-            self.guardar_menu(menu_default)
-            return menu_default
+            del self.reservado[producto]
+        return producto
+    
+    def barrer(self) -> List[str]:
+        """Libera las reservas vencidas. Devuelve los productos que recuperaron stock."""
+        liberados = []
+        ahora = self.reloj()
+        with self.candado:
+            while self.vencimientos and self.vencimientos[0][0] <= ahora:
+                vence, reserva_id = heapq.heappop(self.vencimientos)
+                reserva = self.reservas.get(reserva_id)
+                if reserva and reserva[2] == vence:
+                    liberados.append(self.quitar(reserva_id))
+        return liberados
+
+def repartir(monto: int, pesos: Dict[str, int]) -> Dict[str, int]:
+    """Reparte un monto entero en proporción a los pesos; las partes suman exactamente el monto"""
+    total = sum(pesos.values())
+    if total <= 0:
+        partes = dict.fromkeys(pesos, 0)
+        if partes:
+            partes[next(iter(partes))] = monto
+        return partes
+    partes = {clave: monto * peso // total for clave, peso in pesos.items()}
+    sobra = monto - sum(partes.values())
+    # Las unidades que faltan van a los de mayor resto
+    for clave in sorted(pesos, key=lambda clave: monto * pesos[clave] % total, reverse=True)[:sobra]:
+        partes[clave] += 1
+    return partes
+
+class MotorPrecios:
+    """Calcula el total de los pedidos aplicando combos, descuentos e impuestos.
+    
+    Reglas, en este orden:
+      combos:     {"nombre", "productos": {producto: unidades}, "precio"}. Cada combo
+                  completo cobra su precio en vez de la suma de sus productos; las
+                  unidades usadas en un combo no reciben otros descuentos.
+      descuentos: {"nombre", "productos": [...] o null para todos, "porcentaje"}.
+                  A cada producto se le aplica el mayor porcentaje que le corresponda.
+      impuestos:  {"nombre", "porcentaje"} sobre el total con descuentos.
+    Los montos se redondean a pesos enteros por producto (descuentos) y por
+    impuesto. `cotizar_lote` aplica las mismas reglas a miles de pedidos de una
+    vez con arreglos de NumPy si está instalado."""
+    
+    def __init__(self, combos: List[Dict] = (), descuentos: List[Dict] = (), impuestos: List[Dict] = ()):
+        self.combos = list(combos)
+        self.descuentos = list(descuentos)
+        self.impuestos = list(impuestos)
+        # Mayor porcentaje de descuento por producto; None = aplica a todos
+        self.porcentajes = {}
+        self.porcentaje_general = 0
+        for descuento in self.descuentos:
+            if descuento.get("productos") is None:
+                self.porcentaje_general = max(self.porcentaje_general, descuento["porcentaje"])
+            else:
+                for producto in descuento["productos"]:
+                    self.porcentajes[producto] = max(self.porcentajes.get(producto, 0), descuento["porcentaje"])
+    
+    @classmethod
+    def desde_archivo(cls, ruta: str = "promociones.json") -> "MotorPrecios":
+        """Lee las reglas de un archivo JSON; si no existe no hay promociones"""
+        if not os.path.exists(ruta):
+            return cls()
+        with open(ruta, 'r', encoding='utf-8') as f:
+            datos = json.load(f)
+        return cls(datos.get("combos", []), datos.get("descuentos", []), datos.get("impuestos", []))
+    
+    @property
+    def sin_reglas(self) -> bool:
+        return not (self.combos or self.descuentos or self.impuestos)
+    
+    def porcentaje(self, producto: str):
+        return max(self.porcentajes.get(producto, 0), self.porcentaje_general)
+    
+    def cotizar(self, pedido: Dict, subtotal: int = None) -> Dict:
+        """Cotiza un pedido {producto: {precio, cantidad}}.
+        Devuelve subtotal, combos aplicados, descuento, impuestos y total."""
+        if subtotal is None:
+            subtotal = sum(info['precio'] * info['cantidad'] for info in pedido.values())
+        cotizacion = {"subtotal": subtotal, "combos": {}, "descuento": 0, "impuestos": {}, "total": subtotal}
+        if self.sin_reglas:
+            return cotizacion
+        
+        restante = {producto: info['cantidad'] for producto, info in pedido.items()}
+        descuento = 0
+        for combo in self.combos:
+            componentes = combo["productos"]
+            veces = min(restante.get(producto, 0) // unidades for producto, unidades in componentes.items())
+            ahorro = sum(pedido[producto]['precio'] * unidades for producto, unidades in componentes.items()
+                         if producto in pedido) - combo["precio"]
+            if veces <= 0 or ahorro <= 0:
+                continue
+            for producto, unidades in componentes.items():
+                restante[producto] -= veces * unidades
+            cotizacion["combos"][combo["nombre"]] = veces
+            descuento += veces * ahorro
+        
+        for producto, cantidad in restante.items():
+            porcentaje = self.porcentaje(producto)
+            if cantidad and porcentaje:
+                descuento += round(cantidad * pedido[producto]['precio'] * porcentaje / 100)
+        
+        neto = subtotal - descuento
+        total = neto
+        for impuesto in self.impuestos:
+            monto = round(neto * impuesto["porcentaje"] / 100)
+            cotizacion["impuestos"][impuesto["nombre"]] = monto
+            total += monto
+        
+        cotizacion["descuento"] = descuento
+        cotizacion["total"] = total
+        return cotizacion
+    
+    def importes(self, pedido: Dict, cotizacion: Dict) -> Dict[str, int]:
+        """Lo cobrado por cada producto de un pedido ya cotizado: su precio de lista menos
+        su parte de los combos (repartida por precio de lista) y su descuento, más su parte
+        de los impuestos. Los importes suman el total de la cotización."""
+        importes = {producto: info['precio'] * info['cantidad'] for producto, info in pedido.items()}
+        if self.sin_reglas:
+            return importes
+        
+        restante = {producto: info['cantidad'] for producto, info in pedido.items()}
+        for combo in self.combos:
+            veces = cotizacion["combos"].get(combo["nombre"], 0)
+            if not veces:
+                continue
+            lista = {producto: pedido[producto]['precio'] * unidades for producto, unidades in combo["productos"].items()}
+            for producto, ahorro in repartir(veces * (sum(lista.values()) - combo["precio"]), lista).items():
+                importes[producto] -= ahorro
+            for producto, unidades in combo["productos"].items():
+                restante[producto] -= veces * unidades
+        
+        for producto, cantidad in restante.items():
+            porcentaje = self.porcentaje(producto)
+            if cantidad and porcentaje:
+                importes[producto] -= round(cantidad * pedido[producto]['precio'] * porcentaje / 100)
+        
+        impuestos = sum(cotizacion["impuestos"].values())
+        if impuestos:
+            for producto, monto in repartir(impuestos, importes).items():
+                importes[producto] += monto
+        return importes
+    
+    def cotizar_lote(self, pedidos: List[Dict], precios: Dict[str, int]) -> List[Dict]:
+        """Cotiza muchos pedidos {producto: cantidad} con los precios dados.
+        Mismo resultado que llamar a cotizar para cada pedido."""
+        if np is None:
+            return [self.cotizar({producto: {"precio": precios[producto], "cantidad": cantidad}
+                                  for producto, cantidad in pedido.items()}) for pedido in pedidos]
+        
+        # Cada línea de pedido como (fila, producto, cantidad)
+        columnas = {}
+        filas, productos, cantidades = [], [], []
+        for fila, pedido in enumerate(pedidos):
+            for producto, cantidad in pedido.items():
+                filas.append(fila)
+                productos.append(columnas.setdefault(producto, len(columnas)))
+                cantidades.append(cantidad)
+        nombres = list(columnas)
+        filas = np.asarray(filas, dtype=np.int64)
+        productos = np.asarray(productos, dtype=np.int64)
+        cantidades = np.asarray(cantidades, dtype=np.int64)
+        lista_precios = np.asarray([precios[nombre] for nombre in nombres], dtype=np.int64)
+        n = len(pedidos)
+        
+        subtotal = np.zeros(n, dtype=np.int64)
+        np.add.at(subtotal, filas, cantidades * lista_precios[productos])
+        descuento = np.zeros(n, dtype=np.int64)
+        veces_combos = {}
+        
+        # Solo los productos con promoción necesitan una matriz pedidos x producto
+        promocionados = [nombre for nombre in nombres
+                         if self.porcentaje(nombre) or any(nombre in combo["productos"] for combo in self.combos)]
+        if promocionados:
+            indice = {nombre: j for j, nombre in enumerate(promocionados)}
+            a_columna = np.full(len(nombres), -1, dtype=np.int64)
+            for nombre, j in indice.items():
+                a_columna[columnas[nombre]] = j
+            en_promo = a_columna[productos] >= 0
+            restante = np.zeros((n, len(promocionados)), dtype=np.int64)
+            np.add.at(restante, (filas[en_promo], a_columna[productos[en_promo]]), cantidades[en_promo])
+            precio_promo = lista_precios[[columnas[nombre] for nombre in promocionados]]
+            
+            for combo in self.combos:
+                componentes = combo["productos"]
+                if not all(producto in indice for producto in componentes):
+                    continue
+                ahorro = sum(precios[producto] * unidades for producto, unidades in componentes.items()) - combo["precio"]
+                if ahorro <= 0:
+                    continue
+                veces = np.min(np.stack([restante[:, indice[producto]] // unidades
+                                         for producto, unidades in componentes.items()]), axis=0)
+                for producto, unidades in componentes.items():
+                    restante[:, indice[producto]] -= veces * unidades
+                descuento += veces * ahorro
+                veces_combos[combo["nombre"]] = veces
+            
+            porcentajes = np.asarray([self.porcentaje(nombre) for nombre in promocionados], dtype=np.float64)
+            descuento += np.rint(restante * precio_promo * porcentajes / 100).astype(np.int64).sum(axis=1)
+        
+        neto = subtotal - descuento
+        total = neto.copy()
+        impuestos = {}
+        for impuesto in self.impuestos:
+            monto = np.rint(neto * impuesto["porcentaje"] / 100).astype(np.int64)
+            impuestos[impuesto["nombre"]] = monto
+            total += monto
+        
+        resultado = []
+        for i in range(n):
+            resultado.append({
+                "subtotal": int(subtotal[i]),
+                "combos": {nombre: int(veces[i]) for nombre, veces in veces_combos.items() if veces[i]},
+                "descuento": int(descuento[i]),
+                "impuestos": {nombre: int(monto[i]) for nombre, monto in impuestos.items()},
+                "total": int(total[i]),
+            })
+        return resultado
+
+def normalizar(texto: str) -> List[str]:
+    """Palabras del texto en minúsculas y sin tildes ("Té Verde" -> ["te", "verde"])"""
+    if not texto.isascii():
+        texto = "".join(c for c in unicodedata.normalize("NFKD", texto) if not unicodedata.combining(c))
+    return PALABRA.findall(texto.casefold())
+
+def distancia_edicion(a: str, b: str, maximo: int) -> int:
+    """Distancia de Levenshtein entre a y b; devuelve maximo + 1 si la supera"""
+    if abs(len(a) - len(b)) > maximo:
+        return maximo + 1
+    anterior = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        actual = [i]
+        for j, cb in enumerate(b, 1):
+            actual.append(min(anterior[j] + 1, actual[j - 1] + 1, anterior[j - 1] + (ca != cb)))
+        if min(actual) > maximo:
+            return maximo + 1
+        anterior = actual
+    return anterior[-1]
+
+class IndiceNombres:
+    """Índice de prefijos de los nombres del menú para buscar productos por texto.
+    
+    Mantiene dos arreglos ordenados: los nombres normalizados completos y cada
+    palabra de cada nombre, con el producto al que pertenecen en un arreglo
+    paralelo. Lo que empieza como la búsqueda se encuentra con un bisect sobre los
+    nombres; el resto se completa recorriendo el rango (también por bisect) de la
+    palabra menos frecuente y filtrando por las demás. Si nada coincide, cada
+    palabra desconocida se cambia por la más parecida del vocabulario."""
+    
+    def __init__(self, productos=()):
+        self.reconstruir(productos)
+    
+    def reconstruir(self, productos):
+        self.palabras = {producto: normalizar(producto) for producto in productos}
+        nombres = [(" ".join(palabras), producto) for producto, palabras in self.palabras.items()]
+        nombres.sort(key=lambda par: par[0])
+        self.nombres = [nombre for nombre, _ in nombres]
+        self.productos_nombre = [producto for _, producto in nombres]
+        
+        entradas = [(palabra, producto) for producto, palabras in self.palabras.items() for palabra in set(palabras)]
+        entradas.sort(key=lambda par: par[0])
+        self.claves = [palabra for palabra, _ in entradas]
+        self.productos_clave = [producto for _, producto in entradas]
+        
+        self.vocabulario = {}  # palabra sin dígitos -> cantidad de productos que la usan
+        for palabra in self.claves:
+            if palabra.isalpha():
+                self.vocabulario[palabra] = self.vocabulario.get(palabra, 0) + 1
+    
+    @staticmethod
+    def insertar(claves: List[str], productos: List[str], clave: str, producto: str):
+        i = bisect.bisect_right(claves, clave)
+        claves.insert(i, clave)
+        productos.insert(i, producto)
+    
+    @staticmethod
+    def borrar(claves: List[str], productos: List[str], clave: str, producto: str):
+        i = bisect.bisect_left(claves, clave)
+        while i < len(claves) and claves[i] == clave:
+            if productos[i] == producto:
+                del claves[i]
+                del productos[i]
+                return
+            i += 1
+    
+    def agregar(self, producto: str):
+        if producto in self.palabras:
+            return
+        palabras = self.palabras[producto] = normalizar(producto)
+        self.insertar(self.nombres, self.productos_nombre, " ".join(palabras), producto)
+        for palabra in set(palabras):
+            self.insertar(self.claves, self.productos_clave, palabra, producto)
+            if palabra.isalpha():
+                self.vocabulario[palabra] = self.vocabulario.get(palabra, 0) + 1
+    
+    def quitar(self, producto: str):
+        if producto not in self.palabras:
+            return
+        palabras = self.palabras.pop(producto)
+        self.borrar(self.nombres, self.productos_nombre, " ".join(palabras), producto)
+        for palabra in set(palabras):
+            self.borrar(self.claves, self.productos_clave, palabra, producto)
+            if palabra in self.vocabulario:
+                self.vocabulario[palabra] -= 1
+                if not self.vocabulario[palabra]:
+                    del self.vocabulario[palabra]
+    
+    @staticmethod
+    def rango(claves: List[str], prefijo: str) -> range:
+        """Posiciones de un arreglo ordenado cuyas claves empiezan con el prefijo"""
+        inicio = bisect.bisect_left(claves, prefijo)
+        return range(inicio, bisect.bisect_left(claves, prefijo + "\U0010ffff", inicio))
+    
+    def coincidencias(self, consulta: List[str], limite: int) -> List[str]:
+        # Primero los nombres que empiezan como la búsqueda
+        resultados = [self.productos_nombre[i] for i in self.rango(self.nombres, " ".join(consulta))[:limite]]
+        if len(resultados) >= limite:
+            return resultados
+        
+        vistos = set(resultados)
+        rangos = sorted(((self.rango(self.claves, palabra), palabra) for palabra in consulta),
+                        key=lambda par: len(par[0]))
+        menor, resto = rangos[0][0], [palabra for _, palabra in rangos[1:]]
+        for i in menor:
+            producto = self.productos_clave[i]
+            if producto in vistos:
+                continue
+            vistos.add(producto)
+            palabras = self.palabras[producto]
+            if all(any(p.startswith(q) for p in palabras) for q in resto):
+                resultados.append(producto)
+                if len(resultados) >= limite:
+                    break
+        return resultados
+    
+    def corregir(self, palabra: str) -> Optional[str]:
+        """La palabra del vocabulario más parecida a una mal escrita (o None).
+        También compara con el inicio de palabras más largas ("capuchi" ~ "cappuccino")."""
+        maximo = 1 if len(palabra) <= 4 else 2
+        mejor = None
+        for conocida, usos in self.vocabulario.items():
+            if len(conocida) < len(palabra) - maximo:
+                continue
+            distancia = distancia_edicion(palabra, conocida, maximo)
+            if distancia > maximo and len(conocida) > len(palabra):
+                distancia = distancia_edicion(palabra, conocida[:len(palabra)], maximo)
+            if distancia <= maximo and (mejor is None or (distancia, -usos) < mejor[:2]):
+                mejor = (distancia, -usos, conocida)
+        return mejor[2] if mejor else None
+    
+    def buscar(self, texto: str, limite: int = 20) -> List[str]:
+        """Productos cuyo nombre tiene palabras que empiezan con las del texto"""
+        consulta = normalizar(texto)
+        if not consulta:
+            return []
+        resultados = self.coincidencias(consulta, limite)
+        if resultados:
+            return resultados
+        
+        # Tolerancia a errores de tipeo
+        corregida = []
+        for palabra in consulta:
+            if not self.rango(self.claves, palabra):
+                palabra = self.corregir(palabra)
+                if palabra is None:
+                    return []
+            corregida.append(palabra)
+        return self.coincidencias(corregida, limite)
+
+class ColaCocina:
+    """Preparación de los pedidos confirmados.
+    
+    Los pedidos entran a una cola por prioridad (menor primero; a igual prioridad,
+    por orden de llegada) y un grupo de estaciones (hilos) los prepara de a uno.
+    Un pedido tarda la suma de los tiempos de preparación de sus productos por su
+    cantidad; `escala` acelera la simulación (0 = sin esperar) y los tiempos que se
+    informan siguen en segundos de cocina. Lleva la profundidad de la cola, la
+    espera hasta que una estación toma el pedido y los pedidos terminados, para
+    dimensionar el personal y ver la cola en horas pico."""
+    
+    URGENTE, NORMAL = 0, 1
+    # Segundos de preparación por unidad de los productos sin tiempo propio
+    TIEMPO_POR_DEFECTO = 60.0
+    # Esperas y duraciones recientes que se guardan para los percentiles
+    MUESTRAS = 10000
+    
+    def __init__(self, estaciones: int = 2, tiempos: Dict[str, float] = None,
+                 tiempo_por_defecto: float = TIEMPO_POR_DEFECTO, escala: float = 1.0,
+                 reloj: Callable[[], float] = time.monotonic):
+        if estaciones < 1:
+            raise ValueError("La cocina necesita al menos una estación")
+        self.tiempos = dict(tiempos or {})
+        self.tiempo_por_defecto = tiempo_por_defecto
+        self.escala = escala
+        self.reloj = reloj
+        self.cola = []  # heap de (prioridad, número, llegada, items)
+        self.numeros = itertools.count(1)
+        self.condicion = threading.Condition()
+        self.preparando = {}  # número -> estación
+        self.esperas = deque(maxlen=self.MUESTRAS)
+        self.demoras = deque(maxlen=self.MUESTRAS)  # desde que entra a la cola hasta que está listo
+        self.espera_total = 0.0
+        self.iniciados = 0
+        self.terminados = 0
+        self.profundidad_maxima = 0
+        self.inicio = reloj()
+        self.detenida = False
+        self.estaciones = [threading.Thread(target=self.trabajar, args=(numero,), daemon=True,
+                                            name=f"Estación {numero}") for numero in range(1, estaciones + 1)]
+        for estacion in self.estaciones:
+            estacion.start()
+    
+    @classmethod
+    def desde_archivo(cls, ruta: str = "cocina.json", estaciones: int = None, escala: float = 1.0) -> "ColaCocina":
+        """Lee estaciones y tiempos de preparación de un JSON
+        ({"estaciones": 2, "tiempo_por_defecto": 60, "tiempos": {producto: segundos}});
+        si no existe se usan los valores por defecto"""
+        datos = {}
+        if os.path.exists(ruta):
+            with open(ruta, 'r', encoding='utf-8') as f:
+                datos = json.load(f)
+        return cls(estaciones or datos.get("estaciones", 2), datos.get("tiempos"),
+                   datos.get("tiempo_por_defecto", cls.TIEMPO_POR_DEFECTO), escala)
+    
+    def tiempo_preparacion(self, items: Dict) -> float:
+        """Segundos de cocina que lleva preparar un pedido"""
+        return sum(self.tiempos.get(producto, self.tiempo_por_defecto) * info['cantidad']
+                   for producto, info in items.items())
+    
+    def encolar(self, items: Dict, prioridad: int = NORMAL) -> int:
+        """Manda un pedido confirmado a la cocina. Devuelve su número."""
+        with self.condicion:
+            numero = next(self.numeros)
+            heapq.heappush(self.cola, (prioridad, numero, self.reloj(), items))
+            self.profundidad_maxima = max(self.profundidad_maxima, len(self.cola))
+            self.condicion.notify()
+        return numero
+    
+    def pendientes_antes(self, numero: int) -> int:
+        """Pedidos en la cola que se prepararán antes que este"""
+        with self.condicion:
+            clave = next((entrada[:2] for entrada in self.cola if entrada[1] == numero), None)
+            return 0 if clave is None else sum(1 for entrada in self.cola if entrada[:2] < clave)
+    
+    def trabajar(self, estacion: int):
+        """Bucle de una estación: toma el pedido más prioritario y lo prepara"""
+        # Los tiempos medidos se pasan a segundos de cocina
+        factor = 1 / self.escala if self.escala else 1.0
+        while True:
+            with self.condicion:
+                while not self.cola and not self.detenida:
+                    self.condicion.wait()
+                if not self.cola:
+                    return
+                prioridad, numero, llegada, items = heapq.heappop(self.cola)
+                espera = (self.reloj() - llegada) * factor
+                self.esperas.append(espera)
+                self.espera_total += espera
+                self.iniciados += 1
+                self.preparando[numero] = estacion
+            
+            time.sleep(self.tiempo_preparacion(items) * self.escala)
+            
+            with self.condicion:
+                del self.preparando[numero]
+                self.demoras.append((self.reloj() - llegada) * factor)
+                self.terminados += 1
+                self.condicion.notify_all()
+    
+    def esperar(self, tiempo_maximo: float = None) -> bool:
+        """Espera a que la cocina quede vacía. Devuelve False si venció el tiempo."""
+        with self.condicion:
+            return self.condicion.wait_for(lambda: not self.cola and not self.preparando, tiempo_maximo)
+    
+    def detener(self):
+        """Termina lo que quede en la cola y detiene las estaciones"""
+        with self.condicion:
+            self.detenida = True
+            self.condicion.notify_all()
+        for estacion in self.estaciones:
+            estacion.join()
+    
+    @staticmethod
+    def percentiles(muestras) -> Dict:
+        ordenadas = sorted(muestras)
+        if not ordenadas:
+            return {"p50": 0.0, "p90": 0.0, "p99": 0.0, "max": 0.0}
+        n = len(ordenadas)
+        resultado = {f"p{int(q * 100)}": round(ordenadas[min(n - 1, int(q * n))], 3) for q in (0.50, 0.90, 0.99)}
+        resultado["max"] = round(ordenadas[-1], 3)
+        return resultado
+    
+    def estadisticas(self) -> Dict:
+        """Profundidad de la cola, esperas (segundos de cocina) y rendimiento"""
+        with self.condicion:
+            esperas, demoras = list(self.esperas), list(self.demoras)
+            datos = {"estaciones": len(self.estaciones), "en_cola": len(self.cola),
+                     "preparando": len(self.preparando), "profundidad_maxima": self.profundidad_maxima,
+                     "iniciados": self.iniciados, "terminados": self.terminados,
+                     "espera_total": round(self.espera_total, 3)}
+        minutos = (self.reloj() - self.inicio) / 60 / (self.escala or 1.0)
+        datos["pedidos_por_minuto"] = round(datos["terminados"] / minutos, 2) if minutos else None
+        datos["espera"] = self.percentiles(esperas)
+        datos["demora_total"] = self.percentiles(demoras)
+        return datos
+
+class Catalogo:
+    """Menú en memoria compartido por todos los roles de un proceso.
+    
+    Se carga una sola vez desde el almacenamiento; lo que cambia un rol (una venta,
+    un precio nuevo) lo ven de inmediato los demás, que se enteran de cada cambio
+    suscribiéndose. También lleva las reservas de stock de los pedidos en curso,
+    que se notifican como {"op": "reserva", "producto": ...}, las reglas de precios
+    (promociones e impuestos) y opcionalmente el historial donde se registra cada
+    venta confirmada y la cocina a la que pasan los pedidos confirmados."""
+    
+    def __init__(self, almacen: AlmacenMenu = None, ttl_reservas: float = LibroReservas.TTL,
+                 historial: HistorialVentas = None, precios: MotorPrecios = None, cocina: ColaCocina = None):
+        self.almacen = almacen if almacen else crear_almacen()
+        self.menu = self.almacen.cargar(menu_por_defecto())
+        self.reservas = LibroReservas(ttl_reservas)
+        self.historial = historial
+        self.precios = precios if precios else MotorPrecios()
+        self.cocina = cocina
+        # El índice de nombres se construye en la primera búsqueda
+        self.indice_nombres = None
+        self.almacen.suscribir(self.actualizar_indice)
+    
+    def suscribir(self, funcion: Callable[[Dict], None]):
+        """Registra una función que se llama con cada cambio aplicado al menú"""
+        self.almacen.suscribir(funcion)
+    
+    def notificar(self, cambio: Dict):
+        self.almacen.notificar(cambio)
+    
+    def disponible(self, producto: str) -> int:
+        """Stock del producto que no está reservado por ningún pedido"""
+        return self.menu[producto]['cantidad'] - self.reservas.reservado.get(producto, 0)
+    
+    def reservar(self, reserva_id: Optional[int], producto: str, cantidad: int) -> Optional[int]:
+        """Fija una reserva del producto en `cantidad` unidades (ver LibroReservas.fijar)"""
+        stock = self.menu[producto]['cantidad'] if producto in self.menu else 0
+        reserva_id = self.reservas.fijar(reserva_id, producto, cantidad, stock)
+        self.notificar({"op": "reserva", "producto": producto})
+        return reserva_id
+    
+    def liberar(self, reserva_id: Optional[int]):
+        producto = self.reservas.liberar(reserva_id)
+        if producto:
+            self.notificar({"op": "reserva", "producto": producto})
+    
+    def barrer_reservas(self):
+        """Devuelve al stock disponible lo de las reservas vencidas"""
+        for producto in self.reservas.barrer():
+            self.notificar({"op": "reserva", "producto": producto})
+    
+    def producto_por_id(self, producto_id: int) -> Optional[str]:
+        return self.almacen.producto_por_id(producto_id)
+    
+    def actualizar_indice(self, cambio: Dict):
+        """Mantiene el índice de nombres al agregar, quitar o recargar productos"""
+        if self.indice_nombres is None:
+            return
+        if cambio["op"] == "agregar":
+            self.indice_nombres.agregar(cambio["producto"])
+        elif cambio["op"] == "quitar":
+            self.indice_nombres.quitar(cambio["producto"])
+        elif cambio["op"] == "recarga":
+            self.indice_nombres.reconstruir(self.menu)
+    
+    def indexar_nombres(self):
+        """Construye el índice de nombres ahora en vez de en la primera búsqueda"""
+        if self.indice_nombres is None:
+            self.indice_nombres = IndiceNombres(self.menu)
+    
+    def buscar(self, texto: str, limite: int = 20) -> List[str]:
+        """Productos cuyo nombre coincide con el texto, sin importar tildes ni mayúsculas"""
+        self.indexar_nombres()
+        return self.indice_nombres.buscar(texto, limite)
+    
+    def registrar_cambio(self, cambio: Dict):
+        """Persiste y aplica un cambio del menú (ver AlmacenMenu.registrar_cambio)"""
+        self.almacen.registrar_cambio(cambio)
+    
+    def sincronizar(self):
+        """Trae los cambios que otros procesos dejaron en el almacenamiento"""
+        self.almacen.sincronizar()
+    
+    def guardar(self, menu: Dict = None):
+        self.almacen.guardar(menu)
+    
+    def cotizar_lote(self, pedidos: List[Dict]) -> List[Dict]:
+        """Cotiza pedidos {producto: cantidad} con los precios actuales del menú"""
+        return self.precios.cotizar_lote(pedidos, self.menu.columna('precio'))
+
+class OperacionInvalida(Exception):
+    """La operación pedida al motor no es válida (id inexistente, cantidad fuera de rango...)"""
+
+class LoteInvalido(OperacionInvalida):
+    """Una importación tiene filas inválidas; no se aplicó ninguna"""
+    # Errores incluidos en el mensaje (la lista completa queda en `errores`)
+    MAX_MENSAJE = 10
+    
+    def __init__(self, errores: List[str]):
+        self.errores = errores
+        detalle = "\n".join(errores[:self.MAX_MENSAJE])
+        if len(errores) > self.MAX_MENSAJE:
+            detalle += f"\n... y {len(errores) - self.MAX_MENSAJE} errores más"
+        super().__init__(f"{len(errores)} filas inválidas, no se importó nada:\n{detalle}")
+
+def entero_opcional(valor, campo: str) -> Optional[int]:
+    """Convierte un valor de importación a entero; vacío o ausente es None"""
+    if valor is None or (isinstance(valor, str) and not valor.strip()):
+        return None
+    if isinstance(valor, bool) or isinstance(valor, float) and not valor.is_integer():
+        raise ValueError(f"{campo} no es un número entero: {valor!r}")
+    try:
+        return int(valor)
+    except (TypeError, ValueError):
+        raise ValueError(f"{campo} no es un número entero: {valor!r}")
+
+class MotorCafeteria:
+    """Lógica de pedidos y de administración sin entrada ni salida por consola.
+    
+    Las operaciones devuelven su resultado o lanzan OperacionInvalida,
+    StockInsuficiente o ConflictoMenu con el mensaje para el usuario. La interfaz
+    de terminal, el modo por lotes y otros sistemas la usan por igual.
+    
+    Lo agregado al pedido queda reservado en el catálogo hasta confirmar, cancelar
+    o que venza la reserva; al confirmar se vuelve a reservar lo que haya vencido."""
+    
+    def __init__(self, catalogo: Catalogo):
+        self.catalogo = catalogo
+        self.menu = catalogo.menu
+        self.pedido = {}
+        self.reservas = {}  # producto -> id de su reserva en el catálogo
+        # Subtotal que se ajusta con cada cambio y cotización vigente del pedido
+        self.subtotal = 0
+        self.cotizacion_vigente = None
+    
+    def producto(self, producto_id: int) -> str:
+        """Nombre del producto con ese id; lanza OperacionInvalida si no existe"""
+        producto = self.catalogo.producto_por_id(producto_id)
+        if producto is None:
+            raise OperacionInvalida("ID de producto no válido")
+        return producto
+    
+    # --- Pedido ---
+    
+    def disponible_para_pedido(self, producto: str) -> int:
+        """Unidades que este pedido puede tener del producto: lo libre más lo que ya reservó"""
+        self.catalogo.barrer_reservas()
+        return self.catalogo.disponible(producto) + self.catalogo.reservas.cantidad(self.reservas.get(producto))
+    
+    def agregar_item(self, producto_id: int, cantidad: int) -> str:
+        """Agrega unidades de un producto al pedido y las reserva. Devuelve el nombre del producto."""
+        producto = self.producto(producto_id)
+        info = self.menu[producto]
+        disponible = self.disponible_para_pedido(producto)
+        
+        if disponible <= 0:
+            raise OperacionInvalida(f"{producto} no está disponible")
+        if cantidad <= 0:
+            raise OperacionInvalida("La cantidad debe ser mayor a 0")
+        
+        if producto in self.pedido:
+            nueva_cantidad = self.pedido[producto]['cantidad'] + cantidad
+            if nueva_cantidad > disponible:
+                raise OperacionInvalida(f"Cantidad total excede el stock disponible ({disponible})")
+            self.reservas[producto] = self.catalogo.reservar(self.reservas.get(producto), producto, nueva_cantidad)
+            self.pedido[producto]['cantidad'] = nueva_cantidad
+            self.ajustar_subtotal(producto, cantidad)
+        else:
+            if cantidad > disponible:
+                raise OperacionInvalida(f"Solo hay {disponible} unidades disponibles")
+            self.reservas[producto] = self.catalogo.reservar(self.reservas.get(producto), producto, cantidad)
+            self.pedido[producto] = {
+                'precio': info['precio'],
+                'cantidad': cantidad
+            }
+            self.ajustar_subtotal(producto, cantidad)
+        return producto
+    
+    def reducir_item(self, producto: str, cantidad: int) -> bool:
+        """Quita unidades de un producto del pedido. Devuelve True si el producto salió del pedido."""
+        if producto not in self.pedido:
+            raise OperacionInvalida("El producto no está en el pedido")
+        if cantidad <= 0:
+            raise OperacionInvalida("La cantidad debe ser mayor a 0")
+        
+        nueva_cantidad = self.pedido[producto]['cantidad'] - cantidad
+        if nueva_cantidad <= 0:
+            self.quitar_item(producto)
+            return True
+        # Reducir una reserva nunca falla por stock
+        self.reservas[producto] = self.catalogo.reservar(self.reservas.get(producto), producto, nueva_cantidad)
+        self.pedido[producto]['cantidad'] = nueva_cantidad
+        self.ajustar_subtotal(producto, -cantidad)
+        return False
+    
+    def quitar_item(self, producto: str):
+        """Quita un producto completo del pedido y libera su reserva"""
+        if producto not in self.pedido:
+            raise OperacionInvalida("El producto no está en el pedido")
+        self.ajustar_subtotal(producto, -self.pedido[producto]['cantidad'])
+        del self.pedido[producto]
+        self.catalogo.liberar(self.reservas.pop(producto, None))
+    
+    def ajustar_subtotal(self, producto: str, unidades: int):
+        """Suma (o resta) unidades del producto al subtotal e invalida la cotización"""
+        self.subtotal += self.pedido[producto]['precio'] * unidades
+        self.cotizacion_vigente = None
+    
+    def cotizacion(self) -> Dict:
+        """Subtotal, combos, descuento, impuestos y total del pedido (ver MotorPrecios)"""
+        if self.cotizacion_vigente is None:
+            self.cotizacion_vigente = self.catalogo.precios.cotizar(self.pedido, self.subtotal)
+        return self.cotizacion_vigente
+    
+    def total(self) -> int:
+        return self.cotizacion()["total"]
+    
+    def confirmar(self, prioridad: int = ColaCocina.NORMAL) -> Dict:
+        """Descuenta el inventario y cierra el pedido. Devuelve el ticket con items y total
+        (y su número en la cocina, si hay una, donde entra con esa prioridad).
+        Si el stock ya no alcanza lanza StockInsuficiente y el pedido se conserva."""
+        if not self.pedido:
+            raise OperacionInvalida("No hay productos en el pedido")
+        
+        # Las reservas vencidas se renuevan; si otro pedido tomó ese stock, falla aquí
+        self.catalogo.barrer_reservas()
+        for producto, info in self.pedido.items():
+            self.reservas[producto] = self.catalogo.reservar(self.reservas.get(producto), producto, info['cantidad'])
+        
+        items = {producto: info['cantidad'] for producto, info in self.pedido.items()}
+        self.catalogo.registrar_cambio({"op": "venta", "items": items})
+        
+        cotizacion = self.cotizacion()
+        ticket = {"items": self.pedido, "total": cotizacion["total"], "cotizacion": cotizacion}
+        if self.catalogo.historial is not None:
+            ticket["venta"] = self.catalogo.historial.registrar(
+                self.pedido, total=cotizacion["total"], importes=self.catalogo.precios.importes(self.pedido, cotizacion))
+        if self.catalogo.cocina is not None:
+            ticket["cocina"] = self.catalogo.cocina.encolar(self.pedido, prioridad)
+        self.descartar()
+        return ticket
+    
+    def cancelar(self):
+        """Descarta el pedido actual"""
+        if not self.pedido:
+            raise OperacionInvalida("No hay pedido que cancelar")
+        self.descartar()
+    
+    def descartar(self):
+        """Vacía el pedido y libera sus reservas (nunca falla)"""
+        for reserva_id in self.reservas.values():
+            self.catalogo.liberar(reserva_id)
+        self.reservas = {}
+        self.pedido = {}
+        self.subtotal = 0
+        self.cotizacion_vigente = None
+    
+    # --- Administración ---
+    
+    def agregar_producto(self, nombre: str, precio: int, cantidad: int) -> int:
+        """Agrega un producto nuevo al menú. Devuelve su id."""
+        if not nombre:
+            raise OperacionInvalida("El nombre no puede estar vacío")
+        if nombre in self.menu:
+            raise OperacionInvalida("El producto ya existe en el menú")
+        if precio <= 0 or cantidad < 0:
+            raise OperacionInvalida("El precio debe ser mayor a 0 y la cantidad no puede ser negativa")
+        
+        self.catalogo.registrar_cambio({"op": "agregar", "producto": nombre, "precio": precio, "cantidad": cantidad})
+        return self.menu[nombre]['id']
+    
+    def quitar_producto(self, producto_id: int) -> str:
+        """Quita un producto del menú. Devuelve su nombre."""
+        producto = self.producto(producto_id)
+        self.catalogo.registrar_cambio({"op": "quitar", "producto": producto})
+        return producto
+    
+    def modificar_precio(self, producto_id: int, precio: int) -> str:
+        """Cambia el precio de un producto. Devuelve su nombre."""
+        producto = self.producto(producto_id)
+        if precio <= 0:
+            raise OperacionInvalida("El precio debe ser mayor a 0")
+        self.catalogo.registrar_cambio({"op": "precio", "producto": producto, "precio": precio})
+        return producto
+    
+    def modificar_cantidad(self, producto_id: int, cantidad: int) -> str:
+        """Cambia la cantidad disponible de un producto. Devuelve su nombre."""
+        producto = self.producto(producto_id)
+        if cantidad < 0:
+            raise OperacionInvalida("La cantidad no puede ser negativa")
+        self.catalogo.registrar_cambio({"op": "cantidad", "producto": producto, "cantidad": cantidad})
+        return producto
+    
+    def importar(self, filas: List[Dict], progreso: Callable[[str, int, Optional[int]], None] = None) -> Dict:
+        """Aplica de una vez altas, cambios de precio/stock y bajas.
+        
+        Cada fila es {"producto", "precio", "cantidad", "accion"}: con accion
+        "eliminar" se quita el producto; si no, se agrega o se actualizan los
+        campos presentes. Todo el lote se valida antes de escribir y se guarda
+        en una sola operación: si alguna fila es inválida lanza LoteInvalido con
+        todos los errores y el menú no cambia. Devuelve cuántos productos se
+        agregaron, actualizaron, eliminaron y cuántos ya estaban al día."""
+        resumen = {"agregados": 0, "actualizados": 0, "eliminados": 0, "sin_cambios": 0}
+        cambios, errores, vistos = [], [], set()
+        total = len(filas)
+        
+        for numero, fila in enumerate(filas, 1):
+            try:
+                producto = str(fila.get("producto") or "").strip()
+                if not producto:
+                    raise ValueError("falta el nombre del producto")
+                if producto in vistos:
+                    raise ValueError(f"'{producto}' aparece más de una vez")
+                vistos.add(producto)
+                accion = str(fila.get("accion") or "").strip().lower()
+                
+                if accion == "eliminar":
+                    if producto not in self.menu:
+                        raise ValueError(f"'{producto}' no existe en el menú")
+                    cambios.append({"op": "quitar", "producto": producto})
+                    resumen["eliminados"] += 1
+                    continue
+                if accion not in ("", "actualizar"):
+                    raise ValueError(f"acción desconocida {accion!r} (use 'actualizar' o 'eliminar')")
+                
+                precio = entero_opcional(fila.get("precio"), "precio")
+                cantidad = entero_opcional(fila.get("cantidad"), "cantidad")
+                if precio is not None and precio <= 0:
+                    raise ValueError("el precio debe ser mayor a 0")
+                if cantidad is not None and cantidad < 0:
+                    raise ValueError("la cantidad no puede ser negativa")
+                
+                info = self.menu.get(producto)
+                if info is None:
+                    if precio is None or cantidad is None:
+                        raise ValueError(f"'{producto}' es nuevo y necesita precio y cantidad")
+                    cambios.append({"op": "agregar", "producto": producto, "precio": precio, "cantidad": cantidad})
+                    resumen["agregados"] += 1
+                    continue
+                
+                antes = len(cambios)
+                if precio is not None and precio != info['precio']:
+                    cambios.append({"op": "precio", "producto": producto, "precio": precio})
+                if cantidad is not None and cantidad != info['cantidad']:
+                    cambios.append({"op": "cantidad", "producto": producto, "cantidad": cantidad})
+                resumen["actualizados" if len(cambios) > antes else "sin_cambios"] += 1
+            except ValueError as e:
+                errores.append(f"Fila {fila.get('linea', numero)}: {e}")
+            finally:
+                if progreso and (numero % PASO_PROGRESO == 0 or numero == total):
+                    progreso("Validando", numero, total)
+        
+        if errores:
+            raise LoteInvalido(errores)
+        if cambios:
+            if progreso:
+                progreso("Guardando", 0, len(cambios))
+            self.catalogo.registrar_cambio({"op": "lote", "cambios": cambios})
+            if progreso:
+                progreso("Guardando", len(cambios), len(cambios))
+        return resumen
+
+class Cafeteria:
+    def __init__(self, catalogo: Catalogo = None):
+        self.catalogo = catalogo if catalogo else Catalogo()
+        self.menu = self.cargar_menu()
+        self.motor = MotorCafeteria(self.catalogo)
+        
+        # Caché del menú impreso: filas por producto y páginas completas.
+        # Se invalida solo con los cambios que notifica el catálogo.
+        self.filas_por_pagina = max(10, shutil.get_terminal_size((80, 30)).lines - 14)
+        self.pagina_menu = 0
+        self.filas_cache = {}
+        self.paginas_cache = {}
+        self.orden_menu = None
+        self.posiciones_menu = {}
+        self.catalogo.suscribir(self.invalidar_menu)
+        
+    def cargar_menu(self) -> Dict:
+        """Devuelve el menú del catálogo compartido (cargado una sola vez)"""
+        return self.catalogo.menu
+    
+    @property
+    def pedido(self) -> Dict:
+        """Pedido en curso (lo mantiene el motor)"""
+        return self.motor.pedido
     
     def menu_por_defecto(self) -> Dict:
         """Menú inicial por defecto"""
-        return {
-            "Café Americano": {"precio": 3500, "cantidad": 50},
-            "Café con Leche": {"precio": 4000, "cantidad": 40},
-            "Cappuccino": {"precio": 4500, "cantidad": 30},
-            "Latte": {"precio": 5000, "cantidad": 25},
-            "Espresso": {"precio": 3000, "cantidad": 60},
-            "Té Verde": {"precio": 3000, "cantidad": 20},
-            "Chocolate Caliente": {"precio": 4200, "cantidad": 15},
-            "Croissant": {"precio": 2800, "cantidad": 30},
-            "Muffin": {"precio": 3200, "cantidad": 20},
-            "Sandwich": {"precio": 6500, "cantidad": 15}
-        }
+        return menu_por_defecto()
     
     def guardar_menu(self, menu: Dict = None):
-        """Guarda el menú en un archivo JSON"""
-        menu_a_guardar = menu if menu else self.menu
-        with open(self.menu_file, 'w', encoding='utf-8') as f:
-            json.dump(menu_a_guardar, f, indent=4, ensure_ascii=False)
+        """Guarda el menú completo en el almacenamiento"""
+        self.catalogo.guardar(menu)
     
-    def mostrar_menu(self):
-        """Muestra el menú completo con precios"""
-        print("\n" + "="*50)
-        print("           MENÚ DE LA CAFETERÍA")
-        print("="*50)
-        print(f"{'ID':<3} {'PRODUCTO':<20} {'PRECIO':<10} {'DISPONIBLE'}")
-        print("-"*50)
+    def registrar_cambio(self, cambio: Dict):
+        """Persiste un cambio del menú (ver AlmacenMenu.registrar_cambio)"""
+        self.catalogo.registrar_cambio(cambio)
+    
+    def actualizar_desde_disco(self):
+        """Trae los cambios de otras terminales (ventas, precios, productos)"""
+        self.catalogo.sincronizar()
+    
+    def buscar_por_id(self, producto_id: int) -> Optional[str]:
+        """Devuelve el nombre del producto con ese id (estable aunque se borren otros)"""
+        return self.catalogo.producto_por_id(producto_id)
+    
+    def pedir_producto(self, mensaje: str = "\nIngrese el ID o el nombre del producto: ") -> Optional[int]:
+        """Lee el id de un producto; si se escribe texto, busca por nombre y deja
+        elegir entre los resultados. Devuelve None si la búsqueda no encontró nada."""
+        texto = input(mensaje).strip()
+        if texto.isdigit():
+            return int(texto)
+        
+        resultados = self.catalogo.buscar(texto)
+        if not resultados:
+            print(f"❌ No se encontraron productos para '{texto}'")
+            return None
+        if len(resultados) == 1:
+            return self.menu[resultados[0]]['id']
+        
+        lineas = [f"\n🔎 Resultados para '{texto}':"]
+        lineas.extend(self.fila_menu(producto) for producto in resultados)
+        sys.stdout.write("\n".join(lineas) + "\n")
+        return int(input("\nIngrese el ID del producto: "))
+    
+    def invalidar_menu(self, cambio: Dict):
+        """Descarta del caché solo lo que el cambio afecta"""
+        op = cambio["op"]
+        if op in ("agregar", "quitar", "recarga"):
+            # Cambia la lista de productos: se renumeran las páginas
+            self.orden_menu = None
+            self.paginas_cache.clear()
+            if op == "recarga":
+                self.filas_cache.clear()
+            else:
+                self.filas_cache.pop(cambio["producto"], None)
+            return
         
-        for i, (producto, info) in enumerate(self.menu.items(), 1):
+        productos = cambio["items"] if op == "venta" else (cambio["producto"],)
+        for producto in productos:
+            self.filas_cache.pop(producto, None)
+            if producto in self.posiciones_menu:
+                self.paginas_cache.pop(self.posiciones_menu[producto] // self.filas_por_pagina, None)
+    
+    def fila_menu(self, producto: str) -> str:
+        """Línea del menú para un producto (cacheada)"""
+        fila = self.filas_cache.get(producto)
+        if fila is None:
+            info = self.menu[producto]
             precio_formateado = f"${info['precio']:,}"
-            disponible = "Sí" if info['cantidad'] > 0 else "No"
-            print(f"{i:<3} {producto:<20} {precio_formateado:<10} {disponible}")
-        print("="*50)
+            disponible = "Sí" if self.catalogo.disponible(producto) > 0 else "No"
+            fila = f"{info['id']:<3} {producto:<20} {precio_formateado:<10} {disponible}"
+            self.filas_cache[producto] = fila
+        return fila
+    
+    def total_paginas_menu(self) -> int:
+        if self.orden_menu is None:
+            self.orden_menu = list(self.menu)
+            self.posiciones_menu = {producto: i for i, producto in enumerate(self.orden_menu)}
+        return max(1, -(-len(self.orden_menu) // self.filas_por_pagina))
+    
+    def mostrar_menu(self, pagina: int = None):
+        """Muestra una página del menú con precios en una sola escritura"""
+        self.catalogo.barrer_reservas()
+        total_paginas = self.total_paginas_menu()
+        if pagina is None:
+            pagina = self.pagina_menu
+        pagina = min(max(pagina, 0), total_paginas - 1)
+        self.pagina_menu = pagina
+        
+        texto = self.paginas_cache.get(pagina)
+        if texto is None:
+            inicio = pagina * self.filas_por_pagina
+            lineas = ["", "="*50, "           MENÚ DE LA CAFETERÍA", "="*50,
+                      f"{'ID':<3} {'PRODUCTO':<20} {'PRECIO':<10} {'DISPONIBLE'}", "-"*50]
+            lineas.extend(self.fila_menu(producto)
+                          for producto in self.orden_menu[inicio:inicio + self.filas_por_pagina])
+            lineas.append("="*50)
+            if total_paginas > 1:
+                lineas.append(f"Página {pagina + 1} de {total_paginas}")
+            texto = "\n".join(lineas) + "\n"
+            self.paginas_cache[pagina] = texto
+        
+        sys.stdout.write(texto)
+        sys.stdout.flush()
+    
+    def recorrer_menu(self):
+        """Muestra el menú página por página"""
+        pagina = 0
+        while True:
+            self.mostrar_menu(pagina)
+            if self.pagina_menu + 1 >= self.total_paginas_menu():
+                input("\nPresione Enter para continuar...")
+                return
+            if input("\nEnter: página siguiente, 0: salir ").strip() == "0":
+                return
+            pagina = self.pagina_menu + 1
     
     def realizar_pedido(self):
         """Proceso completo para realizar un pedido"""
         print("\n🛒 REALIZAR PEDIDO")
         
         while True:
+            self.actualizar_desde_disco()
             self.mostrar_menu()
             print("\nOpciones:")
             print("1. Agregar producto al pedido")
@@ -68,6 +2205,9 @@ class Cafeteria:
             print("3. Editar pedido")
             print("4. Finalizar pedido")
             print("5. Cancelar pedido")
+            if self.total_paginas_menu() > 1:
+                print("s. Página siguiente del menú")
+                print("a. Página anterior del menú")
             print("0. Volver al menú principal")
             
             opcion = input("\nSeleccione una opción: ").strip()
@@ -84,6 +2224,10 @@ class Cafeteria:
             elif opcion == "5":
                 if self.cancelar_pedido():
                     break
+            elif opcion.lower() == "s":
+                self.pagina_menu += 1
+            elif opcion.lower() == "a":
+                self.pagina_menu -= 1
             elif opcion == "0":
                 break
             else:
@@ -92,45 +2236,25 @@ class Cafeteria:
     def agregar_al_pedido(self):
         """Agregar un producto al pedido"""
         try:
-            producto_id = int(input("\nIngrese el ID del producto: ")) - 1
-            productos = list(self.menu.keys())
+            producto_id = self.pedir_producto()
+            if producto_id is None:
+                return
+            producto = self.motor.producto(producto_id)
+            info = self.menu[producto]
             
-            if 0 <= producto_id < len(productos):
-                producto = productos[producto_id]
-                info = self.menu[producto]
-                
-                if info['cantidad'] <= 0:
-                    print(f"❌ {producto} no está disponible")
-                    return
-                
-                print(f"Producto seleccionado: {producto} - ${info['precio']:,}")
-                cantidad = int(input("Cantidad deseada: "))
-                
-                if cantidad <= 0:
-                    print("❌ La cantidad debe ser mayor a 0")
-                    return
-                
-                if cantidad > info['cantidad']:
-                    print(f"❌ Solo hay {info['cantidad']} unidades disponibles")
-                    return
-                
-                if producto in self.pedido:
-                    nueva_cantidad = self.pedido[producto]['cantidad'] + cantidad
-                    if nueva_cantidad > info['cantidad']:
-                        print(f"❌ Cantidad total excede el stock disponible ({info['cantidad']})")
-                        return
-                    self.pedido[producto]['cantidad'] = nueva_cantidad
-                else:
-                    self.pedido[producto] = {
-                        'precio': info['precio'],
-                        'cantidad': cantidad
-                    }
-                
-                print(f"✅ {cantidad} {producto}(s) agregado(s) al pedido")
-            else:
-                print("❌ ID de producto no válido")
+            if self.motor.disponible_para_pedido(producto) <= 0:
+                print(f"❌ {producto} no está disponible")
+                return
+            
+            print(f"Producto seleccionado: {producto} - ${info['precio']:,}")
+            cantidad = int(input("Cantidad deseada: "))
+            
+            self.motor.agregar_item(producto_id, cantidad)
+            print(f"✅ {cantidad} {producto}(s) agregado(s) al pedido")
         except ValueError:
             print("❌ Por favor ingrese números válidos")
+        except (OperacionInvalida, ConflictoMenu) as e:
+            print(f"❌ {e}")
     
     def mostrar_pedido_actual(self):
         """Muestra el pedido actual"""
@@ -141,18 +2265,30 @@ class Cafeteria:
         print("\n" + "="*40)
         print("        TU PEDIDO ACTUAL")
         print("="*40)
-        total = 0
         
         for i, (producto, info) in enumerate(self.pedido.items(), 1):
             subtotal = info['precio'] * info['cantidad']
-            total += subtotal
             print(f"{i}. {producto}")
             print(f"   Cantidad: {info['cantidad']} x ${info['precio']:,} = ${subtotal:,}")
         
         print("-"*40)
-        print(f"TOTAL: ${total:,}")
+        self.imprimir_ajustes()
+        print(f"TOTAL: ${self.motor.total():,}")
         print("="*40)
     
+    def imprimir_ajustes(self):
+        """Imprime subtotal, combos, descuento e impuestos si alguna regla aplicó"""
+        cotizacion = self.motor.cotizacion()
+        if not (cotizacion["combos"] or cotizacion["descuento"] or cotizacion["impuestos"]):
+            return
+        print(f"Subtotal: ${cotizacion['subtotal']:,}")
+        for combo, veces in cotizacion["combos"].items():
+            print(f"  Combo {combo} x{veces}")
+        if cotizacion["descuento"]:
+            print(f"Descuentos: -${cotizacion['descuento']:,}")
+        for impuesto, monto in cotizacion["impuestos"].items():
+            print(f"{impuesto}: ${monto:,}")
+    
     def editar_pedido(self):
         """Permite editar el pedido actual"""
         if not self.pedido:
@@ -188,33 +2324,26 @@ class Cafeteria:
             
             if 0 <= producto_id < len(productos_pedido):
                 producto = productos_pedido[producto_id]
-                cantidad_actual = self.pedido[producto]['cantidad']
                 cantidad_cambio = int(input(f"Cantidad a {'agregar' if accion == 'agregar' else 'reducir'}: "))
                 
-                if cantidad_cambio <= 0:
-                    print("❌ La cantidad debe ser mayor a 0")
-                    return
-                
                 if accion == "agregar":
-                    nueva_cantidad = cantidad_actual + cantidad_cambio
-                    if nueva_cantidad > self.menu[producto]['cantidad']:
-                        print(f"❌ No hay suficiente stock. Disponible: {self.menu[producto]['cantidad']}")
+                    if producto not in self.menu:
+                        print(f"❌ {producto} ya no está en el menú")
                         return
-                    self.pedido[producto]['cantidad'] = nueva_cantidad
+                    self.motor.agregar_item(self.menu[producto]['id'], cantidad_cambio)
                     print(f"✅ Se agregaron {cantidad_cambio} unidades")
                 
                 else:  # reducir
-                    nueva_cantidad = cantidad_actual - cantidad_cambio
-                    if nueva_cantidad <= 0:
-                        del self.pedido[producto]
+                    if self.motor.reducir_item(producto, cantidad_cambio):
                         print(f"✅ {producto} removido del pedido")
                     else:
-                        self.pedido[producto]['cantidad'] = nueva_cantidad
                         print(f"✅ Se redujeron {cantidad_cambio} unidades")
             else:
                 print("❌ Número de producto no válido")
         except ValueError:
             print("❌ Por favor ingrese números válidos")
+        except (OperacionInvalida, ConflictoMenu) as e:
+            print(f"❌ {e}")
     
     def quitar_del_pedido(self):
         """Quita un producto completo del pedido"""
@@ -224,7 +2353,7 @@ class Cafeteria:
             
             if 0 <= producto_id < len(productos_pedido):
                 producto = productos_pedido[producto_id]
-                del self.pedido[producto]
+                self.motor.quitar_item(producto)
                 print(f"✅ {producto} removido del pedido")
             else:
                 print("❌ Número de producto no válido")
@@ -241,27 +2370,30 @@ class Cafeteria:
         print("           RESUMEN FINAL DEL PEDIDO")
         print("="*50)
         
-        total = 0
         for producto, info in self.pedido.items():
             subtotal = info['precio'] * info['cantidad']
-            total += subtotal
             print(f"{producto}")
             print(f"  Cantidad: {info['cantidad']} x ${info['precio']:,} = ${subtotal:,}")
         
         print("-"*50)
-        print(f"TOTAL A PAGAR: ${total:,}")
+        self.imprimir_ajustes()
+        print(f"TOTAL A PAGAR: ${self.motor.total():,}")
         print("="*50)
         
         confirmacion = input("\n¿Confirmar pedido? (s/n): ").strip().lower()
         
         if confirmacion == 's':
-            # Actualizar inventario
-            for producto, info in self.pedido.items():
-                self.menu[producto]['cantidad'] -= info['cantidad']
-            
-            self.guardar_menu()
+            try:
+                ticket = self.motor.confirmar()
+            except StockInsuficiente as e:
+                # Otra terminal vendió antes: el pedido se conserva para editarlo
+                print(f"❌ {e}")
+                print("Edite su pedido e intente de nuevo")
+                return False
             print("✅ ¡Pedido confirmado! Gracias por su compra")
-            self.pedido = {}
+            if "cocina" in ticket:
+                antes = self.catalogo.cocina.pendientes_antes(ticket["cocina"])
+                print(f"🍳 Pedido #{ticket['cocina']} enviado a cocina ({antes} pedidos antes que el suyo)")
             input("\nPresione Enter para continuar...")
             return True
         else:
@@ -277,7 +2409,7 @@ class Cafeteria:
         confirmacion = input("\n¿Está seguro de cancelar el pedido? (s/n): ").strip().lower()
         
         if confirmacion == 's':
-            self.pedido = {}
+            self.motor.cancelar()
             print("✅ Pedido cancelado")
             return True
         else:
@@ -285,12 +2417,13 @@ class Cafeteria:
             return False
 
 class AdminCafeteria(Cafeteria):
-    def __init__(self):
-        super().__init__()
+    def __init__(self, catalogo: Catalogo = None):
+        super().__init__(catalogo)
     
     def menu_administrador(self):
         """Menú principal del administrador"""
         while True:
+            self.actualizar_desde_disco()
             print("\n" + "="*40)
             print("      PANEL DE ADMINISTRADOR")
             print("="*40)
@@ -299,13 +2432,16 @@ class AdminCafeteria(Cafeteria):
             print("3. Quitar producto")
             print("4. Modificar precio")
             print("5. Modificar cantidad disponible")
+            print("6. Reportes de ventas")
+            print("7. Importar productos (CSV/JSON)")
+            print("8. Exportar menú (CSV/JSON)")
+            print("9. Estado de la cocina")
             print("0. Volver al menú principal")
             
             opcion = input("\nSeleccione una opción: ").strip()
             
             if opcion == "1":
-                self.mostrar_menu()
-                input("\nPresione Enter para continuar...")
+                self.recorrer_menu()
             elif opcion == "2":
                 self.agregar_producto()
             elif opcion == "3":
@@ -314,11 +2450,70 @@ class AdminCafeteria(Cafeteria):
                 self.modificar_precio()
             elif opcion == "5":
                 self.modificar_cantidad()
+            elif opcion == "6":
+                self.reportes_ventas()
+            elif opcion == "7":
+                self.importar_productos()
+            elif opcion == "8":
+                self.exportar_menu()
+            elif opcion == "9":
+                self.estado_cocina()
             elif opcion == "0":
                 break
             else:
                 print("❌ Opción no válida")
     
+    def reportes_ventas(self):
+        """Reportes de ventas a partir de los resúmenes del historial"""
+        historial = self.catalogo.historial
+        if historial is None:
+            print("❌ El historial de ventas no está habilitado")
+            return
+        
+        while True:
+            print("\n" + "="*40)
+            print("        REPORTES DE VENTAS")
+            print("="*40)
+            print("1. Ventas de hoy por hora")
+            print("2. Ventas de los últimos 30 días")
+            print("3. Más vendidos (últimos 7 días)")
+            print("4. Más vendidos (histórico)")
+            print("0. Volver")
+            
+            opcion = input("\nSeleccione una opción: ").strip()
+            hoy = date.today()
+            
+            if opcion == "1":
+                self.imprimir_reporte("HORA", historial.ventas_por_hora(hoy.isoformat()))
+            elif opcion == "2":
+                desde = (hoy - timedelta(days=29)).isoformat()
+                self.imprimir_reporte("DÍA", historial.ventas_por_dia(desde, hoy.isoformat()))
+            elif opcion == "3":
+                desde = (hoy - timedelta(days=6)).isoformat()
+                self.imprimir_reporte("PRODUCTO", historial.mas_vendidos(10, desde, hoy.isoformat()))
+            elif opcion == "4":
+                self.imprimir_reporte("PRODUCTO", historial.mas_vendidos(10))
+            elif opcion == "0":
+                break
+            else:
+                print("❌ Opción no válida")
+    
+    def imprimir_reporte(self, titulo: str, filas: List):
+        """Imprime filas (clave, unidades, ingresos) con su total"""
+        if not filas:
+            print("\n📝 No hay ventas en el período")
+            return
+        
+        lineas = ["", "="*50, f"{titulo:<22} {'UNIDADES':>10} {'INGRESOS':>15}", "-"*50]
+        for clave, unidades, ingresos in filas:
+            lineas.append(f"{str(clave):<22} {unidades:>10} {'$' + format(ingresos, ','):>15}")
+        lineas.append("-"*50)
+        total = f"${sum(fila[2] for fila in filas):,}"
+        lineas.append(f"{'TOTAL':<22} {sum(fila[1] for fila in filas):>10} {total:>15}")
+        lineas.append("="*50)
+        print("\n".join(lineas))
+        input("\nPresione Enter para continuar...")
+    
     def agregar_producto(self):
         """Agrega un nuevo producto al menú"""
         nombre = input("\nNombre del nuevo producto: ").strip()
@@ -335,101 +2530,361 @@ class AdminCafeteria(Cafeteria):
             precio = int(input("Precio del producto: $"))
             cantidad = int(input("Cantidad inicial: "))
             
-            if precio <= 0 or cantidad < 0:
-                print("❌ El precio debe ser mayor a 0 y la cantidad no puede ser negativa")
-                return
-            
-            self.menu[nombre] = {"precio": precio, "cantidad": cantidad}
-            self.guardar_menu()
+            self.motor.agregar_producto(nombre, precio, cantidad)
             print(f"✅ Producto '{nombre}' agregado exitosamente")
             
         except ValueError:
             print("❌ Por favor ingrese números válidos")
+        except (OperacionInvalida, ConflictoMenu) as e:
+            print(f"❌ {e}")
     
     def quitar_producto(self):
         """Quita un producto del menú"""
         self.mostrar_menu()
         
         try:
-            producto_id = int(input("\nIngrese el ID del producto a quitar: ")) - 1
-            productos = list(self.menu.keys())
+            producto_id = self.pedir_producto("\nIngrese el ID o el nombre del producto a quitar: ")
+            if producto_id is None:
+                return
+            producto = self.motor.producto(producto_id)
+            confirmacion = input(f"¿Está seguro de quitar '{producto}'? (s/n): ").strip().lower()
             
-            if 0 <= producto_id < len(productos):
-                producto = productos[producto_id]
-                confirmacion = input(f"¿Está seguro de quitar '{producto}'? (s/n): ").strip().lower()
-                
-                if confirmacion == 's':
-                    del self.menu[producto]
-                    self.guardar_menu()
-                    print(f"✅ Producto '{producto}' eliminado")
-                else:
-                    print("❌ Operación cancelada")
+            if confirmacion == 's':
+                self.motor.quitar_producto(producto_id)
+                print(f"✅ Producto '{producto}' eliminado")
             else:
-                print("❌ ID de producto no válido")
+                print("❌ Operación cancelada")
                 
         except ValueError:
             print("❌ Por favor ingrese un número válido")
+        except (OperacionInvalida, ConflictoMenu) as e:
+            print(f"❌ {e}")
     
     def modificar_precio(self):
         """Modifica el precio de un producto"""
         self.mostrar_menu()
         
         try:
-            producto_id = int(input("\nIngrese el ID del producto: ")) - 1
-            productos = list(self.menu.keys())
+            producto_id = self.pedir_producto()
+            if producto_id is None:
+                return
+            producto = self.motor.producto(producto_id)
+            precio_actual = self.menu[producto]['precio']
+            print(f"Precio actual de '{producto}': ${precio_actual:,}")
             
-            if 0 <= producto_id < len(productos):
-                producto = productos[producto_id]
-                precio_actual = self.menu[producto]['precio']
-                print(f"Precio actual de '{producto}': ${precio_actual:,}")
-                
-                nuevo_precio = int(input("Nuevo precio: $"))
-                
-                if nuevo_precio <= 0:
-                    print("❌ El precio debe ser mayor a 0")
-                    return
-                
-                self.menu[producto]['precio'] = nuevo_precio
-                self.guardar_menu()
-                print(f"✅ Precio de '{producto}' actualizado a ${nuevo_precio:,}")
-            else:
-                print("❌ ID de producto no válido")
+            nuevo_precio = int(input("Nuevo precio: $"))
+            
+            self.motor.modificar_precio(producto_id, nuevo_precio)
+            print(f"✅ Precio de '{producto}' actualizado a ${nuevo_precio:,}")
                 
         except ValueError:
             print("❌ Por favor ingrese números válidos")
+        except (OperacionInvalida, ConflictoMenu) as e:
+            print(f"❌ {e}")
     
     def modificar_cantidad(self):
         """Modifica la cantidad disponible de un producto"""
         self.mostrar_menu()
         
         try:
-            producto_id = int(input("\nIngrese el ID del producto: ")) - 1
-            productos = list(self.menu.keys())
+            producto_id = self.pedir_producto()
+            if producto_id is None:
+                return
+            producto = self.motor.producto(producto_id)
+            cantidad_actual = self.menu[producto]['cantidad']
+            print(f"Cantidad actual de '{producto}': {cantidad_actual}")
             
-            if 0 <= producto_id < len(productos):
-                producto = productos[producto_id]
-                cantidad_actual = self.menu[producto]['cantidad']
-                print(f"Cantidad actual de '{producto}': {cantidad_actual}")
-                
-                nueva_cantidad = int(input("Nueva cantidad: "))
-                
-                if nueva_cantidad < 0:
-                    print("❌ La cantidad no puede ser negativa")
-                    return
-                
-                self.menu[producto]['cantidad'] = nueva_cantidad
-                self.guardar_menu()
-                print(f"✅ Cantidad de '{producto}' actualizada a {nueva_cantidad}")
-            else:
-                print("❌ ID de producto no válido")
+            nueva_cantidad = int(input("Nueva cantidad: "))
+            
+            self.motor.modificar_cantidad(producto_id, nueva_cantidad)
+            print(f"✅ Cantidad de '{producto}' actualizada a {nueva_cantidad}")
                 
         except ValueError:
             print("❌ Por favor ingrese números válidos")
+        except (OperacionInvalida, ConflictoMenu) as e:
+            print(f"❌ {e}")
+    
+    def estado_cocina(self):
+        """Cola de preparación: pedidos pendientes, esperas y rendimiento"""
+        cocina = self.catalogo.cocina
+        if cocina is None:
+            print("❌ La cola de cocina no está habilitada")
+            return
+        
+        datos = cocina.estadisticas()
+        lineas = ["", "="*50, "           ESTADO DE LA COCINA", "="*50,
+                  f"Estaciones:            {datos['estaciones']}",
+                  f"En cola / preparando:  {datos['en_cola']} / {datos['preparando']}",
+                  f"Cola máxima:           {datos['profundidad_maxima']}",
+                  f"Pedidos terminados:    {datos['terminados']}",
+                  f"Pedidos por minuto:    {datos['pedidos_por_minuto']}", "-"*50,
+                  f"{'SEGUNDOS':<22} {'p50':>8} {'p90':>8} {'p99':>8}"]
+        for titulo, clave in (("Espera en cola", "espera"), ("Hasta estar listo", "demora_total")):
+            valores = datos[clave]
+            lineas.append(f"{titulo:<22} {valores['p50']:>8} {valores['p90']:>8} {valores['p99']:>8}")
+        lineas.append("="*50)
+        print("\n".join(lineas))
+        input("\nPresione Enter para continuar...")
+    
+    def importar_productos(self):
+        """Agrega, actualiza o elimina productos desde un archivo; todo o nada"""
+        print("\nColumnas: producto, precio, cantidad y opcionalmente accion ('eliminar').")
+        print("Los campos vacíos de un producto existente no se modifican.")
+        ruta = input("Archivo a importar (CSV o JSON): ").strip()
+        if not ruta:
+            return
+        
+        try:
+            filas = leer_importacion(ruta, mostrar_progreso)
+            resumen = self.motor.importar(filas, mostrar_progreso)
+            print(f"✅ Importación completa: {resumen['agregados']} agregados, {resumen['actualizados']} actualizados, "
+                  f"{resumen['eliminados']} eliminados, {resumen['sin_cambios']} sin cambios")
+        except (OSError, ValueError, csv.Error) as e:
+            print(f"❌ No se pudo leer el archivo: {e}")
+        except (OperacionInvalida, ConflictoMenu) as e:
+            print(f"❌ {e}")
+    
+    def exportar_menu(self):
+        """Guarda el menú actual en un CSV o JSON que luego se puede importar"""
+        ruta = input("\nArchivo de destino (.csv o .json): ").strip()
+        if not ruta:
+            return
+        try:
+            total = exportar_menu(self.menu, ruta, mostrar_progreso)
+            print(f"✅ {total} productos exportados a {ruta}")
+        except OSError as e:
+            print(f"❌ No se pudo escribir el archivo: {e}")
+
+class Metricas:
+    """Instrumentación opcional: tiempos por método y contadores del servicio.
+    
+    Apagada no cuesta nada: `instrumentar` reemplaza los métodos de las clases por
+    versiones cronometradas y `desinstrumentar` devuelve los originales. Los métodos
+    interactivos de la terminal se miden a través del motor al que delegan, para no
+    contar el tiempo que el usuario tarda en escribir. Las métricas se exportan en
+    el formato de texto de Prometheus, a un archivo o por HTTP en /metrics."""
+    
+    METODOS = {
+        Catalogo: ("sincronizar", "registrar_cambio", "guardar", "cotizar_lote"),
+        MotorCafeteria: ("agregar_item", "reducir_item", "quitar_item", "cotizacion", "confirmar", "cancelar",
+                         "agregar_producto", "quitar_producto", "modificar_precio", "modificar_cantidad"),
+        Cafeteria: ("cargar_menu", "mostrar_menu", "guardar_menu", "actualizar_desde_disco"),
+        ColaCocina: ("encolar",),
+    }
+    CONTADORES = {
+        "pedidos_confirmados": "Pedidos confirmados",
+        "pedidos_cancelados": "Pedidos cancelados por el cliente",
+        "pedidos_sin_stock": "Pedidos que no se pudieron confirmar por falta de stock",
+        "productos_agotados": "Veces que una venta dejó un producto sin stock",
+        "menu_bytes_escritos": "Bytes escritos a disco por el menú (diario y snapshots)",
+    }
+    # Límites (en segundos) de los tramos del histograma de duraciones
+    TRAMOS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+    
+    def __init__(self):
+        self.contadores = dict.fromkeys(self.CONTADORES, 0)
+        self.tiempos = {}  # "Clase.metodo" -> [conteo por tramo..., suma]
+        self.originales = {}
+        self.candado = threading.Lock()
+        # Colas de cocina que recibieron pedidos -> número con que se etiquetan
+        self.cocinas = weakref.WeakKeyDictionary()
+        self.cocinas_vistas = 0
+    
+    def contar(self, nombre: str, valor: int = 1):
+        with self.candado:
+            self.contadores[nombre] += valor
+    
+    def registrar_cocina(self, cocina: ColaCocina):
+        with self.candado:
+            if cocina not in self.cocinas:
+                self.cocinas_vistas += 1
+                self.cocinas[cocina] = self.cocinas_vistas
+    
+    def observar(self, metodo: str, segundos: float):
+        with self.candado:
+            tiempos = self.tiempos.get(metodo)
+            if tiempos is None:
+                tiempos = self.tiempos[metodo] = [0] * (len(self.TRAMOS) + 1) + [0.0]
+            tiempos[bisect.bisect_left(self.TRAMOS, segundos)] += 1
+            tiempos[-1] += segundos
+    
+    def cronometrar(self, metodo: str, funcion: Callable) -> Callable:
+        metricas = self
+        
+        @functools.wraps(funcion)
+        def cronometrado(*args, **kwargs):
+            inicio = time.perf_counter()
+            try:
+                return funcion(*args, **kwargs)
+            finally:
+                metricas.observar(metodo, time.perf_counter() - inicio)
+        return cronometrado
+    
+    def con_contadores(self, clase, nombre: str, funcion: Callable) -> Callable:
+        """Agrega a los métodos que lo necesitan el conteo de pedidos y bytes"""
+        metricas = self
+        if clase is MotorCafeteria and nombre == "confirmar":
+            @functools.wraps(funcion)
+            def confirmar(motor, *args, **kwargs):
+                try:
+                    ticket = funcion(motor, *args, **kwargs)
+                except StockInsuficiente:
+                    metricas.contar("pedidos_sin_stock")
+                    raise
+                metricas.contar("pedidos_confirmados")
+                agotados = sum(1 for producto in ticket["items"]
+                               if producto in motor.menu and motor.menu[producto]['cantidad'] <= 0)
+                if agotados:
+                    metricas.contar("productos_agotados", agotados)
+                return ticket
+            return confirmar
+        if clase is MotorCafeteria and nombre == "cancelar":
+            @functools.wraps(funcion)
+            def cancelar(motor, *args, **kwargs):
+                funcion(motor, *args, **kwargs)
+                metricas.contar("pedidos_cancelados")
+            return cancelar
+        if clase is Catalogo and nombre in ("registrar_cambio", "guardar"):
+            # Las ventas y ediciones escriben el diario y, al compactar, un snapshot nuevo
+            @functools.wraps(funcion)
+            def escribe_menu(catalogo, *args, **kwargs):
+                almacen = catalogo.almacen
+                antes = almacen.bytes_escritos
+                try:
+                    return funcion(catalogo, *args, **kwargs)
+                finally:
+                    metricas.contar("menu_bytes_escritos", almacen.bytes_escritos - antes)
+            return escribe_menu
+        if clase is ColaCocina and nombre == "encolar":
+            @functools.wraps(funcion)
+            def encolar(cocina, *args, **kwargs):
+                metricas.registrar_cocina(cocina)
+                return funcion(cocina, *args, **kwargs)
+            return encolar
+        return funcion
+    
+    def instrumentar(self):
+        """Reemplaza los métodos medidos por versiones cronometradas. Llamarla de
+        nuevo no hace nada: envolver dos veces contaría todo por duplicado."""
+        if self.originales:
+            return
+        for clase, nombres in self.METODOS.items():
+            for nombre in nombres:
+                original = clase.__dict__[nombre]
+                self.originales[(clase, nombre)] = original
+                funcion = self.con_contadores(clase, nombre, original)
+                setattr(clase, nombre, self.cronometrar(f"{clase.__name__}.{nombre}", funcion))
+    
+    def desinstrumentar(self):
+        """Devuelve los métodos originales"""
+        for (clase, nombre), original in self.originales.items():
+            setattr(clase, nombre, original)
+        self.originales = {}
+    
+    def texto_prometheus(self) -> str:
+        """Métricas en el formato de texto de Prometheus"""
+        with self.candado:
+            contadores = dict(self.contadores)
+            tiempos = {metodo: list(valores) for metodo, valores in self.tiempos.items()}
+        
+        lineas = []
+        for nombre, descripcion in self.CONTADORES.items():
+            lineas.append(f"# HELP cafeteria_{nombre}_total {descripcion}")
+            lineas.append(f"# TYPE cafeteria_{nombre}_total counter")
+            lineas.append(f"cafeteria_{nombre}_total {contadores[nombre]}")
+        
+        lineas.append("# HELP cafeteria_duracion_segundos Duración de las operaciones por método")
+        lineas.append("# TYPE cafeteria_duracion_segundos histogram")
+        for metodo, valores in sorted(tiempos.items()):
+            acumulado = 0
+            for limite, conteo in zip(self.TRAMOS + ("+Inf",), valores[:-1]):
+                acumulado += conteo
+                lineas.append(f'cafeteria_duracion_segundos_bucket{{metodo="{metodo}",le="{limite}"}} {acumulado}')
+            lineas.append(f'cafeteria_duracion_segundos_sum{{metodo="{metodo}"}} {valores[-1]:.6f}')
+            lineas.append(f'cafeteria_duracion_segundos_count{{metodo="{metodo}"}} {acumulado}')
+        
+        with self.candado:
+            cocinas = sorted((numero, cocina) for cocina, numero in self.cocinas.items())
+        datos = [(f'cocina="{numero}"', cocina.estadisticas()) for numero, cocina in cocinas]
+        if datos:
+            # Una cabecera por familia y una muestra por cocina
+            for nombre, tipo, clave, descripcion in (
+                    ("cocina_en_cola", "gauge", "en_cola", "Pedidos esperando una estación"),
+                    ("cocina_preparando", "gauge", "preparando", "Pedidos que se están preparando"),
+                    ("cocina_terminados_total", "counter", "terminados", "Pedidos preparados")):
+                lineas.append(f"# HELP cafeteria_{nombre} {descripcion}")
+                lineas.append(f"# TYPE cafeteria_{nombre} {tipo}")
+                for etiqueta, valores in datos:
+                    lineas.append(f"cafeteria_{nombre}{{{etiqueta}}} {valores[clave]}")
+            lineas.append("# HELP cafeteria_cocina_espera_segundos Espera en cola hasta que una estación toma el pedido")
+            lineas.append("# TYPE cafeteria_cocina_espera_segundos summary")
+            for etiqueta, valores in datos:
+                for cuantil in ("50", "90", "99"):
+                    lineas.append(f'cafeteria_cocina_espera_segundos{{{etiqueta},quantile="0.{cuantil}"}} '
+                                  f'{valores["espera"]["p" + cuantil]}')
+                lineas.append(f"cafeteria_cocina_espera_segundos_sum{{{etiqueta}}} {valores['espera_total']}")
+                lineas.append(f"cafeteria_cocina_espera_segundos_count{{{etiqueta}}} {valores['iniciados']}")
+        return "\n".join(lineas) + "\n"
+    
+    def exportar(self, ruta: str):
+        """Escribe las métricas en un archivo (reemplazo atómico, apto para un
+        colector de archivos de texto de Prometheus)"""
+        temporal = ruta + ".tmp"
+        with open(temporal, 'w', encoding='utf-8') as f:
+            f.write(self.texto_prometheus())
+        os.replace(temporal, ruta)
+    
+    def exportar_periodicamente(self, ruta: str, intervalo: float = 10.0):
+        """Exporta al archivo cada `intervalo` segundos en un hilo de fondo"""
+        def exportar():
+            while True:
+                time.sleep(intervalo)
+                self.exportar(ruta)
+        threading.Thread(target=exportar, daemon=True).start()
+    
+    def servir_http(self, host: str = "127.0.0.1", puerto: int = 9108) -> ThreadingHTTPServer:
+        """Publica las métricas en http://host:puerto/metrics desde un hilo de fondo"""
+        metricas = self
+        
+        class Manejador(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                cuerpo = metricas.texto_prometheus().encode('utf-8')
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(cuerpo)))
+                self.end_headers()
+                self.wfile.write(cuerpo)
+            
+            def log_message(self, *args):
+                pass
+        
+        servidor = ThreadingHTTPServer((host, puerto), Manejador)
+        threading.Thread(target=servidor.serve_forever, daemon=True).start()
+        return servidor
+
+def activar_metricas(ruta: str = None, puerto: int = None) -> Optional[Metricas]:
+    """Instrumenta el proceso si se pidió exportar métricas a un archivo o a un puerto"""
+    if not ruta and not puerto:
+        return None
+    metricas = Metricas()
+    metricas.instrumentar()
+    if ruta:
+        metricas.exportar_periodicamente(ruta)
+    if puerto:
+        metricas.servir_http(puerto=puerto)
+    return metricas
 
-def menu_principal():
+def menu_principal(tipo_almacen: str = "json", ruta_promociones: str = "promociones.json",
+                   cocina: ColaCocina = None):
     """Menú principal del sistema"""
-    cafeteria = Cafeteria()
-    admin = AdminCafeteria()
+    # Un solo catálogo en memoria para el cliente y el administrador
+    catalogo = Catalogo(crear_almacen(tipo_almacen), historial=HistorialVentas(),
+                        precios=MotorPrecios.desde_archivo(ruta_promociones), cocina=cocina)
+    cafeteria = Cafeteria(catalogo)
+    admin = AdminCafeteria(catalogo)
     
     while True:
         print("\n" + "="*50)
@@ -452,19 +2907,294 @@ def menu_principal():
             else:
                 print("❌ Contraseña incorrecta")
         elif opcion == "3":
-            cafeteria.mostrar_menu()
-            input("\nPresione Enter para continuar...")
+            cafeteria.recorrer_menu()
         elif opcion == "0":
             print("\n¡Gracias por usar nuestro sistema! ☕")
             break
         else:
             print("❌ Opción no válida")
 
+def procesar_lote(catalogo: Catalogo, entrada, salida) -> Dict:
+    """Pasa por el motor un flujo JSONL de pedidos y escribe un resultado por pedido.
+    
+    Cada línea es {"pedido": "A-1", "items": [{"id": 3, "cantidad": 2}, ...]}; en
+    lugar de "id" un item puede indicar "producto" con el nombre, y el pedido
+    puede llevar "prioridad" para la cocina (0 = urgente). Devuelve el resumen
+    del lote con el rendimiento obtenido."""
+    motor = MotorCafeteria(catalogo)
+    resumen = {"pedidos": 0, "confirmados": 0, "rechazados": 0, "total_vendido": 0}
+    inicio = time.perf_counter()
+    
+    for numero, linea in enumerate(entrada, 1):
+        if not linea.strip():
+            continue
+        resumen["pedidos"] += 1
+        resultado = {"linea": numero}
+        try:
+            orden = json.loads(linea)
+            resultado["pedido"] = orden.get("pedido")
+            for item in orden["items"]:
+                if "id" in item:
+                    producto_id = int(item["id"])
+                elif item["producto"] in catalogo.menu:
+                    producto_id = catalogo.menu[item["producto"]]['id']
+                else:
+                    raise OperacionInvalida(f"El producto '{item['producto']}' no existe")
+                motor.agregar_item(producto_id, int(item["cantidad"]))
+            ticket = motor.confirmar(int(orden.get("prioridad", ColaCocina.NORMAL)))
+            resultado.update(estado="confirmado", total=ticket["total"])
+            if "cocina" in ticket:
+                resultado["cocina"] = ticket["cocina"]
+            resumen["confirmados"] += 1
+            resumen["total_vendido"] += ticket["total"]
+        except (OperacionInvalida, ConflictoMenu) as e:
+            resultado.update(estado="rechazado", error=str(e))
+        except (ValueError, KeyError, TypeError, AttributeError):
+            resultado.update(estado="rechazado", error="Pedido mal formado")
+        finally:
+            motor.descartar()
+        
+        if resultado["estado"] == "rechazado":
+            resumen["rechazados"] += 1
+        salida.write(json.dumps(resultado, ensure_ascii=False) + "\n")
+    
+    resumen["segundos"] = round(time.perf_counter() - inicio, 3)
+    resumen["pedidos_por_segundo"] = round(resumen["pedidos"] / resumen["segundos"], 1) if resumen["segundos"] else None
+    return resumen
+
+def ejecutar_lote(tipo_almacen: str, ruta_entrada: str, ruta_salida: str = None,
+                  ruta_promociones: str = "promociones.json", cocina: ColaCocina = None):
+    """Modo por lotes: procesa un archivo JSONL de pedidos sin interacción.
+    Con cocina espera a que se preparen todos y muestra las esperas."""
+    catalogo = Catalogo(crear_almacen(tipo_almacen), historial=HistorialVentas(),
+                        precios=MotorPrecios.desde_archivo(ruta_promociones), cocina=cocina)
+    entrada = sys.stdin if ruta_entrada == "-" else open(ruta_entrada, 'r', encoding='utf-8')
+    salida = open(ruta_salida, 'w', encoding='utf-8') if ruta_salida else sys.stdout
+    try:
+        resumen = procesar_lote(catalogo, entrada, salida)
+    finally:
+        if entrada is not sys.stdin:
+            entrada.close()
+        if salida is not sys.stdout:
+            salida.close()
+    
+    print(f"Pedidos: {resumen['pedidos']} | Confirmados: {resumen['confirmados']} | "
+          f"Rechazados: {resumen['rechazados']} | Vendido: ${resumen['total_vendido']:,}", file=sys.stderr)
+    print(f"Tiempo: {resumen['segundos']} s | {resumen['pedidos_por_segundo']} pedidos/s", file=sys.stderr)
+    
+    if cocina is not None:
+        cocina.esperar()
+        datos = cocina.estadisticas()
+        print(f"Cocina: {datos['estaciones']} estaciones | Cola máxima: {datos['profundidad_maxima']} | "
+              f"{datos['pedidos_por_minuto']} pedidos/min", file=sys.stderr)
+        for titulo, clave in (("Espera en cola", "espera"), ("Hasta estar listo", "demora_total")):
+            valores = datos[clave]
+            print(f"{titulo}: p50 {valores['p50']} s | p90 {valores['p90']} s | p99 {valores['p99']} s | "
+                  f"máx {valores['max']} s", file=sys.stderr)
+
+def cotizar_archivo(tipo_almacen: str, ruta_entrada: str, ruta_salida: str = None,
+                    ruta_promociones: str = "promociones.json"):
+    """Cotiza de una vez los pedidos de un archivo JSONL con los precios y promociones
+    actuales, sin vender ni reservar nada (para recotizar el día o simular promociones).
+    Un pedido inválido se informa como {"pedido": ..., "error": ...} y no detiene al resto."""
+    catalogo = Catalogo(crear_almacen(tipo_almacen), precios=MotorPrecios.desde_archivo(ruta_promociones))
+    # Por cada línea: (pedido, posición en `pedidos`) o (pedido, motivo del rechazo)
+    resultados = []
+    pedidos = []
+    entrada = sys.stdin if ruta_entrada == "-" else open(ruta_entrada, 'r', encoding='utf-8')
+    try:
+        for linea in entrada:
+            if not linea.strip():
+                continue
+            orden = {}
+            try:
+                orden = json.loads(linea)
+                pedido = {}
+                for item in orden["items"]:
+                    producto = catalogo.producto_por_id(int(item["id"])) if "id" in item else item["producto"]
+                    if producto not in catalogo.menu:
+                        raise OperacionInvalida(f"El producto '{item.get('producto', item.get('id'))}' no existe")
+                    cantidad = int(item["cantidad"])
+                    if cantidad <= 0:
+                        raise OperacionInvalida("La cantidad debe ser mayor a 0")
+                    pedido[producto] = pedido.get(producto, 0) + cantidad
+                if not pedido:
+                    raise OperacionInvalida("No hay productos en el pedido")
+            except OperacionInvalida as e:
+                resultados.append((orden.get("pedido") if isinstance(orden, dict) else None, str(e)))
+                continue
+            except (ValueError, KeyError, TypeError, AttributeError):
+                resultados.append((orden.get("pedido") if isinstance(orden, dict) else None, "Pedido mal formado"))
+                continue
+            resultados.append((orden.get("pedido"), len(pedidos)))
+            pedidos.append(pedido)
+    finally:
+        if entrada is not sys.stdin:
+            entrada.close()
+    
+    inicio = time.perf_counter()
+    cotizaciones = catalogo.cotizar_lote(pedidos)
+    segundos = time.perf_counter() - inicio
+    
+    salida = open(ruta_salida, 'w', encoding='utf-8') if ruta_salida else sys.stdout
+    try:
+        salida.write("".join(
+            json.dumps({"pedido": pedido, **cotizaciones[resultado]} if isinstance(resultado, int)
+                       else {"pedido": pedido, "error": resultado}, ensure_ascii=False) + "\n"
+            for pedido, resultado in resultados))
+    finally:
+        if salida is not sys.stdout:
+            salida.close()
+    
+    print(f"Pedidos: {len(pedidos)} | Rechazados: {len(resultados) - len(pedidos)} | "
+          f"Total: ${sum(c['total'] for c in cotizaciones):,} | "
+          f"Descuentos: ${sum(c['descuento'] for c in cotizaciones):,} | Tiempo: {segundos:.3f} s", file=sys.stderr)
+
+# Cada cuántas filas se informa el avance de una importación o exportación
+PASO_PROGRESO = 10000
+# Columnas del CSV exportado (al importar también se admite "accion")
+COLUMNAS_CSV = ["id", "producto", "precio", "cantidad"]
+
+def mostrar_progreso(etapa: str, hechos: int, total: Optional[int]):
+    """Avance en una sola línea de stderr, reescrita en cada llamada"""
+    if total:
+        texto = f"{etapa}: {hechos:,}/{total:,} ({hechos * 100 // total}%)"
+    else:
+        texto = f"{etapa}: {hechos:,} filas"
+    print(f"\r⏳ {texto}", end="\n" if total and hechos >= total else "", file=sys.stderr, flush=True)
+
+def leer_importacion(ruta: str, progreso: Callable[[str, int, Optional[int]], None] = None) -> List[Dict]:
+    """Lee las filas de un archivo de importación para MotorCafeteria.importar.
+    
+    CSV con encabezado (producto, precio, cantidad y opcionalmente accion; la
+    columna id se ignora) o JSON: una lista de filas o un objeto
+    {producto: {precio, cantidad}} como el de menu.json. Cada fila lleva su
+    número de línea para los mensajes de error."""
+    if ruta.lower().endswith(".json"):
+        with open(ruta, 'r', encoding='utf-8') as f:
+            datos = json.load(f)
+        if isinstance(datos, dict):
+            datos = [{"producto": producto, **info} for producto, info in datos.items() if isinstance(info, dict)]
+        if not isinstance(datos, list) or not all(isinstance(fila, dict) for fila in datos):
+            raise OperacionInvalida("El JSON debe ser una lista de filas o un objeto {producto: {precio, cantidad}}")
+        if progreso:
+            progreso("Leyendo", len(datos), len(datos))
+        return datos
+    
+    filas = []
+    with open(ruta, 'r', encoding='utf-8-sig', newline='') as f:
+        lector = csv.DictReader(f)
+        if not lector.fieldnames or "producto" not in lector.fieldnames:
+            raise OperacionInvalida("El CSV debe tener un encabezado con la columna 'producto'")
+        for fila in lector:
+            fila["linea"] = lector.line_num
+            filas.append(fila)
+            if progreso and len(filas) % PASO_PROGRESO == 0:
+                progreso("Leyendo", len(filas), None)
+    return filas
+
+def exportar_menu(menu: Dict, ruta: str, progreso: Callable[[str, int, Optional[int]], None] = None) -> int:
+    """Escribe el menú en CSV o, si la ruta termina en .json, en el formato de
+    menu.json. Ambos se pueden volver a importar. Devuelve cuántos productos escribió."""
+    total = len(menu)
+    if ruta.lower().endswith(".json"):
+        with open(ruta, 'w', encoding='utf-8') as f:
+            json.dump(menu.como_dict() if isinstance(menu, MenuCompacto) else menu, f, indent=4, ensure_ascii=False)
+    else:
+        with open(ruta, 'w', encoding='utf-8', newline='') as f:
+            escritor = csv.writer(f)
+            escritor.writerow(COLUMNAS_CSV)
+            filas = menu.tuplas() if isinstance(menu, MenuCompacto) else (
+                (producto, info['id'], info['precio'], info['cantidad']) for producto, info in menu.items())
+            for numero, (producto, producto_id, precio, cantidad) in enumerate(filas, 1):
+                escritor.writerow((producto_id, producto, precio, cantidad))
+                if progreso and numero % PASO_PROGRESO == 0 and numero < total:
+                    progreso("Exportando", numero, total)
+    if progreso:
+        progreso("Exportando", total, total)
+    return total
+
+def importar_archivo(tipo_almacen: str, ruta: str):
+    """Importa altas, cambios y bajas desde un CSV o JSON sin interacción"""
+    catalogo = Catalogo(crear_almacen(tipo_almacen))
+    filas = leer_importacion(ruta, mostrar_progreso)
+    inicio = time.perf_counter()
+    resumen = MotorCafeteria(catalogo).importar(filas, mostrar_progreso)
+    print(f"✅ Importadas {len(filas):,} filas en {time.perf_counter() - inicio:.2f} s | "
+          f"Agregados: {resumen['agregados']} | Actualizados: {resumen['actualizados']} | "
+          f"Eliminados: {resumen['eliminados']} | Sin cambios: {resumen['sin_cambios']}", file=sys.stderr)
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sistema de cafetería")
+    parser.add_argument("--almacen", choices=["json", "binario", "sqlite"], default="json",
+                        help="backend donde se guarda el menú (por defecto: json)")
+    parser.add_argument("--lote", metavar="ARCHIVO",
+                        help="procesa sin interacción los pedidos de un archivo JSONL ('-' para stdin)")
+    parser.add_argument("--salida", metavar="ARCHIVO",
+                        help="con --lote o --cotizar, archivo JSONL de resultados (por defecto: stdout)")
+    parser.add_argument("--cotizar", metavar="ARCHIVO",
+                        help="cotiza los pedidos de un archivo JSONL sin venderlos ('-' para stdin)")
+    parser.add_argument("--promociones", metavar="ARCHIVO", default="promociones.json",
+                        help="reglas de combos, descuentos e impuestos (por defecto: promociones.json)")
+    parser.add_argument("--metricas", metavar="ARCHIVO",
+                        help="mide tiempos y contadores y los exporta a este archivo (formato Prometheus)")
+    parser.add_argument("--metricas-puerto", metavar="PUERTO", type=int,
+                        help="mide tiempos y contadores y los publica en http://127.0.0.1:PUERTO/metrics")
+    parser.add_argument("--estaciones", metavar="N", type=int,
+                        help="pasa los pedidos confirmados a una cocina con N estaciones de preparación")
+    parser.add_argument("--cocina", metavar="ARCHIVO", default="cocina.json",
+                        help="tiempos de preparación por producto (por defecto: cocina.json)")
+    parser.add_argument("--escala-cocina", metavar="FACTOR", type=float, default=1.0,
+                        help="acelera la preparación simulada (0.01 = cien veces más rápido, 0 = instantánea)")
+    parser.add_argument("--consultar", metavar="PRODUCTO",
+                        help="muestra precio y stock de un producto (con --almacen binario, sin cargar el menú)")
+    parser.add_argument("--importar", metavar="ARCHIVO",
+                        help="agrega, actualiza o elimina productos desde un CSV o JSON, todo o nada")
+    parser.add_argument("--exportar", metavar="ARCHIVO",
+                        help="escribe el menú guardado en un CSV (o JSON si termina en .json)")
+    args = parser.parse_args()
+    
+    metricas = activar_metricas(args.metricas, args.metricas_puerto)
+    cocina = ColaCocina.desde_archivo(args.cocina, args.estaciones, args.escala_cocina) if args.estaciones else None
     try:
-        menu_principal()
-    except KeyboardInterrupt:
-        print("\n\n¡Hasta luego! ☕")
-    except Exception as e:
-        print(f"\n❌ Error inesperado: {e}")
-        print("Por favor, reinicie el programa")
\ No newline at end of file
+        if args.consultar:
+            if args.almacen == "binario" and os.path.exists(AlmacenBinario().menu_file):
+                info = AlmacenBinario().consultar(args.consultar)
+            else:
+                menu = Catalogo(crear_almacen(args.almacen)).menu
+                info = dict(menu[args.consultar].items()) if args.consultar in menu else None
+            if info is None:
+                print(f"❌ El producto '{args.consultar}' no existe")
+                sys.exit(1)
+            print(json.dumps({"producto": args.consultar, **info}, ensure_ascii=False))
+        elif args.importar:
+            try:
+                importar_archivo(args.almacen, args.importar)
+            except (OperacionInvalida, ConflictoMenu, OSError, ValueError, csv.Error) as e:
+                print(f"\n❌ {e}", file=sys.stderr)
+                sys.exit(1)
+        elif args.exportar:
+            total = exportar_menu(Catalogo(crear_almacen(args.almacen)).menu, args.exportar, mostrar_progreso)
+            print(f"✅ {total:,} productos exportados a {args.exportar}", file=sys.stderr)
+        elif args.lote:
+            ejecutar_lote(args.almacen, args.lote, args.salida, args.promociones, cocina)
+        elif args.cotizar:
+            try:
+                cotizar_archivo(args.almacen, args.cotizar, args.salida, args.promociones)
+            except (OperacionInvalida, OSError, ValueError) as e:
+                print(f"\n❌ {e}", file=sys.stderr)
+                sys.exit(1)
+        else:
+            try:
+                menu_principal(args.almacen, args.promociones, cocina)
+            except MenuIlegible as e:
+                print(f"\n❌ {e}")
+                print("El archivo no se modificó: restáurelo desde un respaldo o bórrelo para empezar con el menú por defecto")
+            except KeyboardInterrupt:
+                print("\n\n¡Hasta luego! ☕")
+            except Exception as e:
+                print(f"\n❌ Error inesperado: {e}")
+                print("Por favor, reinicie el programa")
+    finally:
+        if metricas and args.metricas:
+            metricas.exportar(args.metricas)
\ No newline at end of file
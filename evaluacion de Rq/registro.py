@@ -3,9 +3,774 @@ __license__="GPL"
 __version__="1.0.0"
 __email__="stheban.hoyos@campusucc.edu.co"
 
+import bisect
+import csv
+import gc
+import heapq
+import io
+import itertools
+import json
+import os
+import re
+import sys
+import threading
+import unicodedata
+from array import array
+from collections import deque
+from collections.abc import Mapping, MutableMapping
+from concurrent.futures import ProcessPoolExecutor
 
-# Inicializamos el diccionario de contactos
-contactos = {}
+
+NO_DIGITOS = re.compile(r"\D")
+# Lo que suele separar los dígitos de un teléfono: se quita sin pasar por la expresión regular
+SEPARADORES = str.maketrans("", "", " +-().")
+# Palabras (letras y dígitos) de un texto ya normalizado
+PALABRA = re.compile(r"[^\W_]+")
+SIN_TILDES = str.maketrans("áéíóúüñàèìòù", "aeiouunaeiou")
+# Contactos por página al mostrar la agenda
+TAMANO_PAGINA = 20
+# Contactos que muestra a la vez el selector de eliminar_contacto_terminal
+VENTANA = 10
+# Filas que valida cada proceso de una vez al importar
+BLOQUE_IMPORTACION = 5000
+CORREO_VALIDO = re.compile(r"[^@\s]+@[^@\s]+\.[^@\s.]+")
+ESCAPE_VCARD = re.compile(r"\\(.)")
+
+def clave_numero(numero):
+    """Teléfono tal como se indexa: solo los dígitos."""
+    digitos = numero.translate(SEPARADORES)
+    return digitos if digitos.isdigit() else NO_DIGITOS.sub("", numero)
+
+def clave_correo(correo):
+    return correo.strip().lower()
+
+def clave_cargo(cargo):
+    return " ".join(cargo.split()).lower()
+
+def normalizar(texto):
+    """Minúsculas y sin tildes."""
+    texto = texto.lower()
+    if texto.isascii():
+        return texto
+    # Las letras con tilde del español se resuelven con una tabla; el resto con Unicode
+    texto = texto.translate(SIN_TILDES)
+    if texto.isascii():
+        return texto
+    return "".join(c for c in unicodedata.normalize("NFKD", texto) if not unicodedata.combining(c))
+
+def palabras(texto):
+    return PALABRA.findall(normalizar(texto))
+
+
+class Contacto(Mapping):
+    """Un contacto visto como el diccionario de antes (contacto['correo'], .get,
+    .items(), dict(contacto)).
+    
+    La agenda no guarda un diccionario por contacto sino una tupla
+    (numero, usuario, dominio, cargo): el correo partido en usuario y dominio
+    ("@empresa.com"), y el dominio y el cargo compartidos entre todos los
+    contactos que los repiten (sys.intern). Una tupla de textos ocupa menos que
+    un diccionario y el recolector de basura deja de seguirla, y la foto se
+    convierte en tuplas sin pasar por Python por cada contacto. Contacto
+    envuelve esa tupla cuando se lee un contacto de la agenda."""
+    
+    __slots__ = ('registro',)
+    CAMPOS = ('numero', 'correo', 'cargo')
+    
+    def __init__(self, registro):
+        self.registro = registro
+    
+    @staticmethod
+    def tupla(datos):
+        """(numero, usuario, dominio, cargo) de un diccionario de contacto (o un Contacto)."""
+        if isinstance(datos, Contacto):
+            return datos.registro
+        usuario, arroba, dominio = datos.get('correo', "").rpartition("@")
+        return datos.get('numero', ""), usuario, sys.intern(arroba + dominio), sys.intern(datos.get('cargo', ""))
+    
+    @property
+    def numero(self):
+        return self.registro[0]
+    
+    @property
+    def correo(self):
+        return self.registro[1] + self.registro[2]
+    
+    @property
+    def cargo(self):
+        return self.registro[3]
+    
+    def __getitem__(self, campo):
+        if campo not in self.CAMPOS:
+            raise KeyError(campo)
+        return getattr(self, campo)
+    
+    def __iter__(self):
+        return iter(self.CAMPOS)
+    
+    def __len__(self):
+        return len(self.CAMPOS)
+    
+    def __repr__(self):
+        return repr(dict(self))
+
+
+class IndiceTexto:
+    """Búsqueda parcial por nombre, correo y cargo, sin distinguir mayúsculas ni tildes.
+    
+    Cada contacto recibe un número y cada palabra de sus campos guarda los
+    números de los contactos que la tienen (un índice por campo). Las palabras
+    de la consulta se buscan como comienzo de palabra en el vocabulario ordenado,
+    así "mar" encuentra "María" y "Martínez". Se empieza por la palabra menos
+    frecuente y las demás solo filtran a esos candidatos. Al cambiar o borrar un
+    contacto su número anterior queda libre; se reconstruye todo cuando hay más
+    libres que vigentes."""
+    
+    # Peso de una coincidencia en el nombre, el correo y el cargo; se duplica si la palabra es completa
+    PESOS = (3, 2, 1)
+    # Con menos candidatos que esto se revisan sus campos en vez de recorrer el índice
+    REVISION_DIRECTA = 2000
+    
+    def __init__(self, contactos=None):
+        self.reconstruir(contactos or {})
+    
+    def reconstruir(self, contactos):
+        self.campos = ({}, {}, {})  # por campo: palabra -> array con los números de los contactos
+        self.nombres = []  # número -> nombre (None si quedó libre)
+        self.numeros = {}  # nombre -> número vigente
+        self.libres = 0
+        self.repetidas = {}
+        for nombre, registro in contactos.items():
+            self.indexar(nombre, registro)
+        self.vocabulario = sorted(set().union(*self.campos))
+    
+    @staticmethod
+    def textos(nombre, registro):
+        return nombre, registro[1] + registro[2], registro[3]
+    
+    def indexar(self, nombre, registro):
+        """Agrega el contacto a los índices por campo. Devuelve las palabras nuevas."""
+        numero = len(self.nombres)
+        self.nombres.append(nombre)
+        self.numeros[nombre] = numero
+        nuevas = []
+        _, usuario, dominio, cargo = registro  # ver Contacto.tupla
+        if dominio.startswith("@"):
+            palabras_correo = palabras(usuario) + self.palabras_repetidas(dominio)
+        else:
+            palabras_correo = palabras(dominio)
+        por_campo = (palabras(nombre), palabras_correo, self.palabras_repetidas(cargo))
+        for campo, lista_palabras in zip(self.campos, por_campo):
+            for palabra in set(lista_palabras):
+                lista = campo.get(palabra)
+                if lista is None:
+                    lista = campo[palabra] = array('I')
+                    nuevas.append(palabra)
+                lista.append(numero)
+        return nuevas
+    
+    def palabras_repetidas(self, texto):
+        """palabras() con memoria, para los valores que se repiten (cargos y dominios)."""
+        resultado = self.repetidas.get(texto)
+        if resultado is None:
+            resultado = self.repetidas[texto] = palabras(texto)
+        return resultado
+    
+    def agregar(self, nombre, registro):
+        self.quitar(nombre)
+        for palabra in self.indexar(nombre, registro):
+            posicion = bisect.bisect_left(self.vocabulario, palabra)
+            if posicion == len(self.vocabulario) or self.vocabulario[posicion] != palabra:
+                self.vocabulario.insert(posicion, palabra)
+    
+    def agregar_lote(self, contactos):
+        """Como agregar para muchos contactos, ordenando el vocabulario una sola vez."""
+        nuevas = []
+        for nombre, registro in contactos.items():
+            self.quitar(nombre)
+            nuevas.extend(self.indexar(nombre, registro))
+        faltan = set(nuevas).difference(self.vocabulario)
+        if faltan:
+            # El vocabulario y las palabras nuevas ya ordenadas: sort solo intercala los dos tramos
+            self.vocabulario.extend(sorted(faltan))
+            self.vocabulario.sort()
+    
+    def quitar(self, nombre):
+        numero = self.numeros.pop(nombre, None)
+        if numero is None:
+            return
+        self.nombres[numero] = None
+        self.libres += 1
+    
+    def necesita_reconstruir(self):
+        return self.libres > len(self.numeros)
+    
+    def palabras_con_prefijo(self, prefijo):
+        inicio = bisect.bisect_left(self.vocabulario, prefijo)
+        return self.vocabulario[inicio:bisect.bisect_left(self.vocabulario, prefijo + "￿", inicio)]
+    
+    def frecuencia(self, palabras_prefijo):
+        return sum(len(campo.get(palabra, ())) for palabra in palabras_prefijo for campo in self.campos)
+    
+    def puntuar(self, palabra, palabras_prefijo, puntajes):
+        """Puntaje de `palabra` para cada contacto (solo los de `puntajes`, si no es None)."""
+        nuevos = {}
+        for peso, campo in zip(self.PESOS, self.campos):
+            for candidata in palabras_prefijo:
+                lista = campo.get(candidata)
+                if lista is None:
+                    continue
+                valor = peso * 2 if candidata == palabra else peso
+                for numero in lista:
+                    if (puntajes is None or numero in puntajes) and nuevos.get(numero, 0) < valor:
+                        nuevos[numero] = valor
+        return nuevos
+    
+    def puntuar_directo(self, palabra, puntajes, contactos):
+        """Como puntuar, revisando los campos de los candidatos uno por uno."""
+        nuevos = {}
+        for numero in puntajes:
+            nombre = self.nombres[numero]
+            if nombre is None:
+                continue
+            for peso, texto in zip(self.PESOS, self.textos(nombre, contactos[nombre])):
+                encontradas = [otra for otra in palabras(texto) if otra.startswith(palabra)]
+                if encontradas:
+                    nuevos[numero] = peso * 2 if palabra in encontradas else peso
+                    break
+        return nuevos
+    
+    def buscar(self, texto, contactos, limite=20):
+        """Nombres de los contactos con todas las palabras buscadas (como comienzo de
+        alguna palabra de sus campos), los mejores primero."""
+        consulta = [(palabra, self.palabras_con_prefijo(palabra)) for palabra in set(palabras(texto))]
+        if not consulta:
+            return []
+        consulta.sort(key=lambda par: self.frecuencia(par[1]))
+        
+        puntajes = None
+        for palabra, palabras_prefijo in consulta:
+            if puntajes is not None and len(puntajes) < self.REVISION_DIRECTA:
+                nuevos = self.puntuar_directo(palabra, puntajes, contactos)
+            else:
+                nuevos = self.puntuar(palabra, palabras_prefijo, puntajes)
+            puntajes = nuevos if puntajes is None else {numero: valor + puntajes[numero]
+                                                        for numero, valor in nuevos.items()}
+            if not puntajes:
+                return []
+        
+        nombres = self.nombres
+        mejores = heapq.nsmallest(limite, ((-valor, len(nombres[numero]), nombres[numero])
+                                           for numero, valor in puntajes.items() if nombres[numero] is not None))
+        return [nombre for _, _, nombre in mejores]
+
+
+class IndiceOrdenado:
+    """Nombres en orden alfabético (sin tildes ni mayúsculas) con acceso por posición.
+    
+    Los nombres se guardan en bloques ordenados de hasta 2 * CARGA elementos, con
+    el último de cada bloque aparte para ubicarlos por bisección y un árbol de
+    Fenwick con el tamaño de cada bloque. Ubicar la posición k, averiguar la
+    posición de un nombre, insertar y borrar cuestan O(log n) más mover unos
+    pocos elementos dentro de un bloque."""
+    
+    CARGA = 1000
+    
+    def __init__(self, nombres=()):
+        self.repartir(sorted(map(self.clave, nombres)))
+    
+    def repartir(self, claves):
+        """Arma los bloques a partir de todas las claves ya ordenadas."""
+        self.bloques = [claves[i:i + self.CARGA] for i in range(0, len(claves), self.CARGA)]
+        self.maximos = [bloque[-1] for bloque in self.bloques]
+        self.total = len(claves)
+        self.reconstruir_arbol()
+    
+    @staticmethod
+    def clave(nombre):
+        # El nombre original va al final para distinguir los que se normalizan igual
+        return normalizar(nombre) + "\0" + nombre
+    
+    @staticmethod
+    def nombre(clave):
+        return clave[clave.index("\0") + 1:]
+    
+    def reconstruir_arbol(self):
+        arbol = [0] + [len(bloque) for bloque in self.bloques]
+        for i in range(1, len(arbol)):
+            padre = i + (i & -i)
+            if padre < len(arbol):
+                arbol[padre] += arbol[i]
+        self.arbol = arbol
+    
+    def sumar(self, bloque, cantidad):
+        i = bloque + 1
+        while i < len(self.arbol):
+            self.arbol[i] += cantidad
+            i += i & -i
+    
+    def antes_del_bloque(self, bloque):
+        """Cantidad de nombres en los bloques anteriores."""
+        total, i = 0, bloque
+        while i > 0:
+            total += self.arbol[i]
+            i -= i & -i
+        return total
+    
+    def ubicar(self, posicion):
+        """(bloque, índice dentro del bloque) de la posición dada."""
+        bloque, paso = 0, 1 << len(self.arbol).bit_length()
+        while paso:
+            siguiente = bloque + paso
+            if siguiente < len(self.arbol) and self.arbol[siguiente] <= posicion:
+                bloque = siguiente
+                posicion -= self.arbol[siguiente]
+            paso >>= 1
+        return bloque, posicion
+    
+    def __len__(self):
+        return self.total
+    
+    def __iter__(self):
+        return self.rango(0, self.total)
+    
+    def agregar(self, nombre):
+        clave = self.clave(nombre)
+        if not self.bloques:
+            self.bloques, self.maximos, self.total = [[clave]], [clave], 1
+            self.reconstruir_arbol()
+            return
+        i = min(bisect.bisect_left(self.maximos, clave), len(self.bloques) - 1)
+        bloque = self.bloques[i]
+        bisect.insort(bloque, clave)
+        self.maximos[i] = bloque[-1]
+        self.total += 1
+        if len(bloque) > 2 * self.CARGA:
+            self.bloques[i:i + 1] = [bloque[:self.CARGA], bloque[self.CARGA:]]
+            self.maximos[i:i + 1] = [bloque[self.CARGA - 1], bloque[-1]]
+            self.reconstruir_arbol()
+        else:
+            self.sumar(i, 1)
+    
+    def fusionar(self, nombres):
+        """Agrega muchos nombres nuevos de una vez: se intercalan con los actuales en
+        una pasada en vez de insertarlos de a uno."""
+        claves = list(itertools.chain.from_iterable(self.bloques))
+        claves.extend(sorted(map(self.clave, nombres)))
+        claves.sort()
+        self.repartir(claves)
+    
+    def quitar(self, nombre):
+        clave = self.clave(nombre)
+        i = bisect.bisect_left(self.maximos, clave)
+        if i == len(self.bloques):
+            return
+        bloque = self.bloques[i]
+        j = bisect.bisect_left(bloque, clave)
+        if j == len(bloque) or bloque[j] != clave:
+            return
+        del bloque[j]
+        self.total -= 1
+        if bloque:
+            self.maximos[i] = bloque[-1]
+            self.sumar(i, -1)
+        else:
+            del self.bloques[i], self.maximos[i]
+            self.reconstruir_arbol()
+    
+    def posicion(self, nombre):
+        """Posición (desde 0) del nombre, o None si no está."""
+        clave = self.clave(nombre)
+        i = bisect.bisect_left(self.maximos, clave)
+        if i == len(self.bloques):
+            return None
+        j = bisect.bisect_left(self.bloques[i], clave)
+        if self.bloques[i][j] != clave:
+            return None
+        return self.antes_del_bloque(i) + j
+    
+    def posicion_desde(self, texto):
+        """Posición del primer nombre que va en orden en o después del texto."""
+        clave = normalizar(texto)
+        i = bisect.bisect_left(self.maximos, clave)
+        if i == len(self.bloques):
+            return self.total
+        return self.antes_del_bloque(i) + bisect.bisect_left(self.bloques[i], clave)
+    
+    def seleccionar(self, posicion):
+        """Nombre en la posición dada (desde 0)."""
+        if not 0 <= posicion < self.total:
+            raise IndexError(posicion)
+        bloque, indice = self.ubicar(posicion)
+        return self.nombre(self.bloques[bloque][indice])
+    
+    def rango(self, inicio, fin):
+        """Genera los nombres de las posiciones inicio a fin (sin incluir fin)."""
+        fin = min(fin, self.total)
+        if inicio >= fin:
+            return
+        bloque, indice = self.ubicar(inicio)
+        for _ in range(fin - inicio):
+            if indice == len(self.bloques[bloque]):
+                bloque, indice = bloque + 1, 0
+            yield self.nombre(self.bloques[bloque][indice])
+            indice += 1
+
+
+class Agenda(MutableMapping):
+    """Contactos guardados en disco, con la misma interfaz que un diccionario.
+    
+    La agenda completa está en una foto (contactos.json) y cada alta, cambio o
+    baja solo agrega una línea al diario (contactos_diario.jsonl). Cuando el
+    diario crece se compacta en una foto nueva. Nada se lee del disco hasta la
+    primera consulta, así que el programa arranca de inmediato aunque haya
+    millones de contactos. En memoria cada contacto es una tupla (ver
+    Contacto); la foto guarda la agenda por columnas (nombres, numeros,
+    usuarios, dominios, cargos) y el diario cada contacto como objeto JSON.
+    
+    Lleva además índices por teléfono y por correo (únicos), por cargo (varios
+    contactos por cargo), de texto (IndiceTexto) y de orden alfabético
+    (IndiceOrdenado), que se arman en la primera búsqueda y luego se
+    actualizan con cada alta, cambio o baja. Las importaciones (agregar_lote)
+    escriben una sola línea por columnas en el diario y suman sus contactos a
+    cada índice de una vez."""
+    
+    # Líneas mínimas del diario antes de compactarlo
+    LIMITE_DIARIO = 10000
+    # Cambios a partir de los cuales un lote reconstruye los índices de texto y de orden
+    LOTE_GRANDE = 1000
+    
+    def __init__(self, archivo="contactos.json", diario="contactos_diario.jsonl"):
+        self.archivo = archivo
+        self.diario = diario
+        self._datos = None
+        self._candado = threading.RLock()
+        self.entradas_diario = 0
+        self._indices = None
+        self._buscador = None
+        self._orden = None
+    
+    @property
+    def datos(self):
+        if self._datos is None:
+            self.cargar()
+        return self._datos
+    
+    def precargar(self):
+        """Empieza a leer la agenda y a armar sus índices en segundo plano."""
+        threading.Thread(target=lambda: (self.indices, self.buscador, self.orden), daemon=True).start()
+    
+    def cargar(self):
+        """Lee la foto y aplica el diario (una sola vez)."""
+        with self._candado:
+            if self._datos is not None:
+                return
+            datos, migrar = {}, False
+            if os.path.exists(self.archivo):
+                with open(self.archivo, 'r', encoding='utf-8') as f:
+                    foto = json.load(f)
+                if isinstance(foto.get("nombres"), list):
+                    datos = self.de_columnas(foto)
+                else:
+                    # Foto del formato anterior (un objeto por contacto): se reescribe por columnas
+                    datos = {nombre: Contacto.tupla(contacto) for nombre, contacto in foto.items()}
+                    migrar = bool(datos)
+                del foto
+            entradas = 0
+            if os.path.exists(self.diario):
+                with open(self.diario, 'rb') as f:
+                    valido = 0
+                    for linea in f:
+                        try:
+                            cambio = json.loads(linea)
+                        except ValueError:
+                            break  # última línea a medio escribir
+                        self.aplicar_en_memoria(datos, cambio)
+                        valido += len(linea)
+                        entradas += self.peso(cambio)
+                if valido < os.path.getsize(self.diario):
+                    with open(self.diario, 'r+b') as f:
+                        f.truncate(valido)
+            self.entradas_diario = entradas
+            self._datos = datos
+            if migrar:
+                self.compactar()
+    
+    @property
+    def indices(self):
+        """(por_numero, por_correo, por_cargo), armados la primera vez que se usan."""
+        if self._indices is None:
+            with self._candado:
+                if self._indices is None:
+                    por_numero, por_correo, por_cargo = {}, {}, {}
+                    cargos = {}  # cargo tal como está escrito -> su conjunto en por_cargo
+                    for nombre, (numero, usuario, dominio, cargo) in self.datos.items():
+                        numero, correo = clave_numero(numero), clave_correo(usuario + dominio)
+                        if numero:
+                            por_numero[numero] = nombre
+                        if correo:
+                            por_correo[correo] = nombre
+                        nombres = cargos.get(cargo)
+                        if nombres is None:
+                            nombres = cargos[cargo] = por_cargo.setdefault(clave_cargo(cargo), set())
+                        nombres.add(nombre)
+                    self._indices = (por_numero, por_correo, por_cargo)
+        return self._indices
+    
+    @property
+    def buscador(self):
+        if self._buscador is None:
+            with self._candado:
+                if self._buscador is None:
+                    self._buscador = IndiceTexto(self.datos)
+        return self._buscador
+    
+    @property
+    def orden(self):
+        """Los nombres en orden alfabético, con acceso por posición (IndiceOrdenado)."""
+        if self._orden is None:
+            with self._candado:
+                if self._orden is None:
+                    self._orden = IndiceOrdenado(self.datos)
+        return self._orden
+    
+    def buscar(self, texto, limite=20):
+        """Contactos cuyo nombre, correo o cargo contienen las palabras buscadas,
+        sin importar mayúsculas ni tildes; los mejores primero."""
+        return self.buscador.buscar(texto, self.datos, limite)
+    
+    def indexar(self, nombre, registro):
+        por_numero, por_correo, por_cargo = self._indices
+        numero, usuario, dominio, cargo = registro
+        numero, correo = clave_numero(numero), clave_correo(usuario + dominio)
+        if numero:
+            por_numero[numero] = nombre
+        if correo:
+            por_correo[correo] = nombre
+        por_cargo.setdefault(clave_cargo(cargo), set()).add(nombre)
+    
+    def desindexar(self, nombre, registro):
+        por_numero, por_correo, por_cargo = self._indices
+        numero, usuario, dominio, cargo = registro
+        numero, correo, cargo = clave_numero(numero), clave_correo(usuario + dominio), clave_cargo(cargo)
+        if por_numero.get(numero) == nombre:
+            del por_numero[numero]
+        if por_correo.get(correo) == nombre:
+            del por_correo[correo]
+        nombres = por_cargo.get(cargo)
+        if nombres is not None:
+            nombres.discard(nombre)
+            if not nombres:
+                del por_cargo[cargo]
+    
+    def validar(self, nombre, datos):
+        """Lanza ValueError si el teléfono o el correo ya son de otro contacto."""
+        por_numero, por_correo, _ = self.indices
+        for campo, indice, clave in (("teléfono", por_numero, clave_numero(datos['numero'])),
+                                     ("correo", por_correo, clave_correo(datos['correo']))):
+            otro = indice.get(clave) if clave else None
+            if otro is not None and otro != nombre:
+                raise ValueError(f"El {campo} ya pertenece al contacto '{otro}'.")
+    
+    def por_numero(self, numero):
+        """Nombre del contacto con ese teléfono, o None."""
+        return self.indices[0].get(clave_numero(numero))
+    
+    def por_correo(self, correo):
+        """Nombre del contacto con ese correo, o None."""
+        return self.indices[1].get(clave_correo(correo))
+    
+    def por_cargo(self, cargo):
+        """Nombres (ordenados) de los contactos con ese cargo."""
+        return sorted(self.indices[2].get(clave_cargo(cargo), ()))
+    
+    @staticmethod
+    def columnas(contactos):
+        """La agenda por columnas (nombres, numeros, usuarios, dominios, cargos), como en la foto."""
+        columnas = zip(*contactos.values()) if contactos else ((),) * 4
+        return dict(zip(("numeros", "usuarios", "dominios", "cargos"), columnas), nombres=list(contactos))
+    
+    @staticmethod
+    def de_columnas(columnas):
+        """{nombre: registro} a partir de las columnas; no pasa por Python por cada contacto."""
+        return dict(zip(columnas["nombres"], zip(columnas["numeros"], columnas["usuarios"],
+                                                 map(sys.intern, columnas["dominios"]),
+                                                 map(sys.intern, columnas["cargos"]))))
+    
+    @staticmethod
+    def peso(cambio):
+        """Cuántos cambios trae una línea del diario."""
+        if cambio["op"] == "lote":
+            return len(cambio["cambios"])
+        if cambio["op"] == "importar":
+            return len(cambio["nombres"])
+        return 1
+    
+    @staticmethod
+    def aplicar_en_memoria(datos, cambio, registro=None):
+        if cambio["op"] == "guardar":
+            datos[cambio["nombre"]] = registro or Contacto.tupla(cambio["datos"])
+        elif cambio["op"] == "lote":
+            for parte in cambio["cambios"]:
+                Agenda.aplicar_en_memoria(datos, parte)
+        elif cambio["op"] == "importar":
+            datos.update(Agenda.de_columnas(cambio))
+        else:
+            datos.pop(cambio["nombre"], None)
+    
+    def tocaria_compactar(self, cantidad):
+        """Si con `cantidad` cambios más el diario ya tendría que compactarse."""
+        return self.entradas_diario + cantidad >= max(self.LIMITE_DIARIO, (len(self.datos) + cantidad) // 4)
+    
+    def lote_grande(self, cantidad):
+        """Si con tantos cambios es más rápido volver a armar los índices de texto y de orden que actualizarlos."""
+        return cantidad > max(self.LOTE_GRANDE, len(self.datos) // 10)
+    
+    def escribir_diario(self, linea):
+        with open(self.diario, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(linea, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+    
+    def aplicar(self, cambios):
+        """Escribe los cambios en el diario (en una sola línea) y luego los aplica en
+        memoria. Si con ellos el diario ya tocaría compactarse, no se escriben en el
+        diario sino directo en la foto nueva."""
+        # Con el mismo candado que usan los índices al armarse (en segundo plano), que recorren la agenda
+        with self._candado:
+            datos = self.datos
+            directo = self.tocaria_compactar(len(cambios))
+            if not directo:
+                self.escribir_diario(cambios[0] if len(cambios) == 1 else {"op": "lote", "cambios": cambios})
+            reconstruir = self.lote_grande(len(cambios))
+            if reconstruir:
+                # Con lotes grandes es más rápido volver a armar estos índices que actualizarlos
+                self._buscador = self._orden = None
+            for cambio in cambios:
+                registro = Contacto.tupla(cambio["datos"]) if cambio["op"] == "guardar" else None
+                if self._indices is not None:
+                    anterior = datos.get(cambio["nombre"])
+                    if anterior is not None:
+                        self.desindexar(cambio["nombre"], anterior)
+                    if cambio["op"] == "guardar":
+                        self.indexar(cambio["nombre"], registro)
+                if self._orden is not None:
+                    if cambio["op"] == "guardar" and cambio["nombre"] not in datos:
+                        self._orden.agregar(cambio["nombre"])
+                    elif cambio["op"] == "borrar" and cambio["nombre"] in datos:
+                        self._orden.quitar(cambio["nombre"])
+                if self._buscador is not None:
+                    if cambio["op"] == "guardar":
+                        self._buscador.agregar(cambio["nombre"], registro)
+                    else:
+                        self._buscador.quitar(cambio["nombre"])
+                self.aplicar_en_memoria(datos, cambio, registro)
+            if self._buscador is not None and self._buscador.necesita_reconstruir():
+                self._buscador.reconstruir(datos)
+            self.entradas_diario += len(cambios)
+            if directo:
+                # Hasta que la foto nueva reemplaza a la anterior los cambios no quedan guardados
+                self.compactar()
+            if reconstruir:
+                self.precargar()
+    
+    def agregar_lote(self, nuevos, por_numero=None, por_correo=None):
+        """Agrega de una vez contactos que no están en la agenda, ya validados
+        ({nombre: registro}, ver Contacto.tupla). Se guardan en una sola línea del
+        diario, por columnas, y se suman a cada índice en una pasada. por_numero y
+        por_correo ({teléfono o correo como se indexan: nombre}) evitan recalcular
+        las claves si el llamador ya las tiene."""
+        with self._candado:
+            datos = self.datos
+            directo = self.tocaria_compactar(len(nuevos))
+            if not directo:
+                self.escribir_diario(dict(self.columnas(nuevos), op="importar"))
+            if self._indices is not None:
+                indice_numero, indice_correo, indice_cargo = self._indices
+                if por_numero is None or por_correo is None:
+                    por_numero, por_correo = {}, {}
+                    for nombre, (numero, usuario, dominio, _) in nuevos.items():
+                        numero, correo = clave_numero(numero), clave_correo(usuario + dominio)
+                        if numero:
+                            por_numero[numero] = nombre
+                        if correo:
+                            por_correo[correo] = nombre
+                indice_numero.update(por_numero)
+                indice_correo.update(por_correo)
+                por_cargo = {}  # cargo tal como está escrito -> nombres
+                for nombre, registro in nuevos.items():
+                    nombres = por_cargo.get(registro[3])
+                    if nombres is None:
+                        por_cargo[registro[3]] = [nombre]
+                    else:
+                        nombres.append(nombre)
+                for cargo, nombres in por_cargo.items():
+                    indice_cargo.setdefault(clave_cargo(cargo), set()).update(nombres)
+            if self._orden is not None:
+                self._orden.fusionar(nuevos)
+            reconstruir = self.lote_grande(len(nuevos))
+            if reconstruir:
+                # Indexar las palabras de cada contacto cuesta lo mismo al armarlo de nuevo, pero en segundo plano
+                self._buscador = None
+            elif self._buscador is not None:
+                self._buscador.agregar_lote(nuevos)
+            datos.update(nuevos)
+            self.entradas_diario += len(nuevos)
+            if directo:
+                # Hasta que la foto nueva reemplaza a la anterior los contactos no quedan guardados
+                self.compactar()
+            if reconstruir:
+                self.precargar()
+    
+    def compactar(self):
+        """Guarda una foto nueva y vacía el diario."""
+        with self._candado:
+            temporal = self.archivo + ".tmp"
+            with open(temporal, 'w', encoding='utf-8') as f:
+                # Por columnas: se lee mucho más rápido que un objeto por contacto.
+                # json.dumps (y no json.dump) para usar el codificador en C
+                f.write(json.dumps(self.columnas(self.datos), ensure_ascii=False))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temporal, self.archivo)
+            # Si se corta aquí, el diario se vuelve a aplicar sobre la foto nueva sin cambiar nada
+            open(self.diario, 'w').close()
+            self.entradas_diario = 0
+    
+    def __getitem__(self, nombre):
+        return Contacto(self.datos[nombre])
+    
+    def __setitem__(self, nombre, datos):
+        with self._candado:
+            self.validar(nombre, datos)
+            self.aplicar([{"op": "guardar", "nombre": nombre, "datos": dict(datos)}])
+    
+    def __delitem__(self, nombre):
+        with self._candado:
+            if nombre not in self.datos:
+                raise KeyError(nombre)
+            self.aplicar([{"op": "borrar", "nombre": nombre}])
+    
+    def __contains__(self, nombre):
+        return nombre in self.datos
+    
+    def __iter__(self):
+        return iter(self.datos)
+    
+    def __len__(self):
+        return len(self.datos)
+
+
+# Inicializamos la agenda de contactos (se lee del disco en la primera consulta)
+contactos = Agenda()
+
+# Claves por las que se pueden ordenar los listados
+ORDENES = {
+    "nombre": lambda nombre, datos: normalizar(nombre),
+    "cargo": lambda nombre, datos: (clave_cargo(datos['cargo']), normalizar(nombre)),
+    "correo": lambda nombre, datos: (clave_correo(datos['correo']), normalizar(nombre)),
+    "numero": lambda nombre, datos: (clave_numero(datos['numero']), normalizar(nombre)),
+}
 
 def registrar_contacto():
     """Registra un nuevo contacto en la agenda."""
@@ -20,11 +785,15 @@ def registrar_contacto():
     cargo = input("Ingresa el cargo en la empresa: ")
     
     # Creamos un diccionario para los detalles del contacto
-    contactos[nombre] = {
-        'numero': numero,
-        'correo': correo,
-        'cargo': cargo
-    }
+    try:
+        contactos[nombre] = {
+            'numero': numero,
+            'correo': correo,
+            'cargo': cargo
+        }
+    except ValueError as e:
+        print(f"¡Error! {e}")
+        return
     print(f"Contacto '{nombre}' registrado exitosamente.")
 
 def eliminar_contacto():
@@ -37,18 +806,38 @@ def eliminar_contacto():
         print("¡Error! El contacto no existe.")
 
 def eliminar_contacto_terminal():
-    """Elimina un contacto mostrando la lista y seleccionando por número."""
+    """Elimina un contacto mostrando la lista y seleccionando por número.
+    Muestra solo una ventana de la agenda en orden alfabético, alrededor del
+    contacto buscado, y se puede mover hacia adelante o atrás."""
     if not contactos:
         print("No hay contactos registrados.")
         return
     print("--- Eliminar Contacto ---")
-    nombres = list(contactos.keys())
-    for idx, nombre in enumerate(nombres, 1):
-        print(f"{idx}. {nombre}")
+    orden = contactos.orden
+    texto = input("Escribe parte del nombre para ubicarte (Enter = desde el principio): ").strip()
+    centro = 0
+    if texto:
+        parecidos = contactos.buscar(texto, 1)
+        centro = orden.posicion(parecidos[0]) if parecidos else orden.posicion_desde(texto)
+    inicio = max(0, min(centro - VENTANA // 2, len(orden) - VENTANA))
+    
+    while True:
+        lineas = [f"{posicion}. {nombre}" for posicion, nombre in
+                  enumerate(orden.rango(inicio, inicio + VENTANA), inicio + 1)]
+        sys.stdout.write("\n".join(lineas) + f"\n({inicio + 1}-{inicio + len(lineas)} de {len(orden)})\n")
+        seleccion = input("Selecciona el número del contacto a eliminar ('s' siguientes, 'a' anteriores, Enter para salir): ").strip().lower()
+        if seleccion == 's':
+            inicio = min(inicio + VENTANA, max(len(orden) - VENTANA, 0))
+        elif seleccion == 'a':
+            inicio = max(inicio - VENTANA, 0)
+        else:
+            break
+    if not seleccion:
+        return
     try:
-        seleccion = int(input("Selecciona el número del contacto a eliminar: "))
-        if 1 <= seleccion <= len(nombres):
-            nombre = nombres[seleccion - 1]
+        seleccion = int(seleccion)
+        if 1 <= seleccion <= len(orden):
+            nombre = orden.seleccionar(seleccion - 1)
             del contactos[nombre]
             print(f"Contacto '{nombre}' eliminado exitosamente.")
         else:
@@ -62,51 +851,306 @@ def actualizar_contacto():
     if nombre in contactos:
         print(f"Datos actuales de '{nombre}': {contactos[nombre]}")
         print("Ingresa los nuevos datos (deja en blanco para mantener el actual):")
+        # Se arma una copia y se guarda una sola vez al final
+        datos = dict(contactos[nombre])
         
-        nuevo_numero = input(f"Nuevo número ({contactos[nombre]['numero']}): ")
+        nuevo_numero = input(f"Nuevo número ({datos['numero']}): ")
         if nuevo_numero:
-            contactos[nombre]['numero'] = nuevo_numero
+            datos['numero'] = nuevo_numero
         
-        nuevo_correo = input(f"Nuevo correo ({contactos[nombre]['correo']}): ")
+        nuevo_correo = input(f"Nuevo correo ({datos['correo']}): ")
         if nuevo_correo:
-            contactos[nombre]['correo'] = nuevo_correo
-            
-        nuevo_cargo = input(f"Nuevo cargo ({contactos[nombre]['cargo']}): ")
+            datos['correo'] = nuevo_correo
+        
+        nuevo_cargo = input(f"Nuevo cargo ({datos['cargo']}): ")
         if nuevo_cargo:
-            contactos[nombre]['cargo'] = nuevo_cargo
+            datos['cargo'] = nuevo_cargo
         
+        if datos != contactos[nombre]:
+            try:
+                contactos[nombre] = datos
+            except ValueError as e:
+                print(f"¡Error! {e}")
+                return
         print(f"Contacto '{nombre}' actualizado exitosamente.")
     else:
         print("¡Error! El contacto no existe.")
 
+def ordenar(nombres, orden="nombre"):
+    """Nombres ordenados por una de las claves de ORDENES."""
+    if nombres is contactos and orden == "nombre":
+        # La agenda ya mantiene sus nombres en orden
+        return contactos.orden
+    clave = ORDENES[orden]
+    return sorted(nombres, key=lambda nombre: clave(nombre, contactos[nombre]))
+
+def paginas(nombres, tamano=TAMANO_PAGINA):
+    """Genera los nombres de a `tamano` por vez."""
+    pagina = []
+    for nombre in nombres:
+        pagina.append(nombre)
+        if len(pagina) == tamano:
+            yield pagina
+            pagina = []
+    if pagina:
+        yield pagina
+
+def ficha(nombre):
+    """Datos de un contacto como los muestra mostrar_contactos."""
+    datos = contactos[nombre]
+    return (f"Nombre: {nombre}\n  - Número: {datos['numero']}\n  - Correo: {datos['correo']}\n"
+            f"  - Cargo: {datos['cargo']}\n" + "-" * 25 + "\n")
+
+def paginar(titulo, nombres, formato, tamano=TAMANO_PAGINA):
+    """Muestra los nombres de a una página, con una sola escritura por página."""
+    total = -(-len(nombres) // tamano)
+    for numero, pagina in enumerate(paginas(nombres, tamano), 1):
+        sys.stdout.write(f"--- {titulo} (página {numero} de {total}) ---\n" + "".join(map(formato, pagina)))
+        sys.stdout.flush()
+        if numero < total and input("Enter para ver la siguiente página, 'q' para terminar: ").strip().lower() == 'q':
+            break
+
+def pedir_orden():
+    """Pregunta por qué clave ordenar un listado."""
+    orden = input("Ordenar por nombre, cargo, correo o numero (Enter = nombre): ").strip().lower() or "nombre"
+    if orden not in ORDENES:
+        print("Orden no válido, se ordena por nombre.")
+        orden = "nombre"
+    return orden
+
 def mostrar_contactos():
-    """Muestra todos los contactos registrados."""
+    """Muestra todos los contactos registrados, por páginas."""
     if not contactos:
         print("No hay contactos registrados.")
         return
     
-    print("--- Lista de Contactos ---")
-    for nombre, datos in contactos.items():
-        print(f"Nombre: {nombre}")
-        print(f"  - Número: {datos['numero']}")
-        print(f"  - Correo: {datos['correo']}")
-        print(f"  - Cargo: {datos['cargo']}")
-        print("-" * 25)
+    paginar("Lista de Contactos", ordenar(contactos, pedir_orden()), ficha)
 
 def listar_contactos():
-    """Muestra solo los nombres de todos los contactos registrados."""
+    """Muestra solo los nombres de todos los contactos registrados, por páginas."""
     if not contactos:
         print("No hay contactos registrados.")
         return
-    print("--- Nombres de Contactos ---")
-    for nombre in contactos:
-        print(nombre)
-    print("-" * 25)
+    paginar("Nombres de Contactos", ordenar(contactos, pedir_orden()), lambda nombre: nombre + "\n",
+            TAMANO_PAGINA * 5)
+
+def exportar_contactos(ruta, orden="nombre", tamano=1000):
+    """Escribe la agenda en un archivo de a una página por escritura, sin armar todo
+    el texto en memoria: CSV si la ruta termina en .csv, si no como mostrar_contactos.
+    Devuelve cuántos contactos escribió."""
+    nombres = ordenar(contactos, orden)
+    with open(ruta, 'w', encoding='utf-8', newline='') as f:
+        es_csv = ruta.lower().endswith(".csv")
+        if es_csv:
+            f.write("nombre,numero,correo,cargo\r\n")
+        for pagina in paginas(nombres, tamano):
+            if es_csv:
+                bloque = io.StringIO()
+                csv.writer(bloque).writerows((nombre, contactos[nombre]['numero'], contactos[nombre]['correo'],
+                                              contactos[nombre]['cargo']) for nombre in pagina)
+                f.write(bloque.getvalue())
+            else:
+                f.write("".join(map(ficha, pagina)))
+    return len(nombres)
+
+def exportar_a_archivo():
+    """Pide un archivo y exporta allí la agenda."""
+    ruta = input("Archivo de destino (.csv o .txt): ").strip()
+    if not ruta:
+        return
+    try:
+        total = exportar_contactos(ruta, pedir_orden())
+    except OSError as e:
+        print(f"¡Error! No se pudo escribir el archivo: {e}")
+        return
+    print(f"{total} contactos exportados a '{ruta}'.")
+
+def leer_csv(ruta):
+    """Genera (línea, nombre, número, correo, cargo) de un CSV con encabezado
+    (nombre, numero o telefono, correo, cargo)."""
+    with open(ruta, 'r', encoding='utf-8-sig', newline='') as f:
+        # csv.reader y no DictReader: no arma un diccionario por fila
+        lector = csv.reader(f)
+        encabezado = [columna.strip().lower() for columna in next(lector, [])]
+        # A cada fila se le agrega una columna vacía al final (-1) para las que no están en el encabezado
+        nombre, numero, telefono, correo, cargo = (encabezado.index(columna) if columna in encabezado else -1
+                                                   for columna in ("nombre", "numero", "telefono", "correo", "cargo"))
+        ancho = len(encabezado)
+        for fila in lector:
+            if not fila:
+                continue
+            if len(fila) < ancho:
+                fila += [""] * (ancho - len(fila))
+            fila.append("")
+            yield lector.line_num, fila[nombre], fila[numero] or fila[telefono], fila[correo], fila[cargo]
+
+def valor_vcard(valor):
+    """Quita los escapes de vCard (\\, \\; \\n)."""
+    return ESCAPE_VCARD.sub(lambda m: " " if m.group(1) in "nN" else m.group(1), valor).strip()
+
+def leer_vcard(ruta):
+    """Genera (línea, nombre, número, correo, cargo) de cada tarjeta de un archivo vCard.
+    De cada propiedad se toma la primera (el primer teléfono, el primer correo)."""
+    with open(ruta, 'r', encoding='utf-8-sig') as f:
+        tarjeta, inicio, ultima = None, 0, None
+        for numero, linea in enumerate(f, 1):
+            linea = linea.rstrip("\r\n")
+            if linea[:1] in (" ", "\t"):
+                # Continuación de la línea anterior
+                if tarjeta is not None and ultima is not None:
+                    tarjeta[ultima] += linea[1:]
+                continue
+            propiedad, _, valor = linea.partition(":")
+            propiedad = propiedad.split(";")[0].split(".")[-1].upper()
+            ultima = None
+            if propiedad == "BEGIN":
+                tarjeta, inicio = {}, numero
+            elif propiedad == "END" and tarjeta is not None:
+                nombre = tarjeta.get("FN") or " ".join(reversed(tarjeta.get("N", "").split(";")[:2]))
+                yield (inicio, valor_vcard(nombre), valor_vcard(tarjeta.get("TEL", "")),
+                       valor_vcard(tarjeta.get("EMAIL", "")), valor_vcard(tarjeta.get("TITLE") or tarjeta.get("ROLE", "")))
+                tarjeta = None
+            elif tarjeta is not None and propiedad not in tarjeta:
+                tarjeta[propiedad] = valor
+                ultima = propiedad
+
+def validar_fila(linea, nombre, numero, correo, cargo):
+    """Normaliza una fila importada. Devuelve (línea, nombre, registro, teléfono,
+    correo, None), con el registro como lo guarda la agenda (ver Contacto.tupla) y el
+    teléfono y el correo como se indexan, o (línea, nombre, None, None, None, motivo)."""
+    nombre = " ".join(nombre.split())
+    if not nombre:
+        return linea, nombre, None, None, None, "falta el nombre"
+    numero = numero.strip()
+    digitos = clave_numero(numero)
+    if numero and not 7 <= len(digitos) <= 15:
+        return linea, nombre, None, None, None, f"teléfono no válido: {numero}"
+    correo = correo.strip()
+    usuario = dominio = ""
+    if correo:
+        if not CORREO_VALIDO.fullmatch(correo):
+            return linea, nombre, None, None, None, f"correo no válido: {correo}"
+        usuario, _, dominio = correo.rpartition("@")
+        dominio = "@" + dominio.lower()
+    registro = (("+" if numero.startswith("+") else "") + digitos, usuario,
+                sys.intern(dominio), sys.intern(" ".join(cargo.split())))
+    # El correo ya no tiene espacios alrededor: su clave (ver clave_correo) es solo pasarlo a minúsculas
+    return linea, nombre, registro, digitos, correo.lower(), None
+
+def validar_bloque(filas):
+    return [validar_fila(*fila) for fila in filas]
+
+def validar_en_paralelo(filas, procesos=None):
+    """Valida las filas en un grupo de procesos, de a BLOQUE_IMPORTACION, a medida
+    que se leen del archivo. Genera los resultados en el orden del archivo."""
+    bloques = iter(lambda: list(itertools.islice(filas, BLOQUE_IMPORTACION)), [])
+    primero = next(bloques, [])
+    if len(primero) < BLOQUE_IMPORTACION:
+        # Archivo chico: no vale la pena arrancar procesos
+        yield from validar_bloque(primero)
+        return
+    procesos = procesos or os.cpu_count() or 1
+    if procesos == 1:
+        # Con un solo procesador los procesos solo agregan el costo de copiar las filas
+        yield from validar_bloque(primero)
+        for bloque in bloques:
+            yield from validar_bloque(bloque)
+        return
+    with ProcessPoolExecutor(procesos) as grupo:
+        pendientes = deque()
+        for bloque in itertools.chain([primero], bloques):
+            pendientes.append(grupo.submit(validar_bloque, bloque))
+            # Se limita lo que está en vuelo para no leer todo el archivo a memoria
+            if len(pendientes) >= 2 * procesos:
+                yield from pendientes.popleft().result()
+        while pendientes:
+            yield from pendientes.popleft().result()
+
+def importar_contactos(ruta, procesos=None):
+    """Importa contactos de un CSV o vCard (.vcf). Rechaza las filas inválidas y las
+    repetidas (nombre, teléfono o correo que ya están en la agenda o antes en el
+    archivo) y guarda el resto de una sola vez (Agenda.agregar_lote). Devuelve
+    (importados, rechazos), con rechazos como (línea, nombre, motivo)."""
+    filas = leer_vcard(ruta) if ruta.lower().endswith((".vcf", ".vcard")) else leer_csv(ruta)
+    por_numero, por_correo, _ = contactos.indices
+    existentes = contactos.datos
+    # Los aceptados, y sus teléfonos y correos: quedan listos para sumarse a los índices
+    nuevos, numeros, correos = {}, {}, {}
+    rechazos = []
+    # Las filas son tuplas de textos y no forman ciclos; con el recolector activo se
+    # recorrería la agenda entera una y otra vez mientras se crean millones de ellas
+    recolector = gc.isenabled()
+    gc.disable()
+    try:
+        for linea, nombre, registro, numero, correo, motivo in validar_en_paralelo(filas, procesos):
+            if motivo is None:
+                if nombre in existentes or nombre in nuevos:
+                    motivo = "ya existe un contacto con ese nombre"
+                elif numero and (numero in por_numero or numero in numeros):
+                    motivo = f"el teléfono {registro[0]} ya está registrado"
+                elif correo and (correo in por_correo or correo in correos):
+                    motivo = f"el correo {registro[1] + registro[2]} ya está registrado"
+                else:
+                    nuevos[nombre] = registro
+                    if numero:
+                        numeros[numero] = nombre
+                    if correo:
+                        correos[correo] = nombre
+                    continue
+            rechazos.append((linea, nombre, motivo))
+        if nuevos:
+            contactos.agregar_lote(nuevos, numeros, correos)
+    finally:
+        if recolector:
+            gc.enable()
+    return len(nuevos), rechazos
+
+def escribir_rechazos(ruta, rechazos):
+    """Guarda el reporte de filas rechazadas como CSV."""
+    with open(ruta, 'w', encoding='utf-8', newline='') as f:
+        escritor = csv.writer(f)
+        escritor.writerow(["linea", "nombre", "motivo"])
+        escritor.writerows(rechazos)
+
+def importar_desde_archivo():
+    """Pide un archivo CSV o vCard e importa sus contactos."""
+    ruta = input("Archivo a importar (.csv o .vcf): ").strip()
+    if not ruta:
+        return
+    try:
+        importados, rechazos = importar_contactos(ruta)
+    except (OSError, UnicodeDecodeError, csv.Error) as e:
+        print(f"¡Error! No se pudo leer el archivo: {e}")
+        return
+    print(f"{importados} contactos importados, {len(rechazos)} rechazados.")
+    if rechazos:
+        reporte = ruta + ".rechazos.csv"
+        escribir_rechazos(reporte, rechazos)
+        print(f"Los rechazos y sus motivos están en '{reporte}'.")
 
 def buscar_contacto():
-    """Busca un contacto por nombre y muestra sus datos si existe."""
-    nombre = input("Ingresa el nombre del contacto a buscar: ")
-    if nombre in contactos:
+    """Busca un contacto por nombre, teléfono o correo y muestra sus datos si existe.
+    Si no hay uno exacto, muestra los que contienen lo escrito en el nombre, correo o cargo."""
+    texto = input("Ingresa el nombre, teléfono, correo o parte de ellos: ")
+    if texto in contactos:
+        nombre = texto
+    elif "@" in texto:
+        nombre = contactos.por_correo(texto)
+    else:
+        nombre = contactos.por_numero(texto)
+    
+    if nombre is None:
+        parecidos = contactos.buscar(texto)
+        if len(parecidos) == 1:
+            nombre = parecidos[0]
+        elif parecidos:
+            print(f"--- Contactos que coinciden con '{texto}' ---")
+            for parecido in parecidos:
+                print(f"{parecido} - {contactos[parecido]['correo']} - {contactos[parecido]['cargo']}")
+            print("-" * 25)
+            return
+    
+    if nombre is not None:
         datos = contactos[nombre]
         print(f"Nombre: {nombre}")
         print(f"  - Número: {datos['numero']}")
@@ -115,8 +1159,20 @@ def buscar_contacto():
     else:
         print("¡Error! El contacto no existe.")
 
+def listar_por_cargo():
+    """Muestra los contactos que tienen un cargo."""
+    cargo = input("Ingresa el cargo: ")
+    nombres = contactos.por_cargo(cargo)
+    if not nombres:
+        print("No hay contactos con ese cargo.")
+        return
+    paginar(f"Contactos con cargo '{cargo}' ({len(nombres)})", nombres,
+            lambda nombre: f"{nombre} - {contactos[nombre]['numero']} - {contactos[nombre]['correo']}\n")
+
 def menu():
     """Función principal para el menú de opciones."""
+    # La agenda se lee mientras el usuario elige la primera opción
+    contactos.precargar()
     while True:
         print("\n  Gestión de Contactos ")
         print("1. Registrar contacto")
@@ -125,10 +1181,13 @@ def menu():
         print("4. Actualizar contacto")
         print("5. Mostrar todos los contactos")
         print("6. Listar nombres de contactos")
-        print("7. Buscar contacto")
+        print("7. Buscar contacto (nombre, teléfono o correo)")
         print("8. Salir")
+        print("9. Listar contactos por cargo")
+        print("10. Exportar contactos a un archivo")
+        print("11. Importar contactos (CSV o vCard)")
         
-        opcion = input("Selecciona una opción (1-8): ")
+        opcion = input("Selecciona una opción (1-11): ")
         
         if opcion == '1':
             registrar_contacto()
@@ -147,6 +1206,12 @@ def menu():
         elif opcion == '8':
             print("Saliendo del programa.")
             break
+        elif opcion == '9':
+            listar_por_cargo()
+        elif opcion == '10':
+            exportar_a_archivo()
+        elif opcion == '11':
+            importar_desde_archivo()
         else:
             print("Opción no válida. Por favor, intenta de nuevo.")
 
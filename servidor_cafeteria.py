@@ -0,0 +1,343 @@
+import argparse
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from cafeteria import (Catalogo, ColaCocina, ConflictoMenu, HistorialVentas, MenuIlegible, MotorCafeteria,
+                       MotorPrecios, OperacionInvalida, StockInsuficiente, activar_metricas, crear_almacen)
+
+ESTADOS = {200: "OK", 201: "Created", 400: "Bad Request", 403: "Forbidden",
+           404: "Not Found", 405: "Method Not Allowed", 409: "Conflict",
+           413: "Payload Too Large", 500: "Internal Server Error"}
+
+class ServidorCafeteria:
+    """Servidor HTTP asyncio para tomar pedidos desde tabletas y kioscos.
+
+    Rutas:
+        GET    /menu                     menú completo
+        GET    /menu/<id>                un producto
+        GET    /menu/buscar?q=texto      productos cuyo nombre coincide (sin tildes, con errores de tipeo)
+        POST   /pedidos                  {"items": [{"id": 3, "cantidad": 2}, ...], "prioridad": 1}
+        POST   /admin/productos          {"nombre": ..., "precio": ..., "cantidad": ...}
+        PATCH  /admin/productos/<id>     {"precio": ...} y/o {"cantidad": ...}
+        DELETE /admin/productos/<id>
+        GET    /admin/cocina             cola de preparación, esperas y rendimiento
+    Las rutas /admin requieren la cabecera X-Clave-Admin.
+
+    Las lecturas del menú se sirven desde un JSON ya serializado y nunca esperan;
+    tras cada cambio el hilo del ejecutor vuelve a serializar solo los productos tocados.
+    Las operaciones que cambian el stock se ejecutan de a una (asyncio.Lock) en un
+    hilo aparte, para que la escritura a disco no detenga el resto de conexiones.
+    Las búsquedas, la consulta de un producto y las estadísticas de cocina usan ese
+    mismo hilo, así nunca leen el menú ni las reservas mientras un cambio los
+    modifica; el índice de nombres se arma al arrancar."""
+
+    # Tamaño máximo del cuerpo de una petición
+    MAX_CUERPO = 64 * 1024
+    # Segundos que se mantiene abierta una conexión inactiva
+    ESPERA_CONEXION = 30
+
+    def __init__(self, catalogo: Catalogo, clave_admin: str = "admin123",
+                 intervalo_sincronizacion: float = 2.0):
+        self.catalogo = catalogo
+        self.clave_admin = clave_admin
+        self.intervalo_sincronizacion = intervalo_sincronizacion
+        self.cambios = asyncio.Lock()
+        self.ejecutor = ThreadPoolExecutor(max_workers=1)
+        # Fragmento JSON de cada producto, en el orden del menú
+        self.filas = {producto: self.fila(producto) for producto in catalogo.menu}
+        # Productos a volver a serializar; None si hay que rearmar todo el menú
+        self.pendientes = set()
+        self.menu_json = self.unir_filas()
+        catalogo.suscribir(self.marcar_cambio)
+        # Con catálogos grandes armar el índice tarda; mejor antes de aceptar conexiones
+        catalogo.indexar_nombres()
+
+    def marcar_cambio(self, cambio: Dict):
+        if self.pendientes is None:
+            return
+        if cambio["op"] == "recarga":
+            self.pendientes = None
+        elif cambio["op"] == "venta":
+            self.pendientes.update(cambio["items"])
+        else:
+            if cambio["op"] == "quitar":
+                # Si vuelve a agregarse va al final, igual que en el menú
+                self.filas.pop(cambio["producto"], None)
+            self.pendientes.add(cambio["producto"])
+
+    def producto_publico(self, producto: str) -> Dict:
+        """Datos públicos de un producto; el stock mostrado descuenta lo reservado"""
+        info = self.catalogo.menu[producto]
+        libre = max(self.catalogo.disponible(producto), 0)
+        return {"id": info['id'], "nombre": producto, "precio": info['precio'],
+                "cantidad": libre, "disponible": libre > 0}
+
+    def fila(self, producto: str) -> bytes:
+        return json.dumps(self.producto_publico(producto), ensure_ascii=False).encode('utf-8')
+    
+    def unir_filas(self) -> bytes:
+        return b"[" + b", ".join(self.filas.values()) + b"]"
+    
+    def actualizar_menu(self):
+        """Vuelve a serializar los productos que cambiaron y arma el JSON del menú"""
+        pendientes, self.pendientes = self.pendientes, set()
+        if pendientes is None:
+            self.filas = {producto: self.fila(producto) for producto in self.catalogo.menu}
+        elif pendientes:
+            for producto in pendientes:
+                if producto in self.catalogo.menu:
+                    self.filas[producto] = self.fila(producto)
+                else:
+                    self.filas.pop(producto, None)
+        else:
+            return
+        self.menu_json = self.unir_filas()
+
+    def leer_menu(self) -> bytes:
+        """JSON del menú tal como quedó tras el último cambio; no serializa nada"""
+        return self.menu_json
+    
+    def ejecutar(self, funcion, *args):
+        try:
+            return funcion(*args)
+        finally:
+            self.actualizar_menu()
+
+    async def mutar(self, funcion, *args):
+        """Ejecuta una operación que modifica el catálogo, una a la vez y fuera del bucle"""
+        async with self.cambios:
+            return await asyncio.get_running_loop().run_in_executor(self.ejecutor, self.ejecutar, funcion, *args)
+    
+    def buscar(self, texto: str) -> List[Dict]:
+        return [self.producto_publico(producto) for producto in self.catalogo.buscar(texto)]
+
+    def consultar_producto(self, producto_id: int) -> Optional[Dict]:
+        producto = self.catalogo.producto_por_id(producto_id)
+        return self.producto_publico(producto) if producto is not None else None
+    
+    async def leer(self, funcion, *args):
+        """Ejecuta una lectura del catálogo en el hilo del ejecutor, entre dos cambios"""
+        return await asyncio.get_running_loop().run_in_executor(self.ejecutor, funcion, *args)
+    
+    def sincronizar(self):
+        self.catalogo.sincronizar()
+        self.catalogo.barrer_reservas()
+
+    async def sincronizar_periodicamente(self):
+        """Trae los cambios de las terminales que comparten el almacenamiento
+        y libera las reservas vencidas"""
+        while True:
+            await asyncio.sleep(self.intervalo_sincronizacion)
+            try:
+                await self.mutar(self.sincronizar)
+            except MenuIlegible as e:
+                # Se sigue atendiendo con el último menú leído y se reintenta en la próxima vuelta
+                print(f"❌ {e}")
+
+    # --- Operaciones (se ejecutan en el hilo del ejecutor) ---
+
+    def confirmar_pedido(self, items, prioridad: int = ColaCocina.NORMAL) -> Dict:
+        motor = MotorCafeteria(self.catalogo)
+        try:
+            for item in items:
+                motor.agregar_item(int(item["id"]), int(item["cantidad"]))
+            ticket = motor.confirmar(prioridad)
+        except BaseException:
+            motor.descartar()
+            raise
+        respuesta = {"estado": "confirmado", "total": ticket["total"], "cotizacion": ticket["cotizacion"],
+                     "items": [{"producto": producto, **info} for producto, info in ticket["items"].items()]}
+        if "cocina" in ticket:
+            respuesta["cocina"] = ticket["cocina"]
+        return respuesta
+
+    def agregar_producto(self, datos: Dict) -> Dict:
+        motor = MotorCafeteria(self.catalogo)
+        producto_id = motor.agregar_producto(str(datos["nombre"]).strip(), int(datos["precio"]), int(datos["cantidad"]))
+        return {"id": producto_id}
+
+    def modificar_producto(self, producto_id: int, datos: Dict) -> Dict:
+        motor = MotorCafeteria(self.catalogo)
+        motor.producto(producto_id)
+        if "precio" in datos:
+            motor.modificar_precio(producto_id, int(datos["precio"]))
+        if "cantidad" in datos:
+            motor.modificar_cantidad(producto_id, int(datos["cantidad"]))
+        producto = self.catalogo.producto_por_id(producto_id)
+        return {"id": producto_id, "nombre": producto, **self.catalogo.menu[producto]}
+
+    def quitar_producto(self, producto_id: int) -> Dict:
+        return {"eliminado": MotorCafeteria(self.catalogo).quitar_producto(producto_id)}
+
+    # --- HTTP ---
+
+    async def despachar(self, metodo: str, ruta: str, cabeceras: Dict, cuerpo: bytes) -> Tuple[int, object]:
+        """Resuelve una petición. Devuelve (código HTTP, respuesta JSON o bytes ya serializados)"""
+        url = urlsplit(ruta)
+        partes = [parte for parte in url.path.split("/") if parte]
+
+        try:
+            if partes == ["menu"]:
+                if metodo != "GET":
+                    return 405, {"error": "Método no permitido"}
+                return 200, self.leer_menu()
+
+            if partes == ["menu", "buscar"]:
+                if metodo != "GET":
+                    return 405, {"error": "Método no permitido"}
+                texto = parse_qs(url.query).get("q", [""])[0]
+                return 200, await self.leer(self.buscar, texto)
+
+            if len(partes) == 2 and partes[0] == "menu":
+                if metodo != "GET":
+                    return 405, {"error": "Método no permitido"}
+                producto = await self.leer(self.consultar_producto, int(partes[1]))
+                if producto is None:
+                    return 404, {"error": "ID de producto no válido"}
+                return 200, producto
+
+            if partes == ["pedidos"]:
+                if metodo != "POST":
+                    return 405, {"error": "Método no permitido"}
+                datos = json.loads(cuerpo)
+                prioridad = int(datos.get("prioridad", ColaCocina.NORMAL))
+                return 201, await self.mutar(self.confirmar_pedido, datos["items"], prioridad)
+            
+            if partes == ["admin", "cocina"]:
+                if cabeceras.get("x-clave-admin") != self.clave_admin:
+                    return 403, {"error": "Clave de administrador incorrecta"}
+                if metodo != "GET":
+                    return 405, {"error": "Método no permitido"}
+                if self.catalogo.cocina is None:
+                    return 404, {"error": "La cola de cocina no está habilitada"}
+                # Ordena las muestras de espera: fuera del bucle
+                return 200, await self.leer(self.catalogo.cocina.estadisticas)
+
+            if partes[:2] == ["admin", "productos"] and len(partes) <= 3:
+                if cabeceras.get("x-clave-admin") != self.clave_admin:
+                    return 403, {"error": "Clave de administrador incorrecta"}
+                if len(partes) == 2 and metodo == "POST":
+                    return 201, await self.mutar(self.agregar_producto, json.loads(cuerpo))
+                if len(partes) == 3 and metodo == "PATCH":
+                    return 200, await self.mutar(self.modificar_producto, int(partes[2]), json.loads(cuerpo))
+                if len(partes) == 3 and metodo == "DELETE":
+                    return 200, await self.mutar(self.quitar_producto, int(partes[2]))
+                return 405, {"error": "Método no permitido"}
+
+            return 404, {"error": "Ruta no encontrada"}
+
+        except StockInsuficiente as e:
+            return 409, {"error": str(e), "faltantes": e.faltantes}
+        except ConflictoMenu as e:
+            return 409, {"error": str(e)}
+        except OperacionInvalida as e:
+            return 400, {"error": str(e)}
+        except (ValueError, KeyError, TypeError):
+            return 400, {"error": "Petición mal formada"}
+
+    async def atender(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Atiende una conexión; admite varias peticiones seguidas (keep-alive)"""
+        try:
+            while True:
+                try:
+                    encabezado = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), self.ESPERA_CONEXION)
+                except (asyncio.TimeoutError, asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+                    break
+
+                lineas = encabezado.decode('latin-1').split("\r\n")
+                try:
+                    metodo, ruta, version = lineas[0].split(" ", 2)
+                except ValueError:
+                    break
+                cabeceras = {}
+                for linea in lineas[1:]:
+                    if ":" in linea:
+                        clave, valor = linea.split(":", 1)
+                        cabeceras[clave.strip().lower()] = valor.strip()
+
+                try:
+                    largo = int(cabeceras.get("content-length", 0) or 0)
+                except ValueError:
+                    largo = -1
+                if largo < 0:
+                    # Sin un largo válido no se sabe dónde termina el cuerpo
+                    estado, respuesta = 400, {"error": "Content-Length inválido"}
+                    cabeceras["connection"] = "close"
+                elif largo > self.MAX_CUERPO:
+                    estado, respuesta = 413, {"error": "Cuerpo demasiado grande"}
+                    cabeceras["connection"] = "close"
+                else:
+                    cuerpo = await reader.readexactly(largo) if largo else b""
+                    try:
+                        estado, respuesta = await self.despachar(metodo.upper(), ruta, cabeceras, cuerpo)
+                    except Exception as e:
+                        estado, respuesta = 500, {"error": f"Error inesperado: {e}"}
+
+                seguir = (version.upper() == "HTTP/1.1" and cabeceras.get("connection", "").lower() != "close")
+                if not isinstance(respuesta, bytes):
+                    respuesta = json.dumps(respuesta, ensure_ascii=False).encode('utf-8')
+                writer.write(
+                    f"HTTP/1.1 {estado} {ESTADOS[estado]}\r\n"
+                    f"Content-Type: application/json; charset=utf-8\r\n"
+                    f"Content-Length: {len(respuesta)}\r\n"
+                    f"Connection: {'keep-alive' if seguir else 'close'}\r\n\r\n".encode('latin-1') + respuesta)
+                await writer.drain()
+                if not seguir:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def servir(self, host: str = "127.0.0.1", puerto: int = 8080):
+        servidor = await asyncio.start_server(self.atender, host, puerto, backlog=1024)
+        sincronizacion = asyncio.create_task(self.sincronizar_periodicamente())
+        print(f"☕ Servidor de pedidos escuchando en http://{host}:{puerto}")
+        try:
+            async with servidor:
+                await servidor.serve_forever()
+        finally:
+            sincronizacion.cancel()
+            self.ejecutor.shutdown()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Servidor de pedidos de la cafetería")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--puerto", type=int, default=8080)
+    parser.add_argument("--almacen", choices=["json", "binario", "sqlite"], default="json",
+                        help="backend donde se guarda el menú (por defecto: json)")
+    parser.add_argument("--clave-admin", default="admin123",
+                        help="valor esperado en la cabecera X-Clave-Admin")
+    parser.add_argument("--promociones", default="promociones.json",
+                        help="reglas de combos, descuentos e impuestos")
+    parser.add_argument("--estaciones", metavar="N", type=int,
+                        help="pasa los pedidos confirmados a una cocina con N estaciones de preparación")
+    parser.add_argument("--cocina", metavar="ARCHIVO", default="cocina.json",
+                        help="tiempos de preparación por producto (por defecto: cocina.json)")
+    parser.add_argument("--escala-cocina", metavar="FACTOR", type=float, default=1.0,
+                        help="acelera la preparación simulada (0 = instantánea)")
+    parser.add_argument("--metricas", metavar="ARCHIVO",
+                        help="mide tiempos y contadores y los exporta a este archivo (formato Prometheus)")
+    parser.add_argument("--metricas-puerto", metavar="PUERTO", type=int,
+                        help="publica las métricas en http://127.0.0.1:PUERTO/metrics")
+    args = parser.parse_args()
+    metricas = activar_metricas(args.metricas, args.metricas_puerto)
+
+    async def principal():
+        cocina = (ColaCocina.desde_archivo(args.cocina, args.estaciones, args.escala_cocina)
+                  if args.estaciones else None)
+        catalogo = Catalogo(crear_almacen(args.almacen), historial=HistorialVentas(),
+                            precios=MotorPrecios.desde_archivo(args.promociones), cocina=cocina)
+        servidor = ServidorCafeteria(catalogo, args.clave_admin)
+        await servidor.servir(args.host, args.puerto)
+
+    try:
+        asyncio.run(principal())
+    except KeyboardInterrupt:
+        print("\n¡Hasta luego! ☕")
+    finally:
+        if metricas and args.metricas:
+            metricas.exportar(args.metricas)